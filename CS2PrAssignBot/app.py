@@ -1,11 +1,19 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import functools
+import hmac
+import json
+import multiprocessing
+import os
+import signal
+import socket
 import sys
 import traceback
 import uuid
 from datetime import datetime
 from http import HTTPStatus
+from typing import Optional
 
 from aiohttp import web
 from aiohttp.web import Request, Response, json_response
@@ -15,9 +23,12 @@ from botbuilder.core import (
     BotFrameworkAdapter,
 )
 from botbuilder.core.integration import aiohttp_error_middleware
-from botbuilder.schema import Activity, ActivityTypes
+from botbuilder.schema import Activity, ActivityTypes, ChannelAccount
 
 from bots import PrAssignBot
+from bots import tracing
+from bots.metrics import REGISTRY, timed
+from bots.turn_pool import SHED_POLICIES, SHED_REJECT, TurnPool
 from config import DefaultConfig
 
 CONFIG = DefaultConfig()
@@ -64,10 +75,37 @@ ADAPTER.on_turn_error = on_error
 APP_ID = SETTINGS.app_id if SETTINGS.app_id else uuid.uuid4()
 
 # Create the Bot
-BOT = PrAssignBot(CONFIG.APP_ID, CONFIG.APP_PASSWORD)
+BOT = PrAssignBot(
+    CONFIG.APP_ID,
+    CONFIG.APP_PASSWORD,
+    shared_state=CONFIG.WORKERS > 1,
+    compact_cards=CONFIG.COMPACT_CARDS,
+    review_reminder_delay=CONFIG.REVIEW_REMINDER_HOURS * 60 * 60,
+)
+
+if CONFIG.FAST_ACK_SHED_POLICY not in SHED_POLICIES:
+    raise ValueError(f"FastAckShedPolicy must be one of {', '.join(SHED_POLICIES)}")
+
+# Background workers for fast-ack mode.
+TURN_POOL = TurnPool(CONFIG.FAST_ACK_WORKERS, CONFIG.FAST_ACK_MAX_QUEUE)
+REGISTRY.gauge(
+    "prassignbot_turn_pool",
+    "Fast-ack turns queued, running, completed, failed and shed.",
+    lambda: {(("stat", name),): value for name, value in TURN_POOL.stats().items()},
+)
+
+
+@timed("messages.background")
+async def process_in_background(activity: Activity, identity):
+    await ADAPTER.process_activity_with_identity(activity, identity, BOT.on_turn)
+
+
+# Invoke responses can carry whole cards, so leave out the optional whitespace.
+compact_json_dumps = functools.partial(json.dumps, separators=(",", ":"))
 
 
 # Listen for incoming requests on /api/messages.
+@timed("messages")
 async def messages(req: Request) -> Response:
     # Main bot message handler.
     if "application/json" in req.headers["Content-Type"]:
@@ -78,17 +116,155 @@ async def messages(req: Request) -> Response:
     activity = Activity().deserialize(body)
     auth_header = req.headers["Authorization"] if "Authorization" in req.headers else ""
 
+    # Invokes carry their result in the response body, so they always run inline.
+    if CONFIG.FAST_ACK and activity.type != ActivityTypes.invoke:
+        # Authenticate before acknowledging so bad tokens still get a 401.
+        identity = await ADAPTER._authenticate_request(activity, auth_header)  # pylint: disable=protected-access
+        if TURN_POOL.submit(lambda: process_in_background(activity, identity)):
+            return Response(status=HTTPStatus.ACCEPTED)
+        if CONFIG.FAST_ACK_SHED_POLICY == SHED_REJECT:
+            return Response(status=HTTPStatus.SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
+        await ADAPTER.process_activity_with_identity(activity, identity, BOT.on_turn)
+        return Response(status=HTTPStatus.OK)
+
     response = await ADAPTER.process_activity(activity, auth_header, BOT.on_turn)
     if response:
-        return json_response(data=response.body, status=response.status)
+        return json_response(data=response.body, status=response.status, dumps=compact_json_dumps)
     return Response(status=HTTPStatus.OK)
 
 
+# Prometheus text exposition of the in-process metrics.
+# Workers sharing PORT would answer scrapes at random, so with several of
+# them each one serves its metrics on a port of its own instead.
+METRICS_RUNNER: Optional[web.AppRunner] = None
+
+
+async def metrics(req: Request) -> Response:  # pylint: disable=unused-argument
+    return Response(
+        body=REGISTRY.render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+# Assign reviewers for many PRs at once, e.g. from a release pipeline.
+# Threads are posted to the service URL the team last messaged the bot
+# from, never to one named by the caller.
+async def batch(req: Request) -> Response:
+    if not CONFIG.BATCH_API_KEY:
+        return Response(status=HTTPStatus.FORBIDDEN)
+    # Compared as bytes: compare_digest refuses non-ASCII str.
+    expected_header = f"Bearer {CONFIG.BATCH_API_KEY}".encode("utf-8")
+    if not hmac.compare_digest(req.headers.get("Authorization", "").encode("utf-8", "surrogateescape"), expected_header):
+        return Response(status=HTTPStatus.UNAUTHORIZED)
+
+    if "application/json" not in req.headers.get("Content-Type", ""):
+        return Response(status=HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+
+    try:
+        body = await req.json()
+    except ValueError:
+        return json_response(data={"error": "body is not valid JSON"}, status=HTTPStatus.BAD_REQUEST)
+    if not isinstance(body, dict):
+        return json_response(data={"error": "body must be a JSON object"}, status=HTTPStatus.BAD_REQUEST)
+
+    reviewee = body.get("reviewee") or {}
+    if not isinstance(reviewee, dict) or not reviewee.get("name") or not isinstance(body.get("entries"), list):
+        return json_response(data={"error": "reviewee.name and entries are required"}, status=HTTPStatus.BAD_REQUEST)
+    if not isinstance(reviewee.get("id") or "", str) or not isinstance(reviewee["name"], str):
+        return json_response(data={"error": "reviewee.id and reviewee.name must be strings"}, status=HTTPStatus.BAD_REQUEST)
+
+    error_message, assigned = await BOT.submit_review_batch(
+        ADAPTER,
+        None,
+        body.get("team_id"),
+        ChannelAccount(id=reviewee.get("id"), name=reviewee["name"]),
+        body["entries"],
+    )
+    if error_message and assigned:
+        # Some entries weren't posted; the others went out with these reviewers.
+        return json_response(data={"error": error_message, "reviewers": assigned}, status=HTTPStatus.BAD_GATEWAY)
+    if error_message:
+        return json_response(data={"error": error_message}, status=HTTPStatus.BAD_REQUEST)
+    return json_response(data={"reviewers": assigned})
+
+
+async def on_startup(app: web.Application):  # pylint: disable=unused-argument
+    if CONFIG.TRACE_FILE:
+        # Rotating files can't be shared between processes, so each worker gets its own.
+        tracing.configure(CONFIG.TRACE_FILE if CONFIG.WORKERS == 1 else f"{CONFIG.TRACE_FILE}.{os.getpid()}")
+
+    if CONFIG.WORKERS > 1:
+        await start_worker_metrics()
+
+    # Start background work such as hot-reloading team configs and syncing rosters.
+    await BOT.start(ADAPTER)
+
+
+async def start_worker_metrics():
+    global METRICS_RUNNER  # pylint: disable=global-statement
+    REGISTRY.constant_labels["worker"] = str(CONFIG.WORKER_INDEX)
+
+    metrics_app = web.Application()
+    metrics_app.router.add_get("/metrics", metrics)
+    METRICS_RUNNER = web.AppRunner(metrics_app)
+    await METRICS_RUNNER.setup()
+    await web.TCPSite(METRICS_RUNNER, "localhost", CONFIG.METRICS_PORT + CONFIG.WORKER_INDEX).start()
+
+
+async def on_shutdown(app: web.Application):  # pylint: disable=unused-argument
+    # Finish acknowledged turns, then flush pending saved-member writes before the process exits.
+    await TURN_POOL.close()
+    await BOT.close()
+    tracing.shutdown()
+    if METRICS_RUNNER:
+        await METRICS_RUNNER.cleanup()
+
+
 APP = web.Application(middlewares=[aiohttp_error_middleware])
 APP.router.add_post("/api/messages", messages)
+APP.router.add_post("/api/batch", batch)
+if CONFIG.WORKERS == 1:
+    APP.router.add_get("/metrics", metrics)
+APP.on_startup.append(on_startup)
+APP.on_shutdown.append(on_shutdown)
+
+def run_worker():
+    web.run_app(APP, host="localhost", port=CONFIG.PORT, reuse_port=CONFIG.WORKERS > 1)
+
+
+def run_workers(workers: int):
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("WebWorkers > 1 needs SO_REUSEPORT, which this platform doesn't have")
+
+    # Spawned, not forked: every worker imports this module and builds its own
+    # bot, event loop and database connections.
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_worker, name=f"worker-{index}") for index in range(workers)]
+    for index, process in enumerate(processes):
+        # Spawned workers start with a copy of this environment.
+        os.environ["WebWorkerIndex"] = str(index)
+        process.start()
+
+    def stop(signum, frame):  # pylint: disable=unused-argument
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Ctrl+C already reached the workers through the process group.
+        for process in processes:
+            process.join()
+
 
 if __name__ == "__main__":
     try:
-        web.run_app(APP, host="localhost", port=CONFIG.PORT)
+        if CONFIG.WORKERS > 1:
+            run_workers(CONFIG.WORKERS)
+        else:
+            run_worker()
     except Exception as error:
         raise error
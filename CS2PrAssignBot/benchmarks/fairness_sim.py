@@ -0,0 +1,214 @@
+"""
+Replays a synthetic review workload against a team config through the same
+assignment code the bot runs (TeamContext.assign_reviewers) on a simulated
+clock, and reports how evenly each strategy spreads the reviews.
+
+    cd CS2PrAssignBot
+    python -m benchmarks.fairness_sim --config bots/team_config.json --reviews 1000000
+
+The workload (reviewee, task group, number of reviewers, time to the next
+review) is drawn in batches with NumPy when it's installed and with the
+random module otherwise; both are seeded, but they don't draw the same
+workload for the same seed. Assignment itself stays sequential because
+every pick depends on the load the previous ones left.
+"""
+from typing import Collection, Dict, Iterator, List, Tuple
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from bots.assignment import ASSIGNMENT_STRATEGIES, RECENT_ASSIGNMENT_WINDOW, AssignmentStrategy, ReviewerLoadTracker
+from bots.team_config import compile_team_config
+from bots.team_registry import TeamContext
+
+
+WORKLOAD_BATCH_SIZE = 100000
+
+# (reviewee index, group index or -1 for no group, number of reviewers, seconds to the next review)
+Review = Tuple[int, int, int, float]
+
+
+class _SimulatedClock:
+    def __init__(self, start: float):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _SortedCandidates(AssignmentStrategy):
+    """
+    Hands the strategy its candidates sorted. The bot passes them on in set
+    order, which changes with string hashing from process to process, so a
+    seeded run would otherwise pick differently every time.
+    """
+
+    def __init__(self, strategy: AssignmentStrategy):
+        self._strategy = strategy
+
+    def pick(self, number: int, candidates: Collection[str]) -> List[str]:
+        return self._strategy.pick(number, sorted(candidates))
+
+
+def _workload_numpy(seed: int, reviews: int, members: int, groups: int, reviewer_counts: List[int], interval: float) -> Iterator[List[Review]]:
+    rng = numpy.random.default_rng(seed)
+    for offset in range(0, reviews, WORKLOAD_BATCH_SIZE):
+        size = min(WORKLOAD_BATCH_SIZE, reviews - offset)
+        yield list(zip(
+            rng.integers(0, members, size).tolist(),
+            (rng.integers(0, groups + 1, size) - 1).tolist(),
+            rng.choice(reviewer_counts, size).tolist(),
+            rng.exponential(interval, size).tolist(),
+        ))
+
+
+def _workload_random(seed: int, reviews: int, members: int, groups: int, reviewer_counts: List[int], interval: float) -> Iterator[List[Review]]:
+    rng = random.Random(seed)
+    for offset in range(0, reviews, WORKLOAD_BATCH_SIZE):
+        size = min(WORKLOAD_BATCH_SIZE, reviews - offset)
+        yield [
+            (rng.randrange(members), rng.randrange(groups + 1) - 1, rng.choice(reviewer_counts), rng.expovariate(1 / interval))
+            for _ in range(size)
+        ]
+
+
+def gini(values: List[int]) -> float:
+    """0 when every value is equal, approaching 1 when one holds everything."""
+    ordered = sorted(values)
+    total = sum(ordered)
+    if not total:
+        return 0.0
+    weighted = sum(rank * value for rank, value in enumerate(ordered, 1))
+    return 2 * weighted / (len(ordered) * total) - (len(ordered) + 1) / len(ordered)
+
+
+def simulate(config: Dict, strategy: str, args: argparse.Namespace) -> Dict:
+    clock = _SimulatedClock(args.start)
+    load_tracker = ReviewerLoadTracker(window=args.window, clock=clock, rng=random.Random(args.seed))
+    team = TeamContext(
+        compile_team_config(dict(config, assignment_strategy=strategy), args.config),
+        load_tracker,
+        rng=random.Random(args.seed),
+    )
+    team.assignment_strategy = _SortedCandidates(team.assignment_strategy)
+
+    members = sorted(team.general_task_group)
+    group_names = list(team.config.groups)
+    workload = (_workload_numpy if numpy is not None and not args.no_numpy else _workload_random)(
+        args.seed, args.reviews, len(members), len(group_names), args.reviewers, args.interval
+    )
+
+    counts = dict.fromkeys(members, 0)
+    last_review: Dict[str, int] = {}
+    streaks: Dict[str, int] = {}
+    worst_streak = (0, "")
+    peak_load = (0, "")
+    short = 0
+
+    start = time.perf_counter()
+    review = 0
+    for batch in workload:
+        for reviewee, group, number_of_reviewers, gap in batch:
+            clock.now += gap
+            reviewers = team.assign_reviewers(
+                members[reviewee],
+                group_names[group] if group >= 0 else "",
+                number_of_reviewers,
+                (),
+                clock.now,
+            )
+            # The bookkeeping _prepare_review does after picking.
+            load_tracker.record(reviewers, clock.now)
+            team.availability.note_assigned(reviewers, clock.now)
+
+            if len(reviewers) < number_of_reviewers:
+                short += 1
+            for reviewer in reviewers:
+                counts[reviewer] += 1
+                streak = streaks[reviewer] = streaks.get(reviewer, 0) + 1 if last_review.get(reviewer) == review - 1 else 1
+                last_review[reviewer] = review
+                if streak > worst_streak[0]:
+                    worst_streak = (streak, reviewer)
+                load = load_tracker.load(reviewer, clock.now)
+                if load > peak_load[0]:
+                    peak_load = (load, reviewer)
+            review += 1
+
+    values = list(counts.values())
+    return {
+        "strategy": strategy,
+        "reviews": review,
+        "seconds": time.perf_counter() - start,
+        "min": min(values),
+        "mean": statistics.fmean(values),
+        "max": max(values),
+        "stdev": statistics.pstdev(values),
+        "gini": gini(values),
+        "worst_streak": worst_streak,
+        "peak_load": peak_load,
+        "short": short,
+        "counts": counts,
+    }
+
+
+def _report(results: List[Dict], per_reviewer: bool) -> str:
+    lines = [
+        f"{'strategy':<12}{'reviews':>10}{'seconds':>9}{'min':>8}{'mean':>10}{'max':>8}{'stdev':>9}{'gini':>8}"
+        f"{'streak':>8}{'peak':>6}{'short':>8}"
+    ]
+    for result in results:
+        lines.append(
+            f"{result['strategy']:<12}{result['reviews']:>10}{result['seconds']:>9.1f}{result['min']:>8}{result['mean']:>10.1f}"
+            f"{result['max']:>8}{result['stdev']:>9.1f}{result['gini']:>8.4f}{result['worst_streak'][0]:>8}"
+            f"{result['peak_load'][0]:>6}{result['short']:>8}"
+        )
+    lines.append("")
+    lines.append("streak: most consecutive reviews one reviewer was assigned, peak: highest load in the recent window,")
+    lines.append("short: reviews that got fewer reviewers than asked for")
+    for result in results:
+        lines.append(f"  {result['strategy']}: longest streak {result['worst_streak'][1]}, peak load {result['peak_load'][1]}")
+
+    if per_reviewer:
+        for result in results:
+            lines.append("")
+            lines.append(f"{result['strategy']} reviews per reviewer:")
+            for member, count in sorted(result["counts"].items(), key=lambda item: (-item[1], item[0])):
+                lines.append(f"  {count:>10}  {member}")
+    return "\n".join(lines)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default="bots/team_config.json", help="team config to assign from")
+    parser.add_argument("--reviews", type=int, default=100000, help="reviews to assign per strategy")
+    parser.add_argument("--reviewers", type=int, nargs="+", default=[1, 2], help="reviewers asked for, drawn uniformly per review")
+    parser.add_argument("--interval", type=float, default=60 * 60, help="mean simulated seconds between reviews")
+    parser.add_argument("--window", type=float, default=RECENT_ASSIGNMENT_WINDOW, help="recent load window in seconds")
+    parser.add_argument("--start", type=float, default=time.time(), help="simulated start time (epoch seconds)")
+    parser.add_argument("--strategies", nargs="+", choices=sorted(ASSIGNMENT_STRATEGIES), default=sorted(ASSIGNMENT_STRATEGIES))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-numpy", action="store_true", help="draw the workload with the random module")
+    parser.add_argument("--per-reviewer", action="store_true", help="also list every reviewer's count")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]):
+    args = parse_args(argv)
+    with open(args.config, "r") as f_ptr:
+        config = json.load(f_ptr)
+    compile_team_config(config, args.config)
+
+    results = [simulate(config, strategy, args) for strategy in args.strategies]
+    print(_report(results, args.per_reviewer))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
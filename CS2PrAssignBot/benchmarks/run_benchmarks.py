@@ -0,0 +1,166 @@
+"""
+Drives app.messages end to end with synthetic activities and a stub
+Bot Framework connector, and reports throughput, latency percentiles and
+memory allocated per scenario.
+
+    cd CS2PrAssignBot
+    python -m benchmarks.run_benchmarks --members 10000 --requests 2000
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import app
+from bots import PrAssignBot
+from bots.outbound import OutboundQueue
+from bots.turn_pool import TurnPool
+from benchmarks.stub_adapter import StubBotFrameworkAdapter
+from benchmarks.synthetic import SCENARIOS, team_roster, write_team_data
+
+
+def _percentile(latencies: List[float], percent: float) -> float:
+    ordered = sorted(latencies)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _fire(client: TestClient, activities: List[Dict], concurrency: int) -> List[float]:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(activity: Dict):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/api/messages", json=activity)
+            await response.read()
+            latencies.append(time.perf_counter() - start)
+            if response.status >= 400:
+                raise RuntimeError(f"{activity.get('text') or activity.get('name')} failed with {response.status}")
+
+    await asyncio.gather(*[post(activity) for activity in activities])
+    return latencies
+
+
+async def run_scenario(client: TestClient, name: str, args: argparse.Namespace) -> Dict:
+    rng = random.Random(args.seed)
+    make_activity = SCENARIOS[name]
+
+    # Warm-up also fills the caches a long-running bot would have warm.
+    await _fire(client, [make_activity(rng, args.members) for _ in range(args.warmup)], args.concurrency)
+
+    activities = [make_activity(rng, args.members) for _ in range(args.requests)]
+    start = time.perf_counter()
+    latencies = await _fire(client, activities, args.concurrency)
+    elapsed = time.perf_counter() - start
+
+    # Allocations are measured in a separate, smaller pass so tracing
+    # doesn't skew the latency numbers above.
+    sample = [make_activity(rng, args.members) for _ in range(min(args.requests, 200))]
+    tracemalloc.start()
+    await _fire(client, sample, args.concurrency)
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size for stat in snapshot.statistics("filename"))
+
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "retained_kib_per_request": allocated / len(sample) / 1024,
+        "peak_kib": peak / 1024,
+    }
+
+
+async def main(args: argparse.Namespace) -> List[Dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_team_data(data_dir, args.members)
+
+        # messages() looks these up as module globals on every request.
+        app.ADAPTER = StubBotFrameworkAdapter(
+            latency=args.connector_latency,
+            throttle_rate=args.throttle_rate,
+            retry_after=args.retry_after,
+            roster=team_roster(args.members),
+        )
+        app.ADAPTER.on_turn_error = app.on_error
+        # Unthrottled unless asked otherwise, so draining the queue between
+        # scenarios measures the bot rather than Teams' rate limits.
+        app.BOT = PrAssignBot(
+            "",
+            "",
+            data_dir=data_dir,
+            compact_cards=args.compact_cards,
+            outbound_queue=OutboundQueue(global_rate=args.send_rate, conversation_rate=args.send_rate),
+        )
+        app.CONFIG.FAST_ACK = args.fast_ack
+        app.CONFIG.TRACE_FILE = args.trace_file
+        app.TURN_POOL = TurnPool(args.fast_ack_workers, args.fast_ack_max_queue)
+
+        async with TestClient(TestServer(app.APP)) as client:
+            for name in args.scenarios:
+                results.append(await run_scenario(client, name, args))
+                await app.TURN_POOL.join()
+                await app.BOT.drain()
+
+        # Leaving the client runs app.on_shutdown, which closes the bot.
+        conversations = app.ADAPTER.connector_client.conversations
+        outbound = app.BOT.outbound_stats()
+        print(
+            f"connector calls throttled: {conversations.throttled}, retried: {outbound['retried']},"
+            f" failed: {outbound['failed']}",
+            file=sys.stderr,
+        )
+
+    return results
+
+
+def _print_results(results: List[Dict]):
+    columns = ["scenario", "requests", "rps", "p50_ms", "p95_ms", "p99_ms", "mean_ms", "retained_kib_per_request", "peak_kib"]
+    print("  ".join(f"{column:>26}" if index == 0 else f"{column:>12}" for index, column in enumerate(columns)))
+    for result in results:
+        cells = []
+        for index, column in enumerate(columns):
+            value = result[column]
+            text = f"{value:.2f}" if isinstance(value, float) else str(value)
+            cells.append(f"{text:>26}" if index == 0 else f"{text:>12}")
+        print("  ".join(cells))
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=1000, help="size of the synthetic team")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight")
+    parser.add_argument("--connector-latency", type=float, default=0.0, help="simulated seconds per connector call")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of connector calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.0, help="Retry-After seconds sent with each 429")
+    parser.add_argument(
+        "--send-rate", type=float, default=1e6, help="outbound Teams calls per second, globally and per conversation"
+    )
+    parser.add_argument("--fast-ack", action="store_true", help="answer before the turn runs (latencies are then ack times)")
+    parser.add_argument("--fast-ack-workers", type=int, default=8)
+    parser.add_argument("--fast-ack-max-queue", type=int, default=200)
+    parser.add_argument("--trace-file", default="", help="write stage spans here (summarize with python -m bots.trace_summary)")
+    parser.add_argument("--compact-cards", action="store_true", help="render cards in compact mode")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    _print_results(asyncio.run(main(parse_args(sys.argv[1:]))))
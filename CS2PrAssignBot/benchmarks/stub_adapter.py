@@ -0,0 +1,131 @@
+from typing import List, Optional
+import asyncio
+import itertools
+import random
+
+from botbuilder.core import BotFrameworkAdapter, BotFrameworkAdapterSettings
+from botbuilder.schema import Activity, ConversationParameters, ConversationResourceResponse, ResourceResponse
+from botbuilder.schema.teams import TeamsChannelAccount, TeamsPagedMembersResult
+
+
+class _ThrottledResponse:
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        self.headers = {"Retry-After": str(retry_after)}
+
+
+class ThrottledError(Exception):
+    """Shaped like the msrest error the connector raises on HTTP 429."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Too Many Requests")
+        self.response = _ThrottledResponse(retry_after)
+
+
+class StubConversations:
+    """
+    Stands in for ConnectorClient.conversations: records what the bot sends
+    and answers like the Bot Framework service would, after an optional delay.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.0,
+        roster: Optional[List[TeamsChannelAccount]] = None,
+    ):
+        self._latency = latency
+        self._roster = roster or []
+        self._throttle_rate = throttle_rate
+        self._retry_after = retry_after
+        self._ids = itertools.count(1)
+        self._rng = random.Random(0)
+        self.throttled = 0
+
+        self.sent: List[Activity] = []
+        self.updated: List[Activity] = []
+        self.deleted: List[str] = []
+        self.created: List[ConversationParameters] = []
+
+    async def _respond(self):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        if self._throttle_rate and self._rng.random() < self._throttle_rate:
+            self.throttled += 1
+            raise ThrottledError(self._retry_after)
+        return str(next(self._ids))
+
+    async def send_to_conversation(self, conversation_id: str, activity: Activity):  # pylint: disable=unused-argument
+        response_id = await self._respond()
+        self.sent.append(activity)
+        return ResourceResponse(id=response_id)
+
+    async def reply_to_activity(self, conversation_id: str, activity_id: str, activity: Activity):  # pylint: disable=unused-argument
+        response_id = await self._respond()
+        self.sent.append(activity)
+        return ResourceResponse(id=response_id)
+
+    async def update_activity(self, conversation_id: str, activity_id: str, activity: Activity):  # pylint: disable=unused-argument
+        response_id = await self._respond()
+        self.updated.append(activity)
+        return ResourceResponse(id=response_id)
+
+    async def delete_activity(self, conversation_id: str, activity_id: str):  # pylint: disable=unused-argument
+        await self._respond()
+        self.deleted.append(activity_id)
+
+    async def get_teams_conversation_paged_members(
+        self,
+        conversation_id: str,  # pylint: disable=unused-argument
+        page_size: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+    ):
+        # The continuation token is simply the offset of the next page.
+        start = int(continuation_token or 0)
+        end = start + (page_size or 500)
+        await self._respond()
+        return TeamsPagedMembersResult(
+            continuation_token=str(end) if end < len(self._roster) else None,
+            members=self._roster[start:end],
+        )
+
+    async def create_conversation(self, parameters: ConversationParameters):
+        response_id = await self._respond()
+        self.created.append(parameters)
+        return ConversationResourceResponse(id=f"conversation-{response_id}", activity_id=response_id)
+
+
+class StubConnectorClient:
+    def __init__(self, latency: float = 0.0, throttle_rate: float = 0.0, retry_after: float = 0.0, roster=None):
+        self.conversations = StubConversations(latency, throttle_rate, retry_after, roster)
+        self.closed = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_details):
+        self.closed += 1
+
+
+class StubBotFrameworkAdapter(BotFrameworkAdapter):
+    """
+    BotFrameworkAdapter with authentication disabled (no app id) whose
+    connector client never leaves the process. A throttle_rate fraction of
+    connector calls fail with 429 and the given Retry-After; roster is what
+    the paged team member API returns.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.0,
+        roster: Optional[List[TeamsChannelAccount]] = None,
+    ):
+        super().__init__(BotFrameworkAdapterSettings("", ""))
+        self.connector_client = StubConnectorClient(latency, throttle_rate, retry_after, roster)
+
+    async def create_connector_client(self, service_url: str, identity=None, audience: Optional[str] = None):  # pylint: disable=unused-argument
+        return self.connector_client
@@ -0,0 +1,122 @@
+from typing import Callable, Dict, List
+import itertools
+import json
+import os
+import random
+
+from botbuilder.schema.teams import TeamsChannelAccount
+
+
+TEAM_ID = "19:benchmark-team@thread.tacv2"
+CHANNEL_ID = "19:benchmark-channel@thread.tacv2"
+SERVICE_URL = "https://smba.benchmark.local/"
+GROUP_SIZE = 50
+
+_activity_ids = itertools.count(1)
+
+
+def member_name(index: int) -> str:
+    return f"Member{index} Surname{index}"
+
+
+def write_team_data(data_dir: str, members: int, saved_ratio: float = 0.5):
+    """Writes team_config.json and team_members.json for a synthetic team."""
+    groups: Dict[str, List[str]] = {}
+    for index in range(members):
+        groups.setdefault(f"Group{index // GROUP_SIZE}", []).append(member_name(index))
+
+    config = {
+        "channel_id": CHANNEL_ID,
+        "team_id": TEAM_ID,
+        "team_name": "Benchmark",
+        "team_leader": member_name(0),
+        "groups": groups,
+    }
+    saved_members = [
+        {"id": f"29:member-{index}", "name": member_name(index)}
+        for index in range(members)
+        if index < members * saved_ratio
+    ]
+
+    with open(os.path.join(data_dir, "team_config.json"), "w") as f_ptr:
+        json.dump(config, f_ptr)
+    with open(os.path.join(data_dir, "team_members.json"), "w") as f_ptr:
+        json.dump(saved_members, f_ptr)
+
+
+def team_roster(members: int) -> List[TeamsChannelAccount]:
+    """What Teams would list for the synthetic team: every member, saved or not."""
+    return [
+        TeamsChannelAccount(id=f"29:member-{index}", name=member_name(index), aad_object_id=f"aad-{index}")
+        for index in range(members)
+    ]
+
+
+def _activity(rng: random.Random, members: int, **fields) -> Dict:
+    user = rng.randrange(members)
+    activity = {
+        "type": "message",
+        "id": f"activity-{next(_activity_ids)}",
+        "channelId": "msteams",
+        "serviceUrl": SERVICE_URL,
+        "from": {"id": f"29:member-{user}", "name": member_name(user)},
+        "recipient": {"id": "28:bot", "name": "ReviewAssignBot"},
+        "conversation": {"id": f"conversation-{user}"},
+        "channelData": {"team": {"id": TEAM_ID}, "channel": {"id": CHANNEL_ID}},
+    }
+    activity.update(fields)
+    return activity
+
+
+def _submission(rng: random.Random, members: int, named_reviewers: int, number_of_reviewers: int) -> Dict:
+    reviewers = [member_name(rng.randrange(members)).split(" ")[1] for _ in range(named_reviewers)]
+    return {
+        "WI": str(rng.randrange(100000)),
+        "ReviewLink": "https://dev.azure.com/benchmark/pullrequest/1",
+        "Description": "Synthetic review",
+        "Reviewers": ", ".join(reviewers),
+        "TaskGroup": f"Group{rng.randrange(max(1, members // GROUP_SIZE))}",
+        "NumberOfReviewers": str(number_of_reviewers),
+    }
+
+
+def show(rng: random.Random, members: int) -> Dict:
+    return _activity(rng, members, text="show")
+
+
+def addme(rng: random.Random, members: int) -> Dict:
+    return _activity(rng, members, text="addme")
+
+
+def syncroster(rng: random.Random, members: int) -> Dict:
+    return _activity(rng, members, text="syncroster")
+
+
+def submitpr_reviewers(rng: random.Random, members: int) -> Dict:
+    return _activity(rng, members, value=dict(_submission(rng, members, 2, 0), action="submitpr"), replyToId="card-1")
+
+
+def submitpr_task_group(rng: random.Random, members: int) -> Dict:
+    data = _submission(rng, members, 0, 2)
+    data["Reviewers"] = ""
+    return _activity(rng, members, value=dict(data, action="submitpr"), replyToId="card-1")
+
+
+def messaging_extension_submit(rng: random.Random, members: int) -> Dict:
+    return _activity(
+        rng,
+        members,
+        type="invoke",
+        name="composeExtension/submitAction",
+        value={"commandId": "submitPR", "data": _submission(rng, members, 1, 1)},
+    )
+
+
+SCENARIOS: Dict[str, Callable[[random.Random, int], Dict]] = {
+    "show": show,
+    "addme": addme,
+    "syncroster": syncroster,
+    "submitpr_reviewers": submitpr_reviewers,
+    "submitpr_task_group": submitpr_task_group,
+    "messaging_extension_submit": messaging_extension_submit,
+}
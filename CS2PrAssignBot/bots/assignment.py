@@ -0,0 +1,204 @@
+from typing import Callable, Collection, Deque, Dict, Iterable, List, Optional, Tuple
+from collections import deque
+import abc
+import heapq
+import random
+import time
+
+
+RECENT_ASSIGNMENT_WINDOW = 14 * 24 * 60 * 60
+# Candidates must be at least 1/LOAD_ORDER_MIN_SHARE of the tracked
+# reviewers to be picked off the shared load heap.
+LOAD_ORDER_MIN_SHARE = 4
+
+
+class ReviewerLoadTracker:
+    """
+    Remembers when each reviewer was assigned a review. A reviewer's load is
+    the number of assignments inside the recent window.
+
+    Tracked reviewers are also kept in a heap ordered by load, ties in a
+    random order drawn when the load last changed, so least_loaded() pops
+    the k least loaded instead of ranking every candidate. Entries are
+    never updated in place: every change pushes a new one and bumps the
+    reviewer's version, and entries with an old version are dropped when
+    they come up. Assignments leaving the window sit in a second heap by
+    expiry time and are applied before every pick.
+
+    clock gives the current time when callers don't, which lets a simulation
+    run on its own time line.
+    """
+
+    def __init__(
+        self,
+        assignments: Optional[Dict[str, List[float]]] = None,
+        window: float = RECENT_ASSIGNMENT_WINDOW,
+        clock: Callable[[], float] = time.time,
+        rng: Optional[random.Random] = None,
+    ):
+        self._window = window
+        self.now = clock
+        self._rng = rng or random.Random()
+        self._assignments: Dict[str, Deque[float]] = {}
+        # (load, tie-breaker, version, reviewer)
+        self._order: List[Tuple[int, float, int, str]] = []
+        self._versions: Dict[str, int] = {}
+        # (time an assignment leaves the window, reviewer)
+        self._expiries: List[Tuple[float, str]] = []
+        self.replace(assignments or {})
+
+    def replace(self, assignments: Dict[str, List[float]]):
+        self._assignments = {reviewer: deque(sorted(timestamps)) for reviewer, timestamps in assignments.items()}
+        self._expiries = [
+            (assigned_at + self._window, reviewer) for reviewer, timestamps in self._assignments.items() for assigned_at in timestamps
+        ]
+        heapq.heapify(self._expiries)
+        self._order = []
+        for reviewer in sorted(set(self._versions) | set(self._assignments)):
+            self._push(reviewer)
+
+    @property
+    def tracked(self) -> int:
+        return len(self._versions)
+
+    def track(self, reviewers: Iterable[str]):
+        """Adds reviewers to the load order, e.g. every member of a team, so ones never assigned come first."""
+        # Sorted so a seeded rng hands out the same tie-breakers in every process.
+        for reviewer in sorted(set(reviewers).difference(self._versions)):
+            self._push(reviewer)
+
+    def load(self, reviewer: str, now: Optional[float] = None) -> int:
+        timestamps = self._assignments.get(reviewer)
+        if not timestamps:
+            return 0
+
+        expired_before = (now or self.now()) - self._window
+        while timestamps and timestamps[0] < expired_before:
+            timestamps.popleft()
+        return len(timestamps)
+
+    def next_expiry(self, reviewer: str, now: Optional[float] = None) -> Optional[float]:
+        """When the oldest assignment still counted in the reviewer's load leaves the window."""
+        if not self.load(reviewer, now):
+            return None
+        return self._assignments[reviewer][0] + self._window
+
+    def record(self, reviewers: Iterable[str], now: Optional[float] = None):
+        now = now or self.now()
+        for reviewer in reviewers:
+            self._assignments.setdefault(reviewer, deque()).append(now)
+            heapq.heappush(self._expiries, (now + self._window, reviewer))
+            self._push(reviewer)
+
+    def unrecord(self, reviewers: Iterable[str], at: float):
+        """Takes back assignments record() made at the given time, e.g. for a review that failed to post."""
+        for reviewer in reviewers:
+            timestamps = self._assignments.get(reviewer)
+            if timestamps and at in timestamps:
+                timestamps.remove(at)
+                self._push(reviewer)
+
+    def least_loaded(self, number: int, candidates: Collection[str], now: Optional[float] = None) -> List[str]:
+        """
+        Up to number of the candidates, least loaded first; every candidate
+        must have been tracked or recorded. Costs O((number + reviewers
+        ahead of them that aren't candidates) log n), so it suits candidates
+        that make up most of the tracked reviewers.
+        """
+        self._expire(now or self.now())
+
+        picked: List[str] = []
+        popped: List[Tuple[int, float, int, str]] = []
+        while self._order and len(picked) < number:
+            entry = heapq.heappop(self._order)
+            if entry[2] != self._versions.get(entry[3]):
+                continue
+            popped.append(entry)
+            if entry[3] in candidates:
+                picked.append(entry[3])
+        for entry in popped:
+            heapq.heappush(self._order, entry)
+        return picked
+
+    def _push(self, reviewer: str):
+        version = self._versions[reviewer] = self._versions.get(reviewer, 0) + 1
+        heapq.heappush(self._order, (len(self._assignments.get(reviewer, ())), self._rng.random(), version, reviewer))
+        if len(self._order) > 2 * len(self._versions) + 64:
+            # Mostly dropped entries by now; keep the live one of every reviewer.
+            self._order = [entry for entry in self._order if entry[2] == self._versions[entry[3]]]
+            heapq.heapify(self._order)
+
+    def _expire(self, now: float):
+        # load() may have dropped the expired timestamps already, so every
+        # reviewer with one gets a fresh entry either way.
+        expired = set()
+        while self._expiries and self._expiries[0][0] < now:
+            expired.add(heapq.heappop(self._expiries)[1])
+        for reviewer in sorted(expired):
+            self.load(reviewer, now)
+            self._push(reviewer)
+
+    def to_dict(self) -> Dict[str, List[float]]:
+        return {reviewer: list(timestamps) for reviewer, timestamps in self._assignments.items() if timestamps}
+
+
+class AssignmentStrategy(abc.ABC):
+    @abc.abstractmethod
+    def pick(self, number: int, candidates: Collection[str]) -> List[str]:
+        """Up to number reviewers out of candidates."""
+
+
+class RandomAssignmentStrategy(AssignmentStrategy):
+    """Uniformly random reviewers, ignoring load."""
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self._rng = rng or random.Random()
+
+    def pick(self, number: int, candidates: Collection[str]) -> List[str]:
+        if number <= 0:
+            return []
+        return self._rng.sample(list(candidates), min(number, len(candidates)))
+
+
+class LoadAwareAssignmentStrategy(AssignmentStrategy):
+    """
+    Least-loaded reviewers first, ties broken at random. Popped off the load
+    tracker's heap when the candidates are most of the tracked reviewers;
+    a small group, or one asked for all its members, is cheaper to rank on
+    its own.
+    """
+
+    def __init__(self, load_tracker: ReviewerLoadTracker, rng: Optional[random.Random] = None):
+        self._load_tracker = load_tracker
+        self._rng = rng or random.Random()
+
+    def pick(self, number: int, candidates: Collection[str]) -> List[str]:
+        if number <= 0:
+            return []
+
+        if number < len(candidates) and len(candidates) * LOAD_ORDER_MIN_SHARE >= self._load_tracker.tracked:
+            return self._load_tracker.least_loaded(number, candidates)
+
+        now = self._load_tracker.now()
+        heap = [(self._load_tracker.load(member, now), self._rng.random(), member) for member in candidates]
+        heapq.heapify(heap)
+
+        return [heapq.heappop(heap)[2] for _ in range(min(number, len(heap)))]
+
+
+ASSIGNMENT_STRATEGIES = {
+    "random": lambda load_tracker, rng: RandomAssignmentStrategy(rng),
+    "load_aware": LoadAwareAssignmentStrategy,
+}
+DEFAULT_ASSIGNMENT_STRATEGY = "load_aware"
+
+
+def create_assignment_strategy(
+    name: Optional[str],
+    load_tracker: ReviewerLoadTracker,
+    rng: Optional[random.Random] = None,
+) -> AssignmentStrategy:
+    name = (name or DEFAULT_ASSIGNMENT_STRATEGY).strip().lower()
+    if name not in ASSIGNMENT_STRATEGIES:
+        raise ValueError(f"Unknown assignment strategy {name}, expected one of {', '.join(ASSIGNMENT_STRATEGIES)}.")
+    return ASSIGNMENT_STRATEGIES[name](load_tracker, rng)
@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+import heapq
+
+from bots.assignment import AssignmentStrategy, ReviewerLoadTracker
+
+
+# Key of the pool made of every member of every group.
+GENERAL_POOL = None
+
+_CAPACITY = "capacity"
+
+
+def _parse_time(value: str, end_of_day: bool) -> float:
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        # A plain date as the end of a window means the whole day.
+        parsed += timedelta(days=1)
+    return parsed.timestamp()
+
+
+def parse_out_of_office(out_of_office: Any, config_file: str) -> Dict[str, List[Tuple[float, float]]]:
+    """
+    {member: [[from, to], ...]} with ISO dates or date-times, to inclusive
+    for plain dates, as (start, end) timestamps. Raises ValueError.
+    """
+    if out_of_office is None:
+        return {}
+    if not isinstance(out_of_office, Mapping):
+        raise ValueError(f"{config_file}: out_of_office must be an object of member name to [from, to] windows")
+
+    windows = {}
+    for member, member_windows in out_of_office.items():
+        parsed = []
+        for window in member_windows if isinstance(member_windows, Sequence) else [None]:
+            try:
+                start, end = _parse_time(window[0], False), _parse_time(window[1], True)
+            except (TypeError, ValueError, IndexError, KeyError):
+                raise ValueError(f"{config_file}: out_of_office for {member} must be a list of [from, to] ISO dates") from None
+            if end <= start:
+                raise ValueError(f"{config_file}: out_of_office window {window[0]} - {window[1]} for {member} ends before it starts")
+            parsed.append((start, end))
+        windows[member] = parsed
+    return windows
+
+
+def parse_reviewer_capacity(capacity: Any, config_file: str) -> Dict[str, int]:
+    """{member or "default": max reviews in the recent window}, 0 meaning no limit. Raises ValueError."""
+    if capacity is None:
+        return {}
+    if not isinstance(capacity, Mapping) or not all(
+        isinstance(limit, int) and not isinstance(limit, bool) and limit >= 0 for limit in capacity.values()
+    ):
+        raise ValueError(f"{config_file}: reviewer_capacity must be an object of member name (or default) to a non-negative number")
+    return dict(capacity)
+
+
+class ReviewerAvailability:
+    """
+    Eligible reviewers of every task group, kept as sets.
+
+    A member drops out of every pool they belong to while an out-of-office
+    window is open or while their load in the recent window is at their
+    capacity, and comes back once the last reason is gone. Window starts and
+    ends and the moments an assignment leaves the recent window are kept in
+    a heap, so refresh() only touches the members whose state changes.
+    """
+
+    def __init__(
+        self,
+        groups: Mapping[str, Sequence[str]],
+        out_of_office: Dict[str, List[Tuple[float, float]]],
+        capacity: Dict[str, int],
+        load_tracker: ReviewerLoadTracker,
+        now: Optional[float] = None,
+    ):
+        self._load_tracker = load_tracker
+        now = now or load_tracker.now()
+        self._default_capacity = capacity.get("default", 0)
+        self._capacity = {member: limit for member, limit in capacity.items() if member != "default"}
+
+        self._pools: Dict[Optional[str], Set[str]] = {GENERAL_POOL: set()}
+        self._member_pools: Dict[str, Set[Optional[str]]] = {}
+        for group_name, members in groups.items():
+            self._pools[group_name] = set(members)
+            self._pools[GENERAL_POOL].update(members)
+            for member in members:
+                self._member_pools.setdefault(member, {GENERAL_POOL}).add(group_name)
+
+        # member -> reasons it's blocked: a window index or _CAPACITY
+        self._blocked: Dict[str, Set[Any]] = {}
+        # (at, member, reason, blocks) in time order
+        self._events: List[Tuple[float, str, Any, bool]] = []
+
+        for member, windows in out_of_office.items():
+            if member not in self._member_pools:
+                continue
+            for index, (start, end) in enumerate(windows):
+                if end > now:
+                    self._events.append((start, member, index, True))
+                    self._events.append((end, member, index, False))
+        heapq.heapify(self._events)
+
+        for member in self._member_pools:
+            if not self.has_capacity(member, now):
+                self._block_for_capacity(member, now)
+
+        self.refresh(now)
+
+    def refresh(self, now: Optional[float] = None):
+        now = now or self._load_tracker.now()
+        while self._events and self._events[0][0] <= now:
+            _, member, reason, blocks = heapq.heappop(self._events)
+            if reason == _CAPACITY:
+                self._unblock(member, _CAPACITY)
+                if not self.has_capacity(member, now):
+                    self._block_for_capacity(member, now)
+            elif blocks:
+                self._block(member, reason)
+            else:
+                self._unblock(member, reason)
+
+    def pool(self, group_name: Optional[str] = GENERAL_POOL) -> Set[str]:
+        """The currently eligible members of a group; read-only, copy before changing it."""
+        return self._pools.get(group_name, set())
+
+    def is_available(self, member: str) -> bool:
+        return member not in self._blocked
+
+    def has_capacity(self, member: str, now: Optional[float] = None) -> bool:
+        limit = self._capacity.get(member, self._default_capacity)
+        return not limit or self._load_tracker.load(member, now) < limit
+
+    def note_assigned(self, reviewers: Iterable[str], now: Optional[float] = None):
+        now = now or self._load_tracker.now()
+        for reviewer in reviewers:
+            if reviewer in self._member_pools and not self.has_capacity(reviewer, now):
+                self._block_for_capacity(reviewer, now)
+
+    def note_unassigned(self, reviewers: Iterable[str], now: Optional[float] = None):
+        now = now or self._load_tracker.now()
+        for reviewer in reviewers:
+            if reviewer in self._member_pools and self.has_capacity(reviewer, now):
+                # The re-check event already queued finds nothing left to do.
+                self._unblock(reviewer, _CAPACITY)
+
+    def pick(self, strategy: AssignmentStrategy, number: int, candidates: Set[str], now: Optional[float] = None) -> List[str]:
+        """
+        Up to number reviewers chosen by strategy from candidates. Load can
+        also grow behind our back (other workers), so the chosen ones are
+        checked against their capacity and replaced when they're full.
+        """
+        now = now or self._load_tracker.now()
+        picked: List[str] = []
+        candidates = set(candidates)
+        while len(picked) < number and candidates:
+            chosen = strategy.pick(number - len(picked), candidates)
+            candidates.difference_update(chosen)
+            for member in chosen:
+                if self.has_capacity(member, now):
+                    picked.append(member)
+                else:
+                    self._block_for_capacity(member, now)
+        return picked
+
+    def _block_for_capacity(self, member: str, now: float):
+        if _CAPACITY in self._blocked.get(member, ()):
+            return
+        self._block(member, _CAPACITY)
+        # Check again once the oldest counted assignment leaves the window.
+        heapq.heappush(self._events, (self._load_tracker.next_expiry(member, now) or now, member, _CAPACITY, False))
+
+    def _block(self, member: str, reason: Any):
+        reasons = self._blocked.setdefault(member, set())
+        if not reasons:
+            for pool_name in self._member_pools.get(member, ()):
+                self._pools[pool_name].discard(member)
+        reasons.add(reason)
+
+    def _unblock(self, member: str, reason: Any):
+        reasons = self._blocked.get(member)
+        if not reasons:
+            return
+        reasons.discard(reason)
+        if not reasons:
+            del self._blocked[member]
+            for pool_name in self._member_pools.get(member, ()):
+                self._pools[pool_name].add(member)
@@ -0,0 +1,48 @@
+from typing import Dict, List
+
+
+BATCH_COMMAND = "submitbatch"
+BATCH_MAX_ENTRIES = 100
+
+# Fields of a batch line in order, separated by "|". Only WI is required.
+BATCH_ENTRY_FIELDS = ("WI", "ReviewLink", "Description", "TaskGroup", "NumberOfReviewers", "Reviewers")
+BATCH_ENTRY_DEFAULTS = {
+    "ReviewLink": "",
+    "Description": "",
+    "TaskGroup": "General",
+    "NumberOfReviewers": "1",
+    "Reviewers": "",
+}
+
+
+def parse_batch_text(text: str) -> List[Dict]:
+    """
+    Parses a "submitbatch" message into submission dicts, one per line:
+
+        submitbatch
+        WI | ReviewLink | Description | TaskGroup | NumberOfReviewers | Reviewers
+
+    Reviewers is last so it may contain the commas the single submission
+    form already accepts.
+    """
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.lower().startswith(BATCH_COMMAND):
+            continue
+
+        values = [value.strip() for value in line.split("|", len(BATCH_ENTRY_FIELDS) - 1)]
+        entries.append(normalize_batch_entry(dict(zip(BATCH_ENTRY_FIELDS, values))))
+    return entries
+
+
+def normalize_batch_entry(entry: Dict) -> Dict:
+    entry = {key: str(value) for key, value in entry.items() if value not in (None, "")}
+
+    normalized = dict(BATCH_ENTRY_DEFAULTS)
+    if entry.get("Reviewers") and "NumberOfReviewers" not in entry:
+        # Named reviewers only, unless extra random ones are asked for.
+        normalized["NumberOfReviewers"] = "0"
+    normalized.update(entry)
+    normalized.setdefault("WI", "")
+    return normalized
@@ -1,63 +1,159 @@
-from typing import Dict, List, Union
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Union
+import json
 
 from botbuilder.schema import ChannelAccount
 from botbuilder.schema.teams import TeamsChannelAccount
 
+from bots.member_store import SavedMemberStore
+from bots.metrics import REGISTRY, timed
+from bots.team_config import TeamConfig
 
+
+# Static card sections are built once and shared between cards, only the
+# variable fields are filled per turn. Cards are treated as read-only once
+# constructed, so the shared blocks must never be mutated.
+_CARD_HEADER = {
+    "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+    "type": "AdaptiveCard",
+    "version": "1.3",
+}
+
+_TEXT_BLOCK_PLACEHOLDER = {
+    "type": "TextBlock",
+    "text": " ",
+}
+
+_SELECT_REVIEWERS_INPUTS = (
+    {
+        "type": "TextBlock",
+        "text": "Select reviewers",
+        "weight": "bolder",
+    },
+    {
+        "type": "Input.Text",
+        "id": "Reviewers",
+        "placeholder": "Assign to specified reviewers, separated by comma.",
+    },
+    _TEXT_BLOCK_PLACEHOLDER,
+    _TEXT_BLOCK_PLACEHOLDER,
+    _TEXT_BLOCK_PLACEHOLDER,
+    {
+        "type": "TextBlock",
+        "text": "Or, select task group to randomly choose reviewers from",
+        "weight": "bolder",
+    },
+    {
+        "type": "Input.Number",
+        "label": "Number of Reviewers",
+        "id": "NumberOfReviewers",
+        "placeholder": "0 - Default Number of Reviewers",
+        "min": 0,
+        "max": 100,
+        "value": 0,
+        "errorMessage": "Wrong",
+    },
+)
+
+_GENERAL_GROUP_CHOICE = {
+    "title": "General",
+    "value": "General"
+}
+
+_SPECIFIED_REVIEWERS_TITLE = {
+    "type": "TextBlock",
+    "text": "Specified reviewers",
+    "weight": "bolder",
+}
+
+_SELECTED_GROUP_TITLE = {
+    "type": "TextBlock",
+    "text": "Selected task group",
+    "weight": "bolder",
+}
+
+_DELETE_CARD_ACTIONS = (
+    {
+        "type": "Action.Submit",
+        "title": "Delete",
+        "data": {
+            "action": "deletethiscard"
+        }
+    },
+)
+
+# Compact cards space blocks with spacing/separator instead of filler
+# TextBlocks and list a group's members in one TextBlock.
+_SELECT_REVIEWERS_INPUTS_COMPACT = (
+    dict(_SELECT_REVIEWERS_INPUTS[0], spacing="extraLarge"),
+    _SELECT_REVIEWERS_INPUTS[1],
+    dict(_SELECT_REVIEWERS_INPUTS[5], spacing="extraLarge", separator=True),
+    _SELECT_REVIEWERS_INPUTS[6],
+)
+
+_SPECIFIED_REVIEWERS_TITLE_COMPACT = dict(_SPECIFIED_REVIEWERS_TITLE, spacing="extraLarge")
+_SELECTED_GROUP_TITLE_COMPACT = dict(_SELECTED_GROUP_TITLE, spacing="extraLarge")
+
+GROUP_INFO_CARD_CACHE_SIZE = 64
+
+# Teams rejects messages over about 28 KB, attachments included.
+CARD_PAYLOAD_LIMIT = 28 * 1024
+CARD_PAYLOAD_BUCKETS = (1024, 2048, 4096, 8192, 16384, CARD_PAYLOAD_LIMIT, 65536, 131072)
+
+CARD_PAYLOAD_BYTES = REGISTRY.histogram(
+    "prassignbot_card_payload_bytes",
+    "Serialized size of the cards built, per card type.",
+    CARD_PAYLOAD_BUCKETS,
+)
+CARDS_OVER_LIMIT = REGISTRY.counter(
+    "prassignbot_cards_over_limit_total",
+    "Cards built over the payload limit, per card type.",
+)
+
+
+def _new_card(body: List[Dict]) -> Dict:
+    card = dict(_CARD_HEADER)
+    card["body"] = body
+    return card
+
+
+def card_payload_size(card: Dict) -> int:
+    return len(json.dumps(card, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def _record_payload_size(card_type: str, card: Dict) -> int:
+    size = card_payload_size(card)
+    CARD_PAYLOAD_BYTES.observe(size, card=card_type)
+    if size > CARD_PAYLOAD_LIMIT:
+        CARDS_OVER_LIMIT.inc(card=card_type)
+    return size
+
+
+@timed("card.select_group")
 def construct_select_group_card(
-    WI: str, 
+    WI: str,
     review_link: str,
     description: str,
     reviewers: str,
     task_groups: List[str],
     selected: bool,
+    compact: bool = False,
 ):
-    select_group_card = {
-        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-        "type": "AdaptiveCard",
-        "version": "1.3",
-        "body": [
-            _review_basic_info(WI, review_link, description),
-            _text_block_placeholder(),
-            _text_block_placeholder(),
-            _text_block_placeholder(),
-        ]
-    }
-
-    if not selected:
-        select_group_card["body"].extend(
+    if compact:
+        select_group_card = _new_card([_review_basic_info(WI, review_link, description)])
+    else:
+        select_group_card = _new_card(
             [
-                {
-                    "type": "TextBlock",
-                    "text": "Select reviewers",
-                    "weight": "bolder",
-                },
-                {
-                    "type": "Input.Text",
-                    "id": "Reviewers",
-                    "placeholder": "Assign to specified reviewers, separated by comma.",
-                },
-                _text_block_placeholder(),
-                _text_block_placeholder(),
-                _text_block_placeholder(),
-                {
-                    "type": "TextBlock",
-                    "text": "Or, select task group to randomly choose reviewers from",
-                    "weight": "bolder",
-                },
-                {
-                    "type": "Input.Number",
-                    "label": "Number of Reviewers",
-                    "id": "NumberOfReviewers",
-                    "placeholder": "0 - Default Number of Reviewers",
-                    "min": 0,
-                    "max": 100,
-                    "value": 0,
-                    "errorMessage": "Wrong",
-                }
+                _review_basic_info(WI, review_link, description),
+                _TEXT_BLOCK_PLACEHOLDER,
+                _TEXT_BLOCK_PLACEHOLDER,
+                _TEXT_BLOCK_PLACEHOLDER,
             ]
         )
 
+    if not selected:
+        select_group_card["body"].extend(_SELECT_REVIEWERS_INPUTS_COMPACT if compact else _SELECT_REVIEWERS_INPUTS)
+
         _construct_unselect_group_choice_set(select_group_card, task_groups)
 
         select_group_card["actions"] = [
@@ -76,47 +172,32 @@ def construct_select_group_card(
         assert (len(reviewers.strip()) > 0 or len(task_groups) > 0 and len(task_groups[0]) > 0), "At least specify one of Reviewers or TaskGroup."
 
         if len(reviewers) > 0:
-            _construct_selected_reviewers(select_group_card, reviewers)
-        
+            _construct_selected_reviewers(select_group_card, reviewers, compact)
+
         if len(task_groups) > 0:
-            _construct_selected_group(select_group_card, task_groups)
+            _construct_selected_group(select_group_card, task_groups, compact)
 
+    _record_payload_size("select_group", select_group_card)
     return select_group_card
 
 def _construct_unselect_group_choice_set(select_group_card: Dict, task_groups):
-    choices_set = {
-        "type": "Input.ChoiceSet",
-        "label": "Task Group",
-        "id": "TaskGroup",
-        "style": "expanded",
-        "isMultiSelect": False,
-        "choices": [
-            {
-                "title": "General",
-                "value": "General"
-            },
-        ]
-    }
+    choices = [_GENERAL_GROUP_CHOICE]
+    choices.extend({"title": group, "value": group} for group in task_groups)
 
-    for group in task_groups:
-        choices_set["choices"].append(
-            {
-                "title": group,
-                "value": group,
-            }
-        )
-
-    select_group_card["body"].append(choices_set)
-
-def _construct_selected_reviewers(select_group_card: Dict, reviewers):
     select_group_card["body"].append(
         {
-            "type": "TextBlock",
-            "text": "Specified reviewers",
-            "weight": "bolder",
+            "type": "Input.ChoiceSet",
+            "label": "Task Group",
+            "id": "TaskGroup",
+            "style": "expanded",
+            "isMultiSelect": False,
+            "choices": choices,
         }
     )
 
+def _construct_selected_reviewers(select_group_card: Dict, reviewers, compact: bool = False):
+    select_group_card["body"].append(_SPECIFIED_REVIEWERS_TITLE_COMPACT if compact else _SPECIFIED_REVIEWERS_TITLE)
+
     select_group_card["body"].append(
         {
             "type": "TextBlock",
@@ -126,14 +207,21 @@ def _construct_selected_reviewers(select_group_card: Dict, reviewers):
         },
     )
 
-def _construct_selected_group(select_group_card: Dict, task_groups):
-    select_group_card["body"].append(
-        {
-            "type": "TextBlock",
-            "text": "Selected task group",
-            "weight": "bolder",
-        }
-    )
+def _construct_selected_group(select_group_card: Dict, task_groups, compact: bool = False):
+    if compact:
+        select_group_card["body"].append(_SELECTED_GROUP_TITLE_COMPACT)
+        select_group_card["body"].append(
+            {
+                "type": "TextBlock",
+                "text": ", ".join(task_groups),
+                "color": "accent",
+                "weight": "bolder",
+                "wrap": True,
+            },
+        )
+        return
+
+    select_group_card["body"].append(_SELECTED_GROUP_TITLE)
 
     for task_group in task_groups:
         select_group_card["body"].append(
@@ -145,39 +233,37 @@ def _construct_selected_group(select_group_card: Dict, task_groups):
             },
         )
 
+@timed("card.review_submit")
 def construct_review_submit_form(
-    WI: str, 
+    WI: str,
     review_link: str,
     description: str,
     reviewee: Union[ChannelAccount, TeamsChannelAccount],
     reviewers: List[str],
-    saved_members: List[Dict],
-): 
-    review_card = {
-        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-        "type": "AdaptiveCard",
-        "version": "1.3",
-        "body": [
-            _review_basic_info(WI, review_link, description),
-            _text_block_placeholder(),
-        ],
-        "actions": [
-            {
-                "type": "Action.Submit",
-                "title": "Delete",
-                "data": {
-                    "action": "deletethiscard"
-                }
-            }
-        ]
-    }
+    saved_members: SavedMemberStore,
+    compact: bool = False,
+):
+    if compact:
+        review_card = _new_card([_review_basic_info(WI, review_link, description)])
+    else:
+        review_card = _new_card(
+            [
+                _review_basic_info(WI, review_link, description),
+                _TEXT_BLOCK_PLACEHOLDER,
+            ]
+        )
+    review_card["actions"] = list(_DELETE_CARD_ACTIONS)
 
     _add_review_info(review_card, reviewee, reviewers, saved_members)
 
-    review_card["body"].extend(
-        [_text_block_placeholder(), _text_block_placeholder()]
-    )
+    if compact:
+        review_card["body"][-1]["spacing"] = "large"
+    else:
+        review_card["body"].extend(
+            [_TEXT_BLOCK_PLACEHOLDER, _TEXT_BLOCK_PLACEHOLDER]
+        )
 
+    _record_payload_size("review_submit", review_card)
     return review_card
 
 
@@ -185,7 +271,7 @@ def _add_review_info(
     review_card: Dict,
     reviewee: Union[ChannelAccount, TeamsChannelAccount],
     reviewers: List[str],
-    saved_members: List[Dict],
+    saved_members: SavedMemberStore,
 ):
     review_info = {
         "type": "FactSet",
@@ -216,23 +302,20 @@ def _add_review_info(
         if len(reviewer_string) > 0:
             reviewer_string += ","
 
-        saved = False
-        for saved_member in saved_members:
-            if saved_member["name"] == reviewer:
-                mentions["entities"].append(
-                    {
-                        "type": "mention",
-                        "text": "<at>{}</at>".format(reviewer),
-                        "mentioned": {
-                            "id": saved_member["id"],
-                            "name": reviewer
-                        }
+        saved_member = saved_members.get_by_name(reviewer)
+        if saved_member:
+            mentions["entities"].append(
+                {
+                    "type": "mention",
+                    "text": "<at>{}</at>".format(reviewer),
+                    "mentioned": {
+                        "id": saved_member["id"],
+                        "name": reviewer
                     }
-                )
-                reviewer_string += " <at>{}</at>".format(reviewer)
-                saved = True
-                break
-        if not saved:
+                }
+            )
+            reviewer_string += " <at>{}</at>".format(reviewer)
+        else:
             reviewer_string += " " + reviewer
 
     review_info["facts"].append(
@@ -244,28 +327,35 @@ def _add_review_info(
         }
     )
 
-    review_card["body"].append(review_info)    
+    review_card["body"].append(review_info)
     review_card["msteams"] = mentions
-        
-
-def construct_group_info_card(task_groups: Dict, saved_members: List[Dict]):
-    group_info_card = {
-        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-        "type": "AdaptiveCard",
-        "version": "1.3",
-        "body": [
+
+
+@timed("card.group_info")
+def construct_group_info_card(team_config: TeamConfig, saved_members: SavedMemberStore, compact: bool = False):
+    if compact:
+        group_info_card = _construct_compact_group_info_card(team_config, saved_members, list_members=True)
+        if _record_payload_size("group_info", group_info_card) > CARD_PAYLOAD_LIMIT:
+            # Too big to post even compacted: show group sizes only.
+            group_info_card = _construct_compact_group_info_card(team_config, saved_members, list_members=False)
+            _record_payload_size("group_info_summary", group_info_card)
+        return group_info_card
+
+    group_info_card = _new_card(
+        [
             {
                 "type": "TextBlock",
                 "size": "large",
                 "weight": "bolder",
-                "text": "{} Task Groups".format(task_groups.get("team_name", "")),
+                "text": "{} Task Groups".format(team_config.team_name),
             },
-            _text_block_placeholder(),
-            _text_block_placeholder(),
-        ],
-    }
+            _TEXT_BLOCK_PLACEHOLDER,
+            _TEXT_BLOCK_PLACEHOLDER,
+        ]
+    )
 
-    for group_name, group_members in task_groups.get("groups", {}).items():
+    for group_name, group in team_config.groups.items():
+        group_members = group.members
         group_info = {
             "type": "Container",
             "items": [
@@ -285,21 +375,103 @@ def construct_group_info_card(task_groups: Dict, saved_members: List[Dict]):
                 "spacing": "small",
                 "color": "accent",
             }
-            if _is_saved_member(member_name, saved_members):
+            if saved_members.has_name(member_name):
                 member["weight"] = "bolder"
 
             group_info["items"].append(member)
 
         group_info_card["body"].append(group_info)
-        group_info_card["body"].append(_text_block_placeholder())
+        group_info_card["body"].append(_TEXT_BLOCK_PLACEHOLDER)
 
+    _record_payload_size("group_info", group_info_card)
     return group_info_card
 
-def _is_saved_member(member_name: str, saved_members: List[Dict]):
-    for saved_member in saved_members:
-        if saved_member["name"] == member_name:
-            return True
-    return False
+
+def _construct_compact_group_info_card(team_config: TeamConfig, saved_members: SavedMemberStore, list_members: bool) -> Dict:
+    group_info_card = _new_card(
+        [
+            {
+                "type": "TextBlock",
+                "size": "large",
+                "weight": "bolder",
+                "text": "{} Task Groups".format(team_config.team_name),
+            },
+        ]
+    )
+    if not list_members:
+        group_info_card["body"].append(
+            {
+                "type": "TextBlock",
+                "text": "Too many members to list, showing group sizes only.",
+                "isSubtle": True,
+                "wrap": True,
+            }
+        )
+
+    for index, (group_name, group) in enumerate(team_config.groups.items()):
+        group_members = group.members
+        group_info = {
+            "type": "Container",
+            "spacing": "extraLarge" if index == 0 else "large",
+            "separator": index > 0,
+            "items": [
+                {
+                    "type": "TextBlock",
+                    "size": "medium",
+                    "weight": "bolder",
+                    "text": "{} ({})".format(group_name, len(group_members))
+                }
+            ],
+        }
+
+        if list_members and group_members:
+            # Saved members are bold, as in the full card.
+            group_info["items"].append(
+                {
+                    "type": "TextBlock",
+                    "text": ", ".join(
+                        "**{}**".format(member_name) if saved_members.has_name(member_name) else member_name
+                        for member_name in group_members
+                    ),
+                    "spacing": "small",
+                    "color": "accent",
+                    "wrap": True,
+                }
+            )
+
+        group_info_card["body"].append(group_info)
+
+    return group_info_card
+
+
+class CardCache:
+    """
+    Fully built cards keyed by the versions of the data they were built
+    from, e.g. (config version, saved-members version) for the group info
+    card. A version bump produces a new key; stale keys fall out of the LRU.
+    """
+
+    def __init__(self, max_size: int = GROUP_INFO_CARD_CACHE_SIZE):
+        self._max_size = max_size
+        self._cards: "OrderedDict[Hashable, Dict]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Dict]) -> Dict:
+        card = self._cards.get(key)
+        if card is not None:
+            self._cards.move_to_end(key)
+            self.hits += 1
+            return card
+
+        self.misses += 1
+        card = build()
+        self._cards[key] = card
+        if len(self._cards) > self._max_size:
+            self._cards.popitem(last=False)
+        return card
+
 
 def _review_basic_info(WI: str, link: str, description: str) -> Dict:
     return {
@@ -324,10 +496,3 @@ def _review_basic_info(WI: str, link: str, description: str) -> Dict:
             },
         ]
     }
-
-def _text_block_placeholder() -> Dict:
-    return {
-        "type": "TextBlock",
-        "text": " ",
-    }
-
@@ -0,0 +1,115 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import sys
+import time
+
+from botbuilder.core import BotAdapter
+from botframework.connector.aio import ConnectorClient
+
+
+CONNECTOR_CLIENT_TTL = 30 * 60
+# How long an expired client is kept open for the calls still using it.
+CONNECTOR_CLIENT_CLOSE_DELAY = 5 * 60
+
+
+class ConnectorClientCache:
+    """
+    Connector clients keyed by service URL.
+
+    Reusing a client keeps its HTTP session and app credentials (and with
+    them the cached access token) alive between turns. Entries expire after
+    ttl seconds so a client is rebuilt with fresh credentials periodically.
+
+    BotFrameworkAdapter keeps clients and app credentials of its own, and
+    would hand the same client straight back, so expiring or invalidating
+    an entry also evicts it from the adapter's caches. An invalidated
+    client is closed at once; an expired one close_delay seconds later, as
+    calls started before it expired may still be using it.
+    """
+
+    def __init__(self, ttl: float = CONNECTOR_CLIENT_TTL, close_delay: float = CONNECTOR_CLIENT_CLOSE_DELAY):
+        self._ttl = ttl
+        self._close_delay = close_delay
+        self._clients: Dict[str, Tuple[ConnectorClient, float]] = {}
+        # (close at, client), in the order they expired
+        self._expired_clients: List[Tuple[float, ConnectorClient]] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    async def get(self, adapter: BotAdapter, service_url: str) -> ConnectorClient:
+        now = time.monotonic()
+        if self._expired_clients and self._expired_clients[0][0] <= now:
+            await self._close_expired(now)
+
+        cached = self._clients.get(service_url)
+        if cached:
+            client, created_at = cached
+            if now - created_at < self._ttl:
+                self.hits += 1
+                return client
+            self.expired += 1
+            del self._clients[service_url]
+            for evicted in self._evict(adapter, service_url, client):
+                self._expired_clients.append((now + self._close_delay, evicted))
+
+        self.misses += 1
+        client = await adapter.create_connector_client(service_url)
+        self._clients[service_url] = (client, now)
+        return client
+
+    async def invalidate(self, adapter: BotAdapter, service_url: str):
+        cached = self._clients.pop(service_url, None)
+        await self._close(self._evict(adapter, service_url, cached[0] if cached else None))
+
+    async def _close_expired(self, now: float):
+        due = [client for close_at, client in self._expired_clients if close_at <= now]
+        self._expired_clients = [(close_at, client) for close_at, client in self._expired_clients if close_at > now]
+        await self._close(due)
+
+    async def close(self):
+        clients = [client for client, _ in self._clients.values()] + [client for _, client in self._expired_clients]
+        self._clients.clear()
+        self._expired_clients = []
+        await self._close(clients)
+
+    @staticmethod
+    async def _close(clients: Iterable[ConnectorClient]):
+        closed = set()
+        for client in clients:
+            if id(client) in closed:
+                continue
+            closed.add(id(client))
+            try:
+                # Closes the client's HTTP session; ConnectorClient has no close() of its own.
+                await client.__aexit__(None, None, None)
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"\n [connector_cache] closing a connector client failed: {error}", file=sys.stderr)
+
+    @staticmethod
+    def _evict(adapter: BotAdapter, service_url: str, client: Optional[ConnectorClient]) -> List[ConnectorClient]:
+        """Drops service_url from the adapter's caches; returns the clients no cache holds anymore."""
+        evicted = [client] if client else []
+        clients = getattr(adapter, "_connector_client_cache", {})
+        app_credentials = getattr(adapter, "_app_credential_map", {})
+        # Keyed "service_url:app_id:scope" by BotFrameworkAdapter.key_for_connector_client.
+        for key in [key for key in clients if key.startswith(f"{service_url}:")]:
+            evicted.append(clients.pop(key))
+            credentials = getattr(evicted[-1].config, "credentials", None)
+            for credentials_key in [key for key, value in app_credentials.items() if value is credentials]:
+                del app_credentials[credentials_key]
+        return evicted
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self._clients),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": self.hit_rate,
+        }
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+import hashlib
+import time
+
+from bots.submission import ReviewSubmission
+
+
+DEDUP_TTL = 10 * 60
+DEDUP_MAX_SIZE = 10000
+
+
+class DedupCache:
+    """
+    Bounded LRU of keys seen within the last ttl seconds.
+
+    claim() returns True the first time a key is seen and False for every
+    duplicate until the key expires or is released again.
+    """
+
+    def __init__(self, ttl: float = DEDUP_TTL, max_size: int = DEDUP_MAX_SIZE):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def claim(self, key: Hashable) -> bool:
+        now = time.monotonic()
+        self._expire(now)
+
+        if key in self._seen:
+            self.hits += 1
+            return False
+
+        self.misses += 1
+        self._seen[key] = now
+        if len(self._seen) > self._max_size:
+            self._seen.popitem(last=False)
+        return True
+
+    def release(self, key: Hashable):
+        self._seen.pop(key, None)
+
+    def _expire(self, now: float):
+        # Keys are inserted in time order, so expired ones are at the front.
+        while self._seen:
+            key, claimed_at = next(iter(self._seen.items()))
+            if now - claimed_at < self._ttl:
+                break
+            del self._seen[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._seen), "hits": self.hits, "misses": self.misses}
+
+
+def submission_key(submission: ReviewSubmission, scope: Hashable) -> Optional[Tuple]:
+    """
+    The same PR submitted again within one scope (a team, or a conversation
+    outside of teams); None when the submission names no PR.
+    """
+    wi, link = submission.wi.strip().lower(), submission.link.strip()
+    if not wi and not link:
+        return None
+
+    content = "\n".join([wi, link])
+    return ("submission", scope, hashlib.sha256(content.encode("utf-8")).hexdigest())
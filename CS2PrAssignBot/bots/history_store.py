@@ -0,0 +1,207 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import asyncio
+import sqlite3
+import sys
+import time
+
+
+HISTORY_FLUSH_INTERVAL = 1.0
+SECONDS_PER_DAY = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    team_id TEXT,
+    reviewee TEXT NOT NULL,
+    reviewee_id TEXT,
+    task_group TEXT,
+    wi TEXT,
+    link TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS review_reviewers (
+    review_id INTEGER NOT NULL REFERENCES reviews(id),
+    team_id TEXT,
+    reviewer TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reviewer_daily_load (
+    team_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    reviewer TEXT NOT NULL,
+    reviews INTEGER NOT NULL,
+    PRIMARY KEY (team_id, day, reviewer)
+);
+CREATE INDEX IF NOT EXISTS reviews_reviewee ON reviews (reviewee, created_at);
+CREATE INDEX IF NOT EXISTS review_reviewers_reviewer ON review_reviewers (reviewer, created_at);
+"""
+
+
+class ReviewRecord:
+    __slots__ = ("team_id", "reviewee", "reviewee_id", "reviewers", "task_group", "wi", "link", "created_at")
+
+    def __init__(
+        self,
+        team_id: Optional[str],
+        reviewee: str,
+        reviewee_id: Optional[str],
+        reviewers: List[str],
+        task_group: str,
+        wi: str,
+        link: str,
+        created_at: Optional[float] = None,
+    ):
+        self.team_id = team_id
+        self.reviewee = reviewee
+        self.reviewee_id = reviewee_id
+        self.reviewers = reviewers
+        self.task_group = task_group
+        self.wi = wi
+        self.link = link
+        self.created_at = created_at or time.time()
+
+
+class ReviewHistoryStore:
+    """
+    History of the reviews posted by the bot, in SQLite (WAL mode).
+
+    record() only queues the review; queued reviews are written in one
+    transaction at most flush_interval seconds later, on a dedicated thread
+    that owns the connection, so the event loop never waits on the disk.
+    Queries flush the queue first and run on the same thread. Per-day review
+    counts are kept alongside the raw rows, so team load sums at most one
+    row per reviewer per day instead of scanning every review.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = HISTORY_FLUSH_INTERVAL):
+        self._flush_interval = flush_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="review-history")
+
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+        self._pending: List[ReviewRecord] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def record(self, review: ReviewRecord):
+        self._pending.append(review)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(self._take_pending())
+            return
+
+        if not self._flush_task or self._flush_task.done():
+            self._flush_task = loop.create_task(self._delayed_flush())
+
+    def discard(self, review: ReviewRecord):
+        """Drops a recorded review again, e.g. one whose thread failed to post."""
+        if review in self._pending:
+            self._pending.remove(review)
+            return
+
+        try:
+            asyncio.get_running_loop().run_in_executor(self._executor, self._delete, review)
+        except RuntimeError:
+            self._delete(review)
+
+    async def _delayed_flush(self):
+        # Keeps going while a failed write left reviews queued, so they get
+        # another try even if nothing new is recorded.
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+                return
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"\n [review_history] writing {len(self._pending)} reviews failed, retrying: {error}", file=sys.stderr)
+
+    def _take_pending(self) -> List[ReviewRecord]:
+        pending, self._pending = self._pending, []
+        return pending
+
+    async def flush(self):
+        if not self._pending:
+            return
+        reviews = self._take_pending()
+        try:
+            await self._run(self._write, reviews)
+        except BaseException:
+            # _write is one transaction, so none of them were written; put
+            # them back ahead of anything recorded meanwhile.
+            self._pending[:0] = reviews
+            raise
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _write(self, reviews: List[ReviewRecord]):
+        with self._connection:
+            for review in reviews:
+                cursor = self._connection.execute(
+                    "INSERT INTO reviews (team_id, reviewee, reviewee_id, task_group, wi, link, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (review.team_id, review.reviewee, review.reviewee_id, review.task_group, review.wi, review.link, review.created_at),
+                )
+                self._connection.executemany(
+                    "INSERT INTO review_reviewers (review_id, team_id, reviewer, created_at) VALUES (?, ?, ?, ?)",
+                    [(cursor.lastrowid, review.team_id, reviewer, review.created_at) for reviewer in review.reviewers],
+                )
+                self._connection.executemany(
+                    "INSERT INTO reviewer_daily_load (team_id, day, reviewer, reviews) VALUES (?, ?, ?, 1)"
+                    " ON CONFLICT (team_id, day, reviewer) DO UPDATE SET reviews = reviews + 1",
+                    [(review.team_id or "", int(review.created_at // SECONDS_PER_DAY), reviewer) for reviewer in review.reviewers],
+                )
+
+    def _delete(self, review: ReviewRecord):
+        with self._connection:
+            row = self._connection.execute(
+                "SELECT id FROM reviews WHERE team_id IS ? AND reviewee = ? AND wi = ? AND link = ? AND created_at = ?",
+                (review.team_id, review.reviewee, review.wi, review.link, review.created_at),
+            ).fetchone()
+            if not row:
+                return
+            self._connection.execute("DELETE FROM review_reviewers WHERE review_id = ?", row)
+            self._connection.execute("DELETE FROM reviews WHERE id = ?", row)
+            self._connection.executemany(
+                "UPDATE reviewer_daily_load SET reviews = reviews - 1 WHERE team_id = ? AND day = ? AND reviewer = ?",
+                [(review.team_id or "", int(review.created_at // SECONDS_PER_DAY), reviewer) for reviewer in review.reviewers],
+            )
+
+    async def reviewer_queue(self, reviewer: str, since: float, limit: int = 20) -> List[Tuple]:
+        """(wi, link, reviewee, task_group, created_at) assigned to reviewer, newest first."""
+        await self.flush()
+        return await self._run(self._query, (
+            "SELECT r.wi, r.link, r.reviewee, r.task_group, r.created_at"
+            " FROM review_reviewers rr JOIN reviews r ON r.id = rr.review_id"
+            " WHERE rr.reviewer = ? AND rr.created_at >= ?"
+            " ORDER BY rr.created_at DESC LIMIT ?"
+        ), (reviewer, since, limit))
+
+    async def team_load(self, team_id: Optional[str], since: float) -> List[Tuple]:
+        """(reviewer, number of reviews) for the team since the day of since, busiest first."""
+        await self.flush()
+        return await self._run(self._query, (
+            "SELECT reviewer, SUM(reviews) AS total FROM reviewer_daily_load"
+            " WHERE team_id = ? AND day >= ?"
+            " GROUP BY reviewer ORDER BY total DESC, reviewer"
+        ), (team_id or "", int(since // SECONDS_PER_DAY)))
+
+    def _query(self, sql: str, params: Tuple) -> List[Tuple]:
+        return self._connection.execute(sql, params).fetchall()
+
+    async def close(self):
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+
+        await self.flush()
+        await self._run(self._connection.close)
+        self._executor.shutdown(wait=True)
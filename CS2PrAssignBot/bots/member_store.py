@@ -0,0 +1,55 @@
+from typing import Dict, Iterable, List, Optional
+
+
+class SavedMemberStore:
+    """
+    Saved team members (the ChannelAccount dicts collected by "addme"),
+    indexed by id and by display name.
+    """
+
+    def __init__(self, members: Optional[Iterable[Dict]] = None):
+        self._by_id: Dict[str, Dict] = {}
+        self._by_name: Dict[str, Dict] = {}
+        # Bumped on every change so derived data (e.g. cached cards) can
+        # tell whether it is stale.
+        self.version = 0
+
+        for member in members or []:
+            self.update(member)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def update(self, new_member: Dict):
+        old_member = self._by_id.pop(new_member["id"], None)
+        if old_member and self._by_name.get(old_member.get("name")) is old_member:
+            del self._by_name[old_member["name"]]
+
+        self._by_id[new_member["id"]] = new_member
+        if new_member.get("name"):
+            self._by_name[new_member["name"]] = new_member
+
+        self.version += 1
+
+    def replace(self, members: Iterable[Dict]):
+        """Swaps in another copy of the members, e.g. one saved by another process."""
+        self._by_id.clear()
+        self._by_name.clear()
+        for member in members:
+            self.update(member)
+        self.version += 1
+
+    def get_by_id(self, member_id: str) -> Optional[Dict]:
+        return self._by_id.get(member_id)
+
+    def get_by_name(self, name: str) -> Optional[Dict]:
+        return self._by_name.get(name)
+
+    def has_name(self, name: str) -> bool:
+        return name in self._by_name
+
+    def to_list(self) -> List[Dict]:
+        return list(self._by_id.values())
@@ -0,0 +1,156 @@
+from typing import Callable, Dict, List, Tuple
+import asyncio
+import functools
+import time
+
+from bots import tracing
+
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join('{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"')) for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self, constant_labels: Dict[str, str]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels({**constant_labels, **dict(key)})} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self._buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket..., count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [0] * (len(self._buckets) + 2)
+
+        for index, bound in enumerate(self._buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def collect(self, constant_labels: Dict[str, str]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, series in self._values.items():
+            labels = {**constant_labels, **dict(key)}
+            for bound, count in zip(self._buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """A gauge read from a callback at scrape time, e.g. cache statistics."""
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], Dict[Tuple, float]]):
+        self.name = name
+        self.documentation = documentation
+        self._read = read
+
+    def collect(self, constant_labels: Dict[str, str]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for key, value in self._read().items():
+            lines.append(f"{self.name}{_format_labels({**constant_labels, **dict(key)})} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The metrics of this process. constant_labels are added to every series,
+    e.g. the worker index when several worker processes serve the app.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self.constant_labels: Dict[str, str] = {}
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation))
+
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, buckets))
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], Dict[Tuple, float]]) -> Gauge:
+        # Re-registering replaces the callback, so a new bot instance wins.
+        self._metrics[name] = Gauge(name, documentation, read)
+        return self._metrics[name]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect(self.constant_labels))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+CALLS = REGISTRY.counter("prassignbot_calls_total", "Calls per instrumented operation.")
+ERRORS = REGISTRY.counter("prassignbot_errors_total", "Calls per instrumented operation that raised.")
+LATENCY = REGISTRY.histogram("prassignbot_latency_seconds", "Latency per instrumented operation.")
+
+
+def timed(operation: str):
+    """
+    Counts calls and errors and records latency of a sync or async function,
+    and traces each call as a span named after operation.
+    """
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    with tracing.span(operation):
+                        return await func(*args, **kwargs)
+                except Exception:
+                    ERRORS.inc(operation=operation)
+                    raise
+                finally:
+                    CALLS.inc(operation=operation)
+                    LATENCY.observe(time.perf_counter() - start, operation=operation)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with tracing.span(operation):
+                    return func(*args, **kwargs)
+            except Exception:
+                ERRORS.inc(operation=operation)
+                raise
+            finally:
+                CALLS.inc(operation=operation)
+                LATENCY.observe(time.perf_counter() - start, operation=operation)
+
+        return wrapper
+
+    return decorator
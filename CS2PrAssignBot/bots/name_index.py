@@ -0,0 +1,90 @@
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+# Dice similarity of character trigrams, from 0 (nothing shared) to 1.
+FUZZY_SUGGEST_SIMILARITY = 0.35
+FUZZY_RESOLVE_SIMILARITY = 0.5
+# A near-match is only taken when the runner-up is this much further away.
+FUZZY_RESOLVE_MARGIN = 0.15
+FUZZY_SUGGESTIONS = 3
+
+
+def _trigrams(text: str) -> FrozenSet[str]:
+    padded = "  " + text + " "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class NameIndex:
+    """
+    Maps every spelling accepted by PrAssignBot.check_name_match (full name,
+    space-stripped name and each name token, all lowercased) to the set of
+    members it matches, so resolving a reviewer is one dict lookup.
+
+    Names with no exact match fall back to a character-trigram index over
+    the same spellings: a clear winner is resolved as if it had been typed
+    correctly, otherwise the closest members are offered as suggestions.
+    """
+
+    def __init__(self, members: Iterable[str]):
+        self._index: Dict[str, Set[str]] = {}
+
+        for member in members:
+            for key in self._member_keys(member):
+                self._index.setdefault(key, set()).add(member)
+
+        self._key_trigrams: Dict[str, FrozenSet[str]] = {key: _trigrams(key) for key in self._index if key}
+        self._trigram_keys: Dict[str, List[str]] = {}
+        for key, trigrams in self._key_trigrams.items():
+            for trigram in trigrams:
+                self._trigram_keys.setdefault(trigram, []).append(key)
+
+    @staticmethod
+    def _member_keys(member: str) -> Set[str]:
+        keys = {
+            member.strip().lower(),
+            member.strip().lower().replace(" ", ""),
+        }
+        for part in member.split(" "):
+            keys.add(part.strip().lower())
+        return keys
+
+    def matches(self, name: str) -> Set[str]:
+        return self._index.get(name.strip().lower(), set())
+
+    def resolve(self, name: str) -> Optional[str]:
+        matched = self.matches(name)
+        if len(matched) == 1:
+            return next(iter(matched))
+        if matched:
+            # Ambiguous as typed, e.g. a shared first name; guessing won't help.
+            return None
+
+        ranked = self.similar(name)
+        if not ranked or ranked[0][1] < FUZZY_RESOLVE_SIMILARITY:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < FUZZY_RESOLVE_MARGIN:
+            return None
+        return ranked[0][0]
+
+    def similar(self, name: str, min_similarity: float = FUZZY_SUGGEST_SIMILARITY) -> List[Tuple[str, float]]:
+        """(member, similarity) for members spelled like name, most similar first."""
+        query = _trigrams(name.strip().lower())
+
+        shared: Counter = Counter()
+        for trigram in query:
+            shared.update(self._trigram_keys.get(trigram, ()))
+
+        scores: Dict[str, float] = {}
+        for key, count in shared.items():
+            similarity = 2 * count / (len(query) + len(self._key_trigrams[key]))
+            if similarity < min_similarity:
+                continue
+            for member in self._index[key]:
+                if similarity > scores.get(member, 0.0):
+                    scores[member] = similarity
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def suggest(self, name: str, limit: int = FUZZY_SUGGESTIONS) -> List[str]:
+        return [member for member, _ in self.similar(name)[:limit]]
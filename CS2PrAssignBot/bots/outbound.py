@@ -0,0 +1,255 @@
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple
+import asyncio
+import random
+import sys
+import time
+
+import aiohttp
+from msrest.exceptions import ClientRequestError
+
+from bots import tracing
+
+
+OUTBOUND_WORKERS = 4
+GLOBAL_SEND_RATE = 30.0
+CONVERSATION_SEND_RATE = 7.0
+OUTBOUND_MAX_RETRIES = 5
+OUTBOUND_BASE_DELAY = 0.5
+OUTBOUND_MAX_DELAY = 30.0
+OUTBOUND_CLOSE_TIMEOUT = 30.0
+CONVERSATION_BUCKETS_MAX_SIZE = 10000
+
+RETRYABLE_STATUS_CODES = (429, 502, 503, 504)
+# A 502 or 504 can come back after the service did the work, so a call that
+# isn't safe to repeat is only retried when it was clearly turned away.
+THROTTLED_STATUS_CODE = 429
+UNAVAILABLE_STATUS_CODE = 503
+UNAUTHORIZED_STATUS_CODE = 401
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self._rate = rate
+        self._capacity = capacity or rate
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Takes a token, possibly going into debt; returns seconds to wait before using it."""
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+        self._tokens -= 1
+        return max(0.0, -self._tokens / self._rate)
+
+
+def _get_status_code(error: Exception) -> Optional[int]:
+    # msrest errors carry the requests/aiohttp response, aiohttp errors the status.
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None) or getattr(response, "status", None)
+    return status_code or getattr(error, "status", None)
+
+
+def is_retryable_error(error: Exception, idempotent: bool = True) -> bool:
+    status_code = _get_status_code(error)
+    if idempotent:
+        return status_code in RETRYABLE_STATUS_CODES
+    return status_code == THROTTLED_STATUS_CODE or (
+        status_code == UNAVAILABLE_STATUS_CODE and _get_retry_after(error) is not None
+    )
+
+
+def is_connection_error(error: Exception) -> bool:
+    """
+    The call never got an HTTP response, or its credentials were refused: the
+    connector client's session or token may have gone bad, unlike on any
+    other error status.
+    """
+    if isinstance(error, (ClientRequestError, aiohttp.ClientError, OSError, asyncio.TimeoutError)):
+        return True
+    return _get_status_code(error) == UNAUTHORIZED_STATUS_CODE
+
+
+def _get_retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _Unordered:
+    """A conversation key of its own for a call that needs no ordering."""
+
+    __slots__ = ()
+
+
+class OutboundQueue:
+    """
+    Queues outbound Teams calls so turns don't wait on them.
+
+    Calls for the same conversation run one at a time in submission order;
+    different conversations are drained by a pool of workers. Every call
+    takes a token from a global and a per-conversation token bucket, and a
+    throttled (429) or unavailable (5xx) call is retried with jittered
+    exponential backoff, honouring Retry-After when the service sends it.
+    Calls submitted as not idempotent (e.g. creating a conversation) are
+    only retried on 429, or on 503 with a Retry-After.
+    """
+
+    def __init__(
+        self,
+        workers: int = OUTBOUND_WORKERS,
+        global_rate: float = GLOBAL_SEND_RATE,
+        conversation_rate: float = CONVERSATION_SEND_RATE,
+        max_retries: int = OUTBOUND_MAX_RETRIES,
+        base_delay: float = OUTBOUND_BASE_DELAY,
+        max_delay: float = OUTBOUND_MAX_DELAY,
+    ):
+        self._workers_count = workers
+        self._conversation_rate = conversation_rate
+        self._max_retries = max_retries
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+
+        self._global_bucket = TokenBucket(global_rate)
+        self._conversation_buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+        # conversation -> (operation, idempotent, future, trace of the submitting turn, submitted at)
+        self._pending: Dict[Hashable, Deque[Tuple[Callable[[], Awaitable], bool, asyncio.Future, Tuple, float]]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._unfinished = 0
+        self._idle: Optional[asyncio.Event] = None
+
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def submit(
+        self,
+        conversation_key: Optional[Hashable],
+        operation: Callable[[], Awaitable[Any]],
+        idempotent: bool = True,
+    ) -> asyncio.Future:
+        """
+        Queues operation; the returned future resolves with its result.
+        Operations without a conversation key aren't ordered against anything
+        and only take a token from the global bucket.
+        """
+        self._start()
+        if conversation_key is None:
+            conversation_key = _Unordered()
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(self._log_failure)
+
+        self._unfinished += 1
+        self._idle.clear()
+
+        entry = (operation, idempotent, future, tracing.capture(), time.monotonic())
+        if conversation_key in self._pending:
+            self._pending[conversation_key].append(entry)
+        else:
+            self._pending[conversation_key] = deque([entry])
+            self._ready.put_nowait(conversation_key)
+        return future
+
+    def _start(self):
+        if self._workers:
+            return
+        self._ready = asyncio.Queue()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._workers = [asyncio.get_running_loop().create_task(self._work()) for _ in range(self._workers_count)]
+
+    async def _work(self):
+        while True:
+            conversation_key = await self._ready.get()
+            pending = self._pending[conversation_key]
+            operation, idempotent, future, trace, submitted_at = pending[0]
+
+            try:
+                with tracing.resume(trace), tracing.span("outbound.send", queued_ms=round((time.monotonic() - submitted_at) * 1000, 3)):
+                    result = await self._call(conversation_key, operation, idempotent)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as error:  # pylint: disable=broad-except
+                if not future.done():
+                    future.set_exception(error)
+
+            pending.popleft()
+            if pending:
+                self._ready.put_nowait(conversation_key)
+            else:
+                del self._pending[conversation_key]
+
+            self._unfinished -= 1
+            if not self._unfinished:
+                self._idle.set()
+
+    async def _call(self, conversation_key: Hashable, operation: Callable[[], Awaitable], idempotent: bool = True):
+        attempt = 0
+        while True:
+            wait = self._global_bucket.reserve()
+            if not isinstance(conversation_key, _Unordered):
+                wait = max(wait, self._get_conversation_bucket(conversation_key).reserve())
+            if wait:
+                await asyncio.sleep(wait)
+
+            try:
+                result = await operation()
+                self.sent += 1
+                return result
+            except Exception as error:  # pylint: disable=broad-except
+                if not is_retryable_error(error, idempotent) or attempt >= self._max_retries:
+                    self.failed += 1
+                    raise
+
+                delay = min(self._max_delay, self._base_delay * 2 ** attempt)
+                delay = max(_get_retry_after(error) or 0.0, random.uniform(delay / 2, delay))
+                attempt += 1
+                self.retried += 1
+                await asyncio.sleep(delay)
+
+    def _get_conversation_bucket(self, conversation_key: Hashable) -> TokenBucket:
+        bucket = self._conversation_buckets.get(conversation_key)
+        if bucket:
+            self._conversation_buckets.move_to_end(conversation_key)
+            return bucket
+
+        bucket = self._conversation_buckets[conversation_key] = TokenBucket(self._conversation_rate)
+        if len(self._conversation_buckets) > CONVERSATION_BUCKETS_MAX_SIZE:
+            self._conversation_buckets.popitem(last=False)
+        return bucket
+
+    @staticmethod
+    def _log_failure(future: asyncio.Future):
+        if not future.cancelled() and future.exception():
+            print(f"\n [outbound] send failed: {future.exception()}", file=sys.stderr)
+
+    async def join(self):
+        """Waits until everything queued so far, and anything their done-callbacks queue, has been sent or has failed."""
+        # A done-callback runs before the woken waiter and may queue another call.
+        while self._idle and not self._idle.is_set():
+            await self._idle.wait()
+
+    async def close(self, timeout: float = OUTBOUND_CLOSE_TIMEOUT):
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"\n [outbound] dropping {self._unfinished} unsent calls on close", file=sys.stderr)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._unfinished,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
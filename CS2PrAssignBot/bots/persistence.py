@@ -0,0 +1,109 @@
+from typing import Any, Callable, Optional
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+
+def write_json_atomic(path: str, data: Any):
+    # Write next to the target and rename over it, so a crash mid-write
+    # leaves either the old file or the new one, never a truncated file.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f_ptr:
+            json.dump(data, f_ptr)
+            f_ptr.flush()
+            os.fsync(f_ptr.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class WriteBehindWriter:
+    """
+    Coalesces updates to a JSON file and writes them off the event loop.
+
+    mark_dirty() schedules at most one flush, which runs flush_interval
+    seconds after the first unflushed change; every change made in between
+    goes out in that same write, and a failed write is tried again
+    flush_interval seconds later. close() flushes whatever is left.
+    """
+
+    def __init__(self, path: str, snapshot: Callable[[], Any], flush_interval: float = 2.0):
+        self._path = path
+        self._snapshot = snapshot
+        self._flush_interval = flush_interval
+
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._pending_write: Optional[asyncio.Future] = None
+
+    def mark_dirty(self):
+        self._dirty = True
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts, tools): nothing to block, write now.
+            self.flush_sync()
+            return
+
+        if not self._flush_task or self._flush_task.done():
+            self._flush_task = loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        # Keeps going while a failed write left changes unwritten, so they
+        # get another try even if nothing else changes.
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+                return
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"\n [persistence] writing {self._path} failed, retrying: {error}", file=sys.stderr)
+
+    async def flush(self):
+        if not self._lock:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if not self._dirty:
+                return
+
+            # Snapshot on the loop thread so the executor never sees a
+            # collection that is being mutated by a turn.
+            self._dirty = False
+            data = self._snapshot()
+            self._pending_write = asyncio.get_running_loop().run_in_executor(
+                None, write_json_atomic, self._path, data
+            )
+            try:
+                # Shielded so cancelling the flush task can't abandon a
+                # write that is already running in the executor.
+                await asyncio.shield(self._pending_write)
+            except Exception:
+                self._dirty = True
+                raise
+
+    def flush_sync(self):
+        if self._dirty:
+            self._dirty = False
+            write_json_atomic(self._path, self._snapshot())
+
+    async def close(self):
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+
+        if self._pending_write and not self._pending_write.done():
+            await self._pending_write
+
+        await self.flush()
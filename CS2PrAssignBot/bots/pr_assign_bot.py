@@ -1,36 +1,315 @@
-from typing import Any, List, Optional, Union, Dict
+from typing import List, Optional, Tuple, Union, Dict
+import asyncio
 import json
 import os
 import pathlib
-import random
-from botbuilder.core import CardFactory, TurnContext, MessageFactory
-from botbuilder.core.teams import TeamsActivityHandler, teams_get_channel_id, TeamsInfo
-from botbuilder.schema import ConversationParameters, ChannelAccount
+import re
+import sys
+import time
+from botbuilder.core import BotAdapter, CardFactory, InvokeResponse, TurnContext, MessageFactory
+from botbuilder.core.teams import TeamsActivityHandler, teams_get_channel_id, teams_get_team_info, TeamsInfo
+from botbuilder.schema import Activity, ActivityTypes, ConversationParameters, ChannelAccount, Mention
 from botbuilder.schema.teams import (
     TeamInfo,
     TeamsChannelAccount,
     MessagingExtensionActionResponse,
     MessagingExtensionAction,
 )
-import copy
 
 import bots.card_utils as bot_utils
+from bots import tracing
+from bots.assignment import RECENT_ASSIGNMENT_WINDOW, ReviewerLoadTracker
+from bots.batch import BATCH_COMMAND, BATCH_MAX_ENTRIES, normalize_batch_entry, parse_batch_text
+from bots.connector_cache import ConnectorClientCache
+from bots.dedup_cache import DEDUP_TTL, DedupCache, submission_key
+from bots.history_store import ReviewHistoryStore, ReviewRecord
+from bots.member_store import SavedMemberStore
+from bots.metrics import REGISTRY, timed
+from bots.outbound import OutboundQueue, is_connection_error
+from bots.persistence import WriteBehindWriter
+from bots.reminders import REMINDERS_POLL_INTERVAL, PendingReview, PendingReviewFile, ReminderScheduler
+from bots.roster_sync import (
+    ROSTER_PAGE_SIZE,
+    ROSTER_SYNC_CONCURRENCY,
+    PageFetcher,
+    RosterCache,
+    RosterSyncScheduler,
+    roster_changes,
+)
+from bots.shared_state import SharedPendingReviews, SharedStateStore
+from bots.submission import ReviewSubmission
+from bots.team_registry import TeamConfigWatcher, TeamContext, TeamRegistry
 
 
 TEAM_MEMBERS_FILE_NAME = "team_members.json"
 TEAM_CONFIG_FILE_NAME = "team_config.json"
+TEAM_CONFIG_DIR_NAME = "team_configs"
+REVIEWER_LOAD_FILE_NAME = "reviewer_load.json"
+REVIEW_HISTORY_FILE_NAME = "review_history.db"
+SHARED_STATE_FILE_NAME = "shared_state.db"
+PENDING_REMINDERS_FILE_NAME = "pending_reminders.json"
+SAVED_MEMBERS_FLUSH_INTERVAL = 2.0
+SUBMISSION_KEY_STATE = "PrAssignBot.submission_key"
+SUBMISSION_STATE = "PrAssignBot.submission"
+REVIEW_DONE_COMMAND = re.compile(r"^\s*review\s*done\s*", re.IGNORECASE)
 
 class PrAssignBot(TeamsActivityHandler):
-    def __init__(self, app_id: str, app_password: str):
-        self._team_config_file = os.path.join(os.path.dirname(__file__), TEAM_CONFIG_FILE_NAME)
-        self._team_member_file = os.path.join(os.path.dirname(__file__), TEAM_MEMBERS_FILE_NAME)
+    def __init__(
+        self,
+        app_id: str,
+        app_password: str,
+        data_dir: Optional[str] = None,
+        shared_state: bool = False,
+        compact_cards: bool = False,
+        review_reminder_delay: float = 0,
+        outbound_queue: Optional[OutboundQueue] = None,
+    ):
+        # Team configs and saved state live next to this module unless another
+        # directory is given (benchmarks and tools use their own). With
+        # shared_state, saved members, reviewer load and the activities already
+        # handled live in a SQLite database every worker process of the app
+        # reads and writes.
+        # Reviews nobody marked done are followed up every
+        # review_reminder_delay seconds (0 turns that off); with shared_state
+        # the pending reviews are in the shared database too. outbound_queue
+        # replaces the queue Teams calls go through, which otherwise keeps to
+        # Teams' rate limits (benchmarks lift them).
+        data_dir = data_dir or os.path.dirname(__file__)
+        self._team_config_file = os.path.join(data_dir, TEAM_CONFIG_FILE_NAME)
+        self._team_config_dir = os.path.join(data_dir, TEAM_CONFIG_DIR_NAME)
+        self._team_member_file = os.path.join(data_dir, TEAM_MEMBERS_FILE_NAME)
+        self._reviewer_load_file = os.path.join(data_dir, REVIEWER_LOAD_FILE_NAME)
+        self._review_history_file = os.path.join(data_dir, REVIEW_HISTORY_FILE_NAME)
+        self._shared_state_file = os.path.join(data_dir, SHARED_STATE_FILE_NAME)
+        self._pending_reminders_file = os.path.join(data_dir, PENDING_REMINDERS_FILE_NAME)
 
         self._app_id = app_id
         self._app_password = app_password
+        self._compact_cards = compact_cards
+
+        self._saved_team_members: SavedMemberStore = self._load_saved_team_members()
+        self._saved_team_members_writer = WriteBehindWriter(
+            self._team_member_file,
+            self._saved_team_members.to_list,
+            flush_interval=SAVED_MEMBERS_FLUSH_INTERVAL,
+        )
+
+        self._reviewer_load: ReviewerLoadTracker = self._load_reviewer_load()
+        self._reviewer_load_writer = WriteBehindWriter(
+            self._reviewer_load_file,
+            self._reviewer_load.to_dict,
+            flush_interval=SAVED_MEMBERS_FLUSH_INTERVAL,
+        )
+
+        # Last service URL seen per team, for posting outside of a turn. Only
+        # ever taken from authenticated activities: the connector sends the
+        # bot's token to whatever URL it is given.
+        self._service_urls: Dict[Optional[str], str] = {}
+        self._shared_state: Optional[SharedStateStore] = None
+        if shared_state:
+            self._shared_state = self._open_shared_state()
+
+        self._review_history = ReviewHistoryStore(self._review_history_file)
+
+        self._teams = TeamRegistry(self._team_config_file, self._team_config_dir, self._reviewer_load)
+        self._config_watcher = TeamConfigWatcher(self._teams)
+        self._connector_clients = ConnectorClientCache()
+        self._group_info_cards = bot_utils.CardCache()
+        self._processed_activities = DedupCache()
+        self._outbound = outbound_queue or OutboundQueue()
+        self._rosters = RosterCache()
+        self._roster_sync_scheduler: Optional[RosterSyncScheduler] = None
+        # Reminders go out between turns, through the adapter given to start().
+        self._adapter: Optional[BotAdapter] = None
+        self._reminders: Optional[ReminderScheduler] = None
+        self._review_reminder_delay = review_reminder_delay
+        if review_reminder_delay > 0:
+            if self._shared_state:
+                self._reminders = ReminderScheduler(
+                    SharedPendingReviews(self._shared_state),
+                    self._send_reminder,
+                    review_reminder_delay,
+                    poll_interval=REMINDERS_POLL_INTERVAL,
+                )
+            else:
+                self._reminders = ReminderScheduler(
+                    PendingReviewFile(self._pending_reminders_file), self._send_reminder, review_reminder_delay
+                )
+
+        REGISTRY.gauge(
+            "prassignbot_connector_client_cache",
+            "Connector client cache size, hits, misses, expirations and hit rate.",
+            lambda: {(("stat", name),): value for name, value in self._connector_clients.stats().items()},
+        )
+        REGISTRY.gauge(
+            "prassignbot_group_info_card_cache",
+            "Group info card cache hits and misses.",
+            lambda: {
+                (("stat", "hits"),): self._group_info_cards.hits,
+                (("stat", "misses"),): self._group_info_cards.misses,
+            },
+        )
+        REGISTRY.gauge(
+            "prassignbot_outbound_queue",
+            "Outbound Teams calls queued, sent, retried after throttling and failed.",
+            lambda: {(("stat", name),): value for name, value in self._outbound.stats().items()},
+        )
+        REGISTRY.gauge(
+            "prassignbot_roster_cache",
+            "Cached team rosters, cache hits and member pages fetched from Teams.",
+            lambda: {(("stat", name),): value for name, value in self._rosters.stats().items()},
+        )
+        REGISTRY.gauge(
+            "prassignbot_dedup_cache",
+            "Duplicate activity cache size, hits (duplicates dropped) and misses.",
+            lambda: {(("stat", name),): value for name, value in self._processed_activities.stats().items()},
+        )
+        REGISTRY.gauge(
+            "prassignbot_review_reminders",
+            "Reviews waiting for a reminder, reminders and escalations sent, and reviews marked done.",
+            lambda: {(("stat", name),): value for name, value in (self._reminders.stats() if self._reminders else {}).items()},
+        )
+
+    async def start(self, adapter: Optional[BotAdapter] = None):
+        self._config_watcher.start()
+        # Rosters can only be synced outside of a turn with an adapter to call Teams through.
+        if adapter:
+            self._adapter = adapter
+            self._roster_sync_scheduler = RosterSyncScheduler(lambda: self.sync_all_rosters(adapter))
+            self._roster_sync_scheduler.start()
+            if self._reminders:
+                self._reminders.start()
+
+    def outbound_stats(self) -> Dict[str, int]:
+        return self._outbound.stats()
+
+    async def drain(self):
+        """Waits for every queued outbound call to be sent or to fail."""
+        await self._outbound.join()
+
+    async def close(self):
+        await self._config_watcher.stop()
+        if self._roster_sync_scheduler:
+            await self._roster_sync_scheduler.stop()
+        if self._reminders:
+            await self._reminders.stop()
+        await self._outbound.close()
+        await self._connector_clients.close()
+        await self._saved_team_members_writer.close()
+        await self._reviewer_load_writer.close()
+        await self._review_history.close()
+        if self._shared_state:
+            await self._shared_state.close()
+
+    async def on_turn(self, turn_context: TurnContext):
+        activity = turn_context.activity
+        with tracing.span("turn", trace_id=activity.id, activity_type=activity.type, activity_name=activity.name):
+            await self._on_turn(turn_context)
+
+    async def _on_turn(self, turn_context: TurnContext):
+        # Bot Framework redelivers activities when a turn is slow; drop the
+        # redelivery, and a second submission of the same PR, before any work.
+        activity = turn_context.activity
+        activity_key = ("activity", activity.conversation.id if activity.conversation else None, activity.id) if activity.id else None
+        submission_data = self._get_submission_data(activity)
+        submission = ReviewSubmission(submission_data) if submission_data is not None else None
+        review_key = submission_key(submission, self._submission_scope(activity)) if submission else None
+
+        if activity_key and not await self._claim(activity_key):
+            await self._acknowledge_duplicate(turn_context)
+            return
+
+        if review_key and not await self._claim(review_key):
+            await self._acknowledge_duplicate(turn_context, submission)
+            return
+        turn_context.turn_state[SUBMISSION_KEY_STATE] = review_key
+        if submission is not None:
+            turn_context.turn_state[SUBMISSION_STATE] = submission
+
+        if self._shared_state:
+            await self._shared_state.refresh()
+
+        if activity.service_url:
+            await self._note_service_url(self._get_team(turn_context).team_id, activity.service_url)
+
+        try:
+            await super().on_turn(turn_context)
+        except Exception:
+            # Let a redelivery of a failed turn through.
+            for key in (activity_key, review_key):
+                if key:
+                    self._release(key)
+            raise
+
+    async def _claim(self, key: Tuple) -> bool:
+        if not self._processed_activities.claim(key):
+            return False
+        # With SO_REUSEPORT a redelivery may reach another worker process.
+        return not self._shared_state or await self._shared_state.claim(key, DEDUP_TTL)
+
+    def _release(self, key: Tuple):
+        self._processed_activities.release(key)
+        if self._shared_state:
+            self._shared_state.release(key)
+
+    async def _note_service_url(self, team_id: Optional[str], service_url: str):
+        if self._service_urls.get(team_id) == service_url:
+            return
+        if self._shared_state:
+            # Other workers may be asked to post for this team too.
+            await self._shared_state.save_service_url(team_id, service_url)
+        else:
+            self._service_urls[team_id] = service_url
 
-        self._team_config: Dict[str, Any] = self._load_team_config()
-        self._general_task_group: List[str] = self._init_general_task_group(self._team_config["groups"])
-        self._saved_team_members: List[Dict] = self._load_saved_team_members()
+    @staticmethod
+    def _get_submission_data(activity: Activity) -> Optional[Dict]:
+        value = activity.value if isinstance(activity.value, dict) else {}
+
+        if activity.type == ActivityTypes.invoke and activity.name == "composeExtension/submitAction":
+            if "submitpr" in str(value.get("commandId", "")).strip().lower():
+                return value["data"] if isinstance(value.get("data"), dict) else {}
+        elif activity.type == ActivityTypes.message and "submitpr" in str(value.get("action", "")).strip().lower():
+            return value
+        return None
+
+    @staticmethod
+    def _get_submission(turn_context: TurnContext, data: Dict) -> ReviewSubmission:
+        # Parsed in _on_turn already, unless a handler is called directly.
+        submission = turn_context.turn_state.get(SUBMISSION_STATE)
+        if submission is None:
+            submission = turn_context.turn_state[SUBMISSION_STATE] = ReviewSubmission(data or {})
+        return submission
+
+    def _release_submission(self, turn_context: TurnContext):
+        # A rejected submission may be corrected and sent again.
+        review_key = turn_context.turn_state.get(SUBMISSION_KEY_STATE)
+        if review_key:
+            self._release(review_key)
+
+    @staticmethod
+    def _submission_scope(activity: Activity) -> Optional[str]:
+        # The same PR may be reviewed by several teams; outside of a team,
+        # the conversation it was submitted in.
+        team_info = teams_get_team_info(activity)
+        if team_info and team_info.id:
+            return team_info.id
+        return activity.conversation.id if activity.conversation else None
+
+    async def _acknowledge_duplicate(self, turn_context: TurnContext, submission: Optional[ReviewSubmission] = None):
+        # A redelivered activity was answered the first time; a PR submitted
+        # again is told why nothing happens.
+        if submission:
+            self._send(
+                turn_context,
+                MessageFactory.text("*Review {} has already been submitted, it won't be posted again*".format(submission.wi or submission.link)),
+            )
+        if turn_context.activity.type == ActivityTypes.invoke:
+            await turn_context.send_activity(  # invoke responses can't be queued
+                Activity(
+                    type=ActivityTypes.invoke_response,
+                    value=InvokeResponse(status=200, body=MessagingExtensionActionResponse().serialize()),
+                )
+            )
 
     async def on_teams_members_added(  # pylint: disable=unused-argument
         self,
@@ -42,34 +321,60 @@ class PrAssignBot(TeamsActivityHandler):
             if member.id != turn_context.activity.recipient.id:
                 await self._send_help_card(turn_context, member)
 
+    @timed("bot.on_teams_messaging_extension_submit_action_dispatch")
     async def on_teams_messaging_extension_submit_action_dispatch(
         self, turn_context: TurnContext, action: MessagingExtensionAction
     ) -> MessagingExtensionActionResponse:
         if "submitpr" in action.command_id.strip().lower():
-            error_message = self.check_review_submission(turn_context.activity.from_property.name, action.data)
+            team = self._get_team(turn_context)
+            submission = self._get_submission(turn_context, action.data)
+            error_message = self.check_review_submission(team, turn_context.activity.from_property.name, submission)
 
             if error_message:
-                await turn_context.send_activity(MessageFactory.text(error_message))
-                await self._select_group_for_review(turn_context, action.data)
+                self._release_submission(turn_context)
+                self._send(turn_context, MessageFactory.text(error_message))
+                await self._select_group_for_review(team, turn_context, submission)
             else:
-                await self._submit_review(turn_context, action.data)
+                await self._submit_review(team, turn_context, submission)
 
             return MessagingExtensionActionResponse()
 
         raise NotImplementedError(f"Unexpected action.command_id {action.command_id}.")
 
+    @timed("bot.on_message_activity")
     async def on_message_activity(self, turn_context: TurnContext):
         TurnContext.remove_recipient_mention(turn_context.activity)
+        team = self._get_team(turn_context)
 
         if turn_context.activity.text:
             text = turn_context.activity.text.strip().lower()
 
+            if text.startswith(BATCH_COMMAND):
+                await self._submit_review_batch_from_message(team, turn_context)
+                return
+
+            if REVIEW_DONE_COMMAND.match(text):
+                await self._complete_review_from_message(team, turn_context)
+                return
+
+            if "my queue" in text or "myqueue" in text:
+                await self._send_my_queue(turn_context)
+                return
+
+            if "team load" in text or "teamload" in text:
+                await self._send_team_load(team, turn_context)
+                return
+
             if "show" in text:
-                await self._send_task_group_card(turn_context)
+                await self._send_task_group_card(team, turn_context)
                 return
 
             if "addme" in text:
-                await self._send_add_user_card(turn_context)
+                await self._send_add_user_card(team, turn_context)
+                return
+
+            if "sync roster" in text or "syncroster" in text:
+                await self._sync_roster_from_message(turn_context)
                 return
 
         if turn_context.activity.value:
@@ -81,27 +386,21 @@ class PrAssignBot(TeamsActivityHandler):
                     return
 
                 if "submitpr" in value["action"].strip().lower():
-                    error_message = self.check_review_submission(turn_context.activity.from_property.name, value)
+                    submission = self._get_submission(turn_context, value)
+                    error_message = self.check_review_submission(team, turn_context.activity.from_property.name, submission)
                     if error_message:
-                        await turn_context.send_activity(MessageFactory.text(error_message))
+                        self._release_submission(turn_context)
+                        self._send(turn_context, MessageFactory.text(error_message))
                     else:
-                        await self._update_select_group_card(turn_context, value)
-                        await self._submit_review(turn_context, value)
+                        await self._update_select_group_card(turn_context, submission)
+                        await self._submit_review(team, turn_context, submission)
                     return
 
         # TODO: create help card
         await self._send_help_card(turn_context)
 
-    def check_reviewer_numbers(self, reviewers_number: int) -> bool:
-        return 0 <= reviewers_number < len(self._general_task_group)
-
-    def check_name_match_unique_member(self, name: str, group: List[str]) -> bool:
-        count = 0
-        for member in group:
-            if self.check_name_match(member, name):
-                count += 1
-
-        return count == 1
+    def check_reviewer_numbers(self, team: TeamContext, reviewers_number: int) -> bool:
+        return 0 <= reviewers_number < len(team.general_task_group)
 
     @staticmethod
     def check_name_match(actual: str, name: str) -> bool:
@@ -117,261 +416,650 @@ class PrAssignBot(TeamsActivityHandler):
 
         return False
 
-    def check_review_submission(self, reviewee: str, data: Dict) -> Optional[str]:
-        reviewers_string = data.get("Reviewers", "")
-        task_group = data.get("TaskGroup", "")
-        reviewer_number = int(data.get("NumberOfReviewers", "0"))
-
-        assigned = len(reviewers_string.replace(" ", "").replace(",", "")) > 0
-        if not assigned and len(task_group) == 0:
+    @timed("bot.check_review_submission")
+    def check_review_submission(self, team: TeamContext, reviewee: str, submission: ReviewSubmission) -> Optional[str]:
+        assigned = submission.names_reviewers
+        if not assigned and len(submission.task_group) == 0:
             return "*Please specify Reiviewers Or TaskGroup*"
 
-        invalid_reviewers_error_message = self._get_invalid_reviewers_error_message(reviewee, reviewers_string.split(","))
-        if assigned and invalid_reviewers_error_message:
-            return "*Invalid reviewers: {}*".format(invalid_reviewers_error_message)
+        if assigned:
+            invalid_reviewers_error_message = self._get_invalid_reviewers_error_message(team, reviewee, submission)
+            if invalid_reviewers_error_message:
+                return "*Invalid reviewers: {}*".format(invalid_reviewers_error_message)
 
-        if not self.check_reviewer_numbers(reviewer_number):
+        reviewer_number = submission.number_of_reviewers
+        if reviewer_number is None or not self.check_reviewer_numbers(team, reviewer_number):
             return "*Incorrect reviewer number: {}, total team members: {}*".format(
-                reviewer_number,
-                len(self._general_task_group),
+                submission.number_text,
+                len(team.general_task_group),
             )
 
-        specified_reviewers = self._get_reviewer_list_from_string(reviewers_string)
-        if not self.check_reviewer_numbers(reviewer_number + len(specified_reviewers)):
+        specified_reviewers = submission.reviewers(team.name_index)
+        if not self.check_reviewer_numbers(team, reviewer_number + len(specified_reviewers)):
             return "*Too many reviewers: {}, total team members: {}*".format(
                 reviewer_number + len(specified_reviewers),
-                len(self._general_task_group),
+                len(team.general_task_group),
             )
 
-    @staticmethod
-    def _init_general_task_group(groups: Dict[str, List]) -> List[str]:
-        members = []
-        for group in groups.values():
-            members.extend(group)
+        if reviewer_number and not specified_reviewers and not team.count_available(reviewee, specified_reviewers):
+            return "*No reviewers available, everyone is out of office or at capacity*"
 
-        return list(set(members))
+    def _get_team(self, turn_context: TurnContext) -> TeamContext:
+        team_info = teams_get_team_info(turn_context.activity)
+        return self._teams.get(team_info.id if team_info else None)
 
-    def _get_invalid_reviewers_error_message(self, reviewee: str, reviewers: List[str]) -> Optional[str]:
+    def _get_invalid_reviewers_error_message(self, team: TeamContext, reviewee: str, submission: ReviewSubmission) -> Optional[str]:
         invalid_string = None
-        for reviewer in reviewers:
-            if not self.check_name_match_unique_member(reviewer, self._general_task_group) or self.check_name_match(reviewee, reviewer):
+        for reviewer, member in zip(submission.reviewer_names, submission.resolve(team.name_index)):
+            is_reviewee = self.check_name_match(reviewee, reviewer) or member == reviewee
+            if not member or is_reviewee:
                 if invalid_string:
                     invalid_string += f", {reviewer}"
                 else:
                     invalid_string = reviewer
 
-                if self.check_name_match(reviewee, reviewer):
+                if is_reviewee:
                     invalid_string += "[reviewee]"
-            
+                elif reviewer.strip():
+                    suggestions = [name for name in team.name_index.suggest(reviewer) if name != reviewee]
+                    if suggestions:
+                        invalid_string += " (did you mean {}?)".format(" or ".join(suggestions))
+
         return invalid_string
 
     async def _select_group_for_review(
         self,
+        team: TeamContext,
         turn_context: TurnContext,  # pylint: disable=unused-argument
-        data: Dict,
+        submission: ReviewSubmission,
     ):
         select_card = CardFactory.adaptive_card(
             bot_utils.construct_select_group_card(
-                data.get("WI", ""),
-                data.get("ReviewLink", ""),
-                data.get("Description", ""),
-                data.get("Reviewers", ""),
-                self._team_config["groups"].keys(),
+                submission.wi,
+                submission.link,
+                submission.description,
+                submission.reviewers_text,
+                team.config.groups.keys(),
                 selected=False,
+                compact=self._compact_cards,
             )
         )
 
-        await turn_context.send_activity(MessageFactory.attachment(attachment=select_card))
+        self._send(turn_context, MessageFactory.attachment(attachment=select_card))
 
     async def _update_select_group_card(
         self,
         turn_context: TurnContext,
-        data: Dict,
+        submission: ReviewSubmission,
     ):
         selected_card = CardFactory.adaptive_card(
             bot_utils.construct_select_group_card(
-                data.get("WI", ""),
-                data.get("ReviewLink", ""),
-                data.get("Description", ""),
-                data.get("Reviewers", ""),
-                [data.get("TaskGroup")] if data.get("TaskGroup") else [],
+                submission.wi,
+                submission.link,
+                submission.description,
+                submission.reviewers_text,
+                [submission.task_group] if submission.task_group else [],
                 selected=True,
+                compact=self._compact_cards,
             )
         )
 
         selected_group_message = MessageFactory.attachment(attachment=selected_card)
         selected_group_message.id = turn_context.activity.reply_to_id
-        await turn_context.update_activity(selected_group_message)
-
-    def _get_valid_group_name(self, group_name: str) -> Optional[str]:
-        for name in self._team_config["groups"]:
-            if group_name.strip().lower() == name.lower():
-                return name
-        return None
+        self._outbound.submit(
+            self._conversation_key(turn_context),
+            lambda: self._update_activity(turn_context, selected_group_message),
+        )
 
-    # TODO: count task assigned to each reviewers, add weight to them
-    def _assign_reviewers(self, reviewee: str, task_group_name: str, number_of_reviewers, excluded_members: List[str]) -> List[str]:
-        task_group_name = self._get_valid_group_name(task_group_name)
-        if not task_group_name or len(self._team_config["groups"][task_group_name]) == 0:
-            group = self._general_task_group
-        else:
-            group = self._team_config["groups"][task_group_name]
+    @timed("bot.assign_reviewers")
+    def _assign_reviewers(self, team: TeamContext, reviewee: str, task_group_name: str, number_of_reviewers: int, excluded_members: List[str]) -> List[str]:
+        return team.assign_reviewers(reviewee, task_group_name, number_of_reviewers, excluded_members)
 
-        excluded_members.append(reviewee)
+    @timed("bot.submit_review")
+    async def _submit_review(
+        self,
+        team: TeamContext,
+        turn_context: TurnContext,  # pylint: disable=unused-argument
+        submission: ReviewSubmission,
+    ):
+        reviewee: Union[ChannelAccount, TeamsChannelAccount] = turn_context.activity.from_property
+        review, submit_review_message = await self._prepare_review(team, reviewee, submission)
+        assigned = len(review.reviewers) - len(submission.reviewers(team.name_index))
+        if not review.reviewers and submission.number_of_reviewers:
+            # Checked up front already, but capacity can run out in between.
+            self._roll_back_review(team, review)
+            self._release_submission(turn_context)
+            self._send(turn_context, MessageFactory.text("*No reviewers available, everyone is out of office or at capacity*"))
+            return
 
-        assign_from_group = [member for member in group if member not in excluded_members]
+        post_from_same_channel = False
+        try:
+            with tracing.span("teams.get_channel_id"):
+                if teams_get_channel_id(turn_context.activity) == team.config.channel_id:
+                    post_from_same_channel = True
+        except:
+            pass
 
-        reviewers = []
-        if number_of_reviewers >= len(assign_from_group):
-            reviewers.extend(assign_from_group)
-            excluded_members.extend(reviewers)
+        posted = self._create_new_thread_in_channel(
+            turn_context.adapter,
+            turn_context.activity.service_url,
+            team.config.channel_id,
+            message=submit_review_message,
+        )
 
-            assign_from_general_group = [member for member in self._general_task_group if member not in excluded_members]
-            reviewers.extend(
-                self._extract_members(
-                    number_of_reviewers - len(assign_from_group),
-                    assign_from_general_group
+        def confirm(future: asyncio.Future):
+            if future.cancelled():
+                return
+            if future.exception():
+                self._roll_back_review(team, review)
+                self._release_submission(turn_context)
+                self._send(
+                    turn_context,
+                    MessageFactory.text("*Posting review {} to the Teams'channel failed, please submit it again*".format(submission.wi)),
                 )
-            )
-        else:
-            reviewers = self._extract_members(number_of_reviewers, assign_from_group)
-
-        return reviewers
+                return
 
-    @staticmethod
-    def _extract_members(number: int, group: List[str]) -> List[str]:
-        members = []
-        while number > 0 and len(group) > 0:
-            member = random.choice(group)
-            members.append(member)
-            group.remove(member)
-            number -= 1
-        return members
-
-    def _get_reviewer_list_from_string(self, reviewers_string: str) -> List[str]:
-        reviewers = reviewers_string.split(",")
-        formated_reviewers = []
-
-        for reviewer in reviewers:
-            if not self.check_name_match_unique_member(reviewer, self._general_task_group):
-                continue
+            if not post_from_same_channel:
+                self._send(turn_context, MessageFactory.text("*Review task has been posted to the Teams'channel : )*"))
+            if assigned < submission.number_of_reviewers:
+                self._send(
+                    turn_context,
+                    MessageFactory.text(
+                        "*Only {} of {} reviewers could be assigned, the others are out of office or at capacity*".format(
+                            assigned, submission.number_of_reviewers
+                        )
+                    ),
+                )
 
-            for actual_reviewer in self._general_task_group:
-                if self.check_name_match(actual_reviewer, reviewer):
-                    formated_reviewers.append(actual_reviewer)
-                    break
-        
-        return formated_reviewers
+        posted.add_done_callback(confirm)
+        self._follow_up(posted, team, turn_context.activity.service_url, reviewee, review.reviewers, submission)
 
-    async def _submit_review(
+    async def _prepare_review(
         self,
-        turn_context: TurnContext,  # pylint: disable=unused-argument
-        data: Dict,
-    ):
-        reviewee: Union[ChannelAccount, TeamsChannelAccount] = turn_context.activity.from_property
-
-        reviewers = []
-        if data.get("Reviewers", None):
-            reviewers = self._get_reviewer_list_from_string(data.get("Reviewers"))
+        team: TeamContext,
+        reviewee: Union[ChannelAccount, TeamsChannelAccount],
+        submission: ReviewSubmission,
+    ) -> Tuple[ReviewRecord, Activity]:
+        named_reviewers = submission.reviewers(team.name_index)
+        now = time.time()
+
+        def pick() -> List[str]:
+            if not submission.number_of_reviewers:
+                return named_reviewers
+            # The named reviewers (and the reviewee) are excluded from the pick.
+            return named_reviewers + self._assign_reviewers(
+                team, reviewee.name, submission.task_group, submission.number_of_reviewers, named_reviewers
+            )
 
-        number_of_reviewers = int(data.get("NumberOfReviewers", "0"))
-        if number_of_reviewers > 0:
-            excluded_members = copy.deepcopy(reviewers)
-            excluded_members.append(reviewee.name)
-            reviewers.extend(self._assign_reviewers(reviewee.name, data.get("TaskGroup", ""), number_of_reviewers, excluded_members))
+        if self._shared_state:
+            # Other workers must not pick from the same load counters until these reviewers are recorded.
+            reviewers = await self._shared_state.assign(pick, now)
+        else:
+            reviewers = pick()
+            self._reviewer_load.record(reviewers, now)
+            self._reviewer_load_writer.mark_dirty()
+        team.availability.note_assigned(reviewers, now)
+        review = ReviewRecord(
+            team.team_id,
+            reviewee.name,
+            reviewee.id,
+            reviewers,
+            submission.task_group,
+            submission.wi,
+            submission.link,
+            created_at=now,
+        )
+        self._review_history.record(review)
 
         review_card = CardFactory.adaptive_card(
             bot_utils.construct_review_submit_form(
-                data.get("WI", ""),
-                data.get("ReviewLink", ""),
-                data.get("Description", ""),
+                submission.wi,
+                submission.link,
+                submission.description,
                 reviewee,
                 reviewers,
                 self._saved_team_members,
+                compact=self._compact_cards,
             )
         )
-        submit_review_message = MessageFactory.attachment(attachment=review_card)
+        return review, MessageFactory.attachment(attachment=review_card)
 
-        post_from_same_channel = False
-        try:
-            if teams_get_channel_id(turn_context.activity) == self._team_config["channel_id"]:
-                post_from_same_channel = True
-        except:
-            pass
+    def _roll_back_review(self, team: TeamContext, review: ReviewRecord):
+        """Undoes _prepare_review for a review whose thread was never posted."""
+        if self._shared_state:
+            self._shared_state.unrecord_assignments(review.reviewers, review.created_at)
+        else:
+            self._reviewer_load.unrecord(review.reviewers, review.created_at)
+            self._reviewer_load_writer.mark_dirty()
+        team.availability.note_unassigned(review.reviewers)
+        self._review_history.discard(review)
+
+    @timed("bot.submit_review_batch")
+    async def submit_review_batch(
+        self,
+        adapter: BotAdapter,
+        service_url: Optional[str],
+        team_id: Optional[str],
+        reviewee: Union[ChannelAccount, TeamsChannelAccount],
+        entries: List[Dict],
+    ) -> Tuple[Optional[str], List[Optional[List[str]]]]:
+        """
+        service_url must come from an authenticated activity; without one
+        the team's last known service URL is used. A reviewee without an id
+        is looked up in the saved members by name.
+
+        Validates every entry first and posts nothing unless all of them are
+        valid. Reviewers are then assigned entry by entry, each assignment
+        counting towards the load seen by the next, so the batch is spread
+        across the team. Threads are posted with bounded concurrency, and an
+        entry whose thread fails to post has its assignment rolled back.
+
+        Returns an error message, or the reviewers assigned to each entry.
+        When an entry wasn't posted, because its thread failed to post or
+        nobody was left to review it, the error message comes with the
+        reviewers of every entry, None for the ones that weren't posted.
+        """
+        team = self._teams.get(team_id)
+        if self._shared_state:
+            await self._shared_state.refresh()
+
+        if not reviewee.id:
+            saved_member = self._saved_team_members.get_by_name(reviewee.name)
+            if not saved_member:
+                return "*Unknown reviewee {}, give their id or have them message the bot first*".format(reviewee.name), []
+            reviewee = ChannelAccount(id=saved_member["id"], name=reviewee.name)
+
+        not_objects = [str(index) for index, entry in enumerate(entries, 1) if not isinstance(entry, dict)]
+        if not_objects:
+            return "*Review entries must be objects, these aren't: {}*".format(", ".join(not_objects)), []
+        submissions = [ReviewSubmission(normalize_batch_entry(entry)) for entry in entries]
+
+        service_url = service_url or self._service_urls.get(team.team_id)
+        if not service_url:
+            return "*No service URL known for this team yet, message the bot from the team first*", []
+
+        error_message = self._get_review_batch_error_message(team, reviewee.name, submissions)
+        if error_message:
+            return error_message, []
+
+        reviews = [await self._prepare_review(team, reviewee, submission) for submission in submissions]
+
+        posted: List[Optional[asyncio.Future]] = []
+        unassigned = []
+        for submission, (review, message) in zip(submissions, reviews):
+            if not review.reviewers and submission.number_of_reviewers:
+                # Checked up front already, but the entries before it can use up the capacity.
+                self._roll_back_review(team, review)
+                unassigned.append(submission.wi)
+                posted.append(None)
+                continue
+            posted.append(self._create_new_thread_in_channel(adapter, service_url, team.config.channel_id, message))
+            self._follow_up(posted[-1], team, service_url, reviewee, review.reviewers, submission)
+        results = iter(await asyncio.gather(*[future for future in posted if future], return_exceptions=True))
+
+        failed, assigned = [], []
+        for submission, (review, _), future in zip(submissions, reviews, posted):
+            result = next(results) if future else None
+            if not future:
+                assigned.append(None)
+            elif isinstance(result, BaseException):
+                self._roll_back_review(team, review)
+                failed.append(submission.wi)
+                assigned.append(None)
+            else:
+                assigned.append(review.reviewers)
+
+        errors = []
+        if unassigned:
+            errors.append("*No reviewers available for {}, everyone is out of office or at capacity*".format(", ".join(unassigned)))
+        if failed:
+            errors.append("*{} of {} review tasks failed to post to the Teams'channel, submit them again: {}*".format(
+                len(failed), len(submissions), ", ".join(failed)
+            ))
+        if errors:
+            return "\n\n".join(errors), assigned
+
+        return None, assigned
+
+    def _get_review_batch_error_message(self, team: TeamContext, reviewee: str, submissions: List[ReviewSubmission]) -> Optional[str]:
+        if not submissions:
+            return "*No review entries, one per line: WI | ReviewLink | Description | TaskGroup | NumberOfReviewers | Reviewers*"
+
+        if len(submissions) > BATCH_MAX_ENTRIES:
+            return "*Too many review entries: {}, at most {} per batch*".format(len(submissions), BATCH_MAX_ENTRIES)
+
+        errors = []
+        for line, submission in enumerate(submissions, start=1):
+            error_message = self.check_review_submission(team, reviewee, submission)
+            if error_message:
+                errors.append("{}. {}: {}".format(line, submission.wi, error_message))
 
-        if not post_from_same_channel:
-            await turn_context.send_activity(MessageFactory.text("*Review task has been posted to the Teams'channel : )*"))
+        if errors:
+            return "*Nothing was posted, fix these entries:*\n\n" + "\n\n".join(errors)
+        return None
 
-        await self._create_new_thread_in_channel(turn_context, self._team_config["channel_id"], message=submit_review_message)
+    async def _submit_review_batch_from_message(self, team: TeamContext, turn_context: TurnContext):
+        entries = parse_batch_text(turn_context.activity.text)
+        error_message, assigned = await self.submit_review_batch(
+            turn_context.adapter,
+            turn_context.activity.service_url,
+            team.team_id,
+            turn_context.activity.from_property,
+            entries,
+        )
+
+        if error_message and not assigned:
+            self._send(turn_context, MessageFactory.text(error_message))
+            return
+
+        # Entries that weren't posted are listed in the error message.
+        posted = [(entry, reviewers) for entry, reviewers in zip(entries, assigned) if reviewers is not None]
+        messages = []
+        if posted:
+            messages.append("*{} review tasks have been posted to the Teams'channel : )*".format(len(posted)))
+        short = []
+        for entry, reviewers in posted:
+            submission = ReviewSubmission(normalize_batch_entry(entry))
+            if len(reviewers) < len(submission.reviewers(team.name_index)) + submission.number_of_reviewers:
+                short.append(submission.wi)
+        if short:
+            messages.append("*Fewer reviewers than asked for could be assigned to {}, the others are out of office or at capacity*".format(
+                ", ".join(short)
+            ))
+        if error_message:
+            messages.append(error_message)
+        self._send(turn_context, MessageFactory.text("\n\n".join(messages)))
+
+    async def _send_my_queue(self, turn_context: TurnContext):
+        reviewer = turn_context.activity.from_property.name
+        reviews = await self._review_history.reviewer_queue(reviewer, time.time() - RECENT_ASSIGNMENT_WINDOW)
+
+        if not reviews:
+            self._send(turn_context, MessageFactory.text("*No reviews assigned to {} recently*".format(reviewer)))
+            return
+
+        lines = ["**Reviews assigned to {}**".format(reviewer)]
+        for wi, link, reviewee, task_group, created_at in reviews:
+            lines.append("- [{}]({}) from {} ({}, {})".format(
+                wi, link, reviewee, task_group or "General", time.strftime("%Y-%m-%d", time.localtime(created_at))
+            ))
+        self._send(turn_context, MessageFactory.text("\n\n".join(lines)))
+
+    async def _send_team_load(self, team: TeamContext, turn_context: TurnContext):
+        load = dict(await self._review_history.team_load(team.team_id, time.time() - RECENT_ASSIGNMENT_WINDOW))
+
+        lines = ["**{} review load, last {} days**".format(team.config.team_name, RECENT_ASSIGNMENT_WINDOW // (24 * 60 * 60))]
+        for member in sorted(team.general_task_group, key=lambda member: (-load.get(member, 0), member)):
+            lines.append("- {}: {}".format(member, load.get(member, 0)))
+        self._send(turn_context, MessageFactory.text("\n\n".join(lines)))
 
     async def _send_help_card(self, turn_context: TurnContext, member: Optional[Union[TeamsChannelAccount, ChannelAccount]]=None):
         help_message = ""
         if member:
             help_message += "Don't panic, {} {}. ".format(member.given_name, member.surname)
         help_message += "Help info will be provided in the future : )"
-        await turn_context.send_activity(MessageFactory.text(help_message))
-
-    async def _send_task_group_card(self, turn_context: TurnContext):
+        if self._reminders:
+            help_message += (
+                " Reviewers are reminded of a review every {:g} hours until someone says"
+                " \"review done\" in its thread, or \"review done <WI>\" anywhere in the team."
+            ).format(self._review_reminder_delay / (60 * 60))
+        self._send(turn_context, MessageFactory.text(help_message))
+
+    async def _send_task_group_card(self, team: TeamContext, turn_context: TurnContext):
         message = MessageFactory.attachment(
             attachment=CardFactory.adaptive_card(
-                bot_utils.construct_group_info_card(self._team_config, self._saved_team_members)
+                self._group_info_cards.get_or_build(
+                    (team.version, self._saved_team_members.version),
+                    lambda: bot_utils.construct_group_info_card(
+                        team.config, self._saved_team_members, compact=self._compact_cards
+                    ),
+                )
             )
         )
 
-        await turn_context.send_activity(message)
+        self._send(turn_context, message)
 
-    async def _send_add_user_card(self, turn_context: TurnContext):
+    async def _send_add_user_card(self, team: TeamContext, turn_context: TurnContext):
         current_user: ChannelAccount = turn_context.activity.from_property
-        self._update_saved_members(current_user.as_dict())
-        self._export_saved_team_members()
+        await self._save_members([current_user.as_dict()])
 
         greeting = "Hi, {}, you have been added to groups: General".format(current_user.name)
 
-        for group_name, members in self._team_config.get("groups", {}).items():
-            if current_user.name in members:
-                greeting += ", " + group_name
+        for group_name in team.config.groups_of(current_user.name):
+            greeting += ", " + group_name
 
-        await turn_context.send_activity(MessageFactory.text(greeting))
+        self._send(turn_context, MessageFactory.text(greeting))
 
-    def _update_saved_members(self, new_member: Dict):
-        for member in self._saved_team_members:
-            if member["id"] == new_member["id"]:
-                self._saved_team_members.remove(member)
-                self._saved_team_members.append(new_member)
-                return
-        self._saved_team_members.append(new_member)
-        
+    async def _save_members(self, members: List[Dict]):
+        if not members:
+            return
 
-    async def _create_new_thread_in_channel(self, turn_context: TurnContext, teams_channel_id: str, message):
+        if self._shared_state:
+            await self._shared_state.save_members(members)
+        else:
+            for member in members:
+                self._saved_team_members.update(member)
+            self._saved_team_members_writer.mark_dirty()
+
+    async def sync_roster(self, team_id: str, fetch_page: PageFetcher, force: bool = False) -> Tuple[int, int]:
+        """Saves the team's members so they can be mentioned; returns (roster size, members added or changed)."""
+        roster = await self._rosters.get(team_id, fetch_page, force)
+        if self._shared_state:
+            await self._shared_state.refresh()
+
+        changes = roster_changes(roster, self._saved_team_members)
+        await self._save_members(changes)
+        return len(roster), len(changes)
+
+    async def sync_all_rosters(self, adapter: BotAdapter):
+        """Syncs every team the bot has heard from, a few teams at a time."""
+        semaphore = asyncio.Semaphore(ROSTER_SYNC_CONCURRENCY)
+
+        async def sync(team_id: str, service_url: str):
+            async with semaphore:
+                connector_client = await self._connector_clients.get(adapter, service_url)
+                await self.sync_roster(
+                    team_id,
+                    lambda continuation_token: connector_client.conversations.get_teams_conversation_paged_members(
+                        team_id, ROSTER_PAGE_SIZE, continuation_token
+                    ),
+                )
+
+        teams = [(team_id, service_url) for team_id, service_url in self._service_urls.items() if team_id]
+        results = await asyncio.gather(*[sync(team_id, service_url) for team_id, service_url in teams], return_exceptions=True)
+        for (team_id, _), result in zip(teams, results):
+            if isinstance(result, Exception):
+                print(f"\n [roster_sync] syncing team {team_id} failed: {result}", file=sys.stderr)
+
+    async def _sync_roster_from_message(self, turn_context: TurnContext):
+        team_info = teams_get_team_info(turn_context.activity)
+        if not team_info:
+            self._send(turn_context, MessageFactory.text("*Roster sync only works in a team channel*"))
+            return
+
+        roster_size, changed = await self.sync_roster(
+            team_info.id,
+            lambda continuation_token: TeamsInfo.get_paged_team_members(
+                turn_context, team_info.id, continuation_token, ROSTER_PAGE_SIZE
+            ),
+            force=True,
+        )
+        self._send(
+            turn_context,
+            MessageFactory.text("*Synced {} team members, {} added or updated*".format(roster_size, changed)),
+        )
+
+    def _create_new_thread_in_channel(self, adapter: BotAdapter, service_url: str, teams_channel_id: str, message: Activity) -> asyncio.Future:
         params = ConversationParameters(
                                             is_group=True, 
                                             channel_data={"channel": {"id": teams_channel_id}},
                                             activity=message,
                                         )
 
-        
-        connector_client = await turn_context.adapter.create_connector_client(turn_context.activity.service_url)
-        await connector_client.conversations.create_conversation(params)
+        # New threads don't need ordering between each other, only the global limit.
+        # Not idempotent: a retry after a 502 could post the thread twice.
+        return self._outbound.submit(None, lambda: self._create_conversation(adapter, service_url, params), idempotent=False)
 
-    async def _delete_card_activity(self, turn_context: TurnContext):
-        await turn_context.delete_activity(turn_context.activity.reply_to_id)
+    def _follow_up(
+        self,
+        posted: asyncio.Future,
+        team: TeamContext,
+        service_url: str,
+        reviewee: Union[ChannelAccount, TeamsChannelAccount],
+        reviewers: List[str],
+        submission: ReviewSubmission,
+    ):
+        """Schedules reminders in the review's thread once it's been posted."""
+        if not self._reminders or not reviewers:
+            return
 
-    def _load_team_config(self) -> Dict:
+        def add(future: asyncio.Future):
+            if future.cancelled() or future.exception() or not future.result():
+                return
+            self._reminders.add(
+                PendingReview(
+                    future.result().id,
+                    team.team_id,
+                    service_url,
+                    submission.wi,
+                    submission.link,
+                    reviewee.name,
+                    reviewers,
+                )
+            )
+
+        posted.add_done_callback(add)
+
+    def _send_reminder(self, review: PendingReview, escalate: bool) -> asyncio.Future:
+        posted_on = time.strftime("%Y-%m-%d", time.localtime(review.created_at))
+        if escalate:
+            team_leader = self._teams.get(review.team_id).config.team_leader
+            mentions, entities = self._mentions([team_leader] if team_leader else [])
+            text = "{} *review [{}]({}) from {} posted on {} is still open, reviewers: {}*".format(
+                mentions, review.wi, review.link, review.reviewee, posted_on, ", ".join(review.reviewers)
+            )
+        else:
+            mentions, entities = self._mentions(review.reviewers)
+            text = "{} *reminder: review [{}]({}) from {} has been waiting since {}*".format(
+                mentions, review.wi, review.link, review.reviewee, posted_on
+            )
+
+        activity = MessageFactory.text(text.strip())
+        activity.entities = entities
+        return self._outbound.submit(
+            review.conversation_id,
+            lambda: self._send_to_conversation(review.service_url, review.conversation_id, activity),
+        )
+
+    def _mentions(self, names: List[str]) -> Tuple[str, List[Mention]]:
+        # Only saved members can be mentioned, the rest are written out.
+        texts, entities = [], []
+        for name in names:
+            saved_member = self._saved_team_members.get_by_name(name)
+            if saved_member:
+                mention = "<at>{}</at>".format(name)
+                entities.append(Mention(mentioned=ChannelAccount(id=saved_member["id"], name=name), text=mention, type="mention"))
+                texts.append(mention)
+            else:
+                texts.append(name)
+        return " ".join(texts), entities
+
+    async def _complete_review_from_message(self, team: TeamContext, turn_context: TurnContext):
+        if not self._reminders:
+            self._send(turn_context, MessageFactory.text("*Review reminders are turned off*"))
+            return
+
+        # "review done" in the review's thread, or "review done <WI>" anywhere in the team.
+        wi = REVIEW_DONE_COMMAND.sub("", turn_context.activity.text).strip()
+        if wi:
+            review = await self._reminders.find(team.team_id, wi)
+            review = await self._reminders.complete(review.conversation_id) if review else None
+        else:
+            review = await self._reminders.complete(self._conversation_key(turn_context))
+
+        if review:
+            self._send(turn_context, MessageFactory.text("*Review {} is done, no more reminders : )*".format(review.wi)))
+        else:
+            self._send(turn_context, MessageFactory.text("*No pending review {}found here*".format(wi + " " if wi else "")))
+
+    @timed("connector.create_conversation")
+    async def _create_conversation(self, adapter: BotAdapter, service_url: str, params: ConversationParameters):
+        connector_client = await self._connector_clients.get(adapter, service_url)
+        try:
+            return await connector_client.conversations.create_conversation(params)
+        except Exception as error:
+            # Don't keep reusing a client whose session or credentials went bad.
+            if is_connection_error(error):
+                await self._connector_clients.invalidate(adapter, service_url)
+            raise
+
+    @timed("connector.send_to_conversation")
+    async def _send_to_conversation(self, service_url: str, conversation_id: str, activity: Activity):
+        connector_client = await self._connector_clients.get(self._adapter, service_url)
         try:
-            with open(self._team_config_file, "r") as f_ptr:
-                return json.load(f_ptr)
-        except IOError:
-            raise IOError("No team config file")
+            return await connector_client.conversations.send_to_conversation(conversation_id, activity)
+        except Exception as error:
+            if is_connection_error(error):
+                await self._connector_clients.invalidate(self._adapter, service_url)
+            raise
+
+    def _send(self, turn_context: TurnContext, activity_or_text: Union[Activity, str]) -> asyncio.Future:
+        # Queued rather than awaited, so the turn finishes without waiting on Teams.
+        return self._outbound.submit(
+            self._conversation_key(turn_context),
+            lambda: self._send_activity(turn_context, activity_or_text),
+        )
+
+    @staticmethod
+    @timed("connector.send_activity")
+    async def _send_activity(turn_context: TurnContext, activity_or_text: Union[Activity, str]):
+        return await turn_context.send_activity(activity_or_text)
+
+    @staticmethod
+    @timed("connector.update_activity")
+    async def _update_activity(turn_context: TurnContext, activity: Activity):
+        return await turn_context.update_activity(activity)
+
+    @staticmethod
+    @timed("connector.delete_activity")
+    async def _delete_activity(turn_context: TurnContext, activity_id: str):
+        return await turn_context.delete_activity(activity_id)
+
+    @staticmethod
+    def _conversation_key(turn_context: TurnContext) -> Optional[str]:
+        conversation = turn_context.activity.conversation
+        return conversation.id if conversation else None
+
+    async def _delete_card_activity(self, turn_context: TurnContext):
+        reply_to_id = turn_context.activity.reply_to_id
+        self._outbound.submit(
+            self._conversation_key(turn_context),
+            lambda: self._delete_activity(turn_context, reply_to_id),
+        )
 
-    def _export_saved_team_members(self):
-        with open(self._team_member_file, "w+") as f_ptr:
-            json.dump(self._saved_team_members, f_ptr)
+    def _load_reviewer_load(self) -> ReviewerLoadTracker:
+        assignments = None
+        if os.path.exists(self._reviewer_load_file):
+            with open(self._reviewer_load_file, "r") as f_ptr:
+                assignments = json.load(f_ptr)
 
-    def _load_saved_team_members(self) -> List[Dict]:
+        return ReviewerLoadTracker(assignments)
+
+    def _open_shared_state(self) -> SharedStateStore:
+        # The JSON files seed the database the first time, which is then the only copy written.
+        file_members = self._saved_team_members.to_list()
+        file_load = self._reviewer_load.to_dict()
+        self._saved_team_members.replace([])
+        self._reviewer_load.replace({})
+
+        store = SharedStateStore(self._shared_state_file, self._saved_team_members, self._reviewer_load, self._service_urls)
+        store.import_if_empty(file_members, file_load)
+        return store
+
+    def _load_saved_team_members(self) -> SavedMemberStore:
+        members = None
         if os.path.exists(self._team_member_file):
             with open(self._team_member_file, "r") as f_ptr:
                 members = json.load(f_ptr)
-        if not members:
-            members = []
 
-        return members
+        return SavedMemberStore(members)
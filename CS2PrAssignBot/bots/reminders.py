@@ -0,0 +1,292 @@
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import sys
+import time
+
+from bots.persistence import WriteBehindWriter
+
+
+REMINDER_DELAY = 24 * 60 * 60
+# Reminders sent to the reviewers before the team leader is told instead.
+REMINDERS_BEFORE_ESCALATION = 2
+REMINDERS_FLUSH_INTERVAL = 2.0
+# How often a scheduler on a shared store looks for reviews other workers added.
+REMINDERS_POLL_INTERVAL = 60.0
+
+
+class PendingReview:
+    __slots__ = (
+        "conversation_id",
+        "team_id",
+        "service_url",
+        "wi",
+        "link",
+        "reviewee",
+        "reviewers",
+        "created_at",
+        "reminders",
+        "due_at",
+    )
+
+    def __init__(
+        self,
+        conversation_id: str,
+        team_id: Optional[str],
+        service_url: str,
+        wi: str,
+        link: str,
+        reviewee: str,
+        reviewers: List[str],
+        created_at: Optional[float] = None,
+        reminders: int = 0,
+        due_at: float = 0.0,
+    ):
+        self.conversation_id = conversation_id
+        self.team_id = team_id
+        self.service_url = service_url
+        self.wi = wi
+        self.link = link
+        self.reviewee = reviewee
+        self.reviewers = reviewers
+        self.created_at = created_at or time.time()
+        self.reminders = reminders
+        self.due_at = due_at
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PendingReview":
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+
+# Queues a reminder for the review, or its escalation when the flag is set.
+Remind = Callable[[PendingReview, bool], asyncio.Future]
+# Moves a due review on to its next reminder; returns True when it's escalated instead.
+Advance = Callable[[PendingReview, float], bool]
+
+
+class PendingReviewFile:
+    """
+    Pending reviews of a single process: a dict by conversation, a heap of
+    due times and a JSON file they are written behind to, so timers survive
+    a restart without going through the history. Completing a review only
+    drops it from the dict; its heap entry is skipped when it comes up.
+    """
+
+    def __init__(self, path: str):
+        self._pending: Dict[str, PendingReview] = {}
+        # (due_at, sequence, conversation_id); sequence keeps equal due times in order
+        self._timers: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self._load(path)
+        self._writer = WriteBehindWriter(path, self.to_list, flush_interval=REMINDERS_FLUSH_INTERVAL)
+
+    def _load(self, path: str):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r") as f_ptr:
+                reviews = [PendingReview.from_dict(data) for data in json.load(f_ptr)]
+        except (IOError, ValueError, TypeError, KeyError) as error:
+            print(f"\n [reminders] ignoring unreadable {path}: {error}", file=sys.stderr)
+            return
+
+        for review in reviews:
+            self._pending[review.conversation_id] = review
+            self._timers.append((review.due_at, next(self._sequence), review.conversation_id))
+        heapq.heapify(self._timers)
+
+    async def add(self, review: PendingReview):
+        self._pending[review.conversation_id] = review
+        heapq.heappush(self._timers, (review.due_at, next(self._sequence), review.conversation_id))
+        self._writer.mark_dirty()
+
+    async def complete(self, conversation_id: str) -> Optional[PendingReview]:
+        review = self._pending.pop(conversation_id, None)
+        if review:
+            self._writer.mark_dirty()
+        return review
+
+    async def find(self, team_id: Optional[str], wi: str) -> Optional[PendingReview]:
+        for review in self._pending.values():
+            if review.team_id == team_id and review.wi == wi:
+                return review
+        return None
+
+    async def next_due(self) -> Optional[float]:
+        return self._next_due()
+
+    def _next_due(self) -> Optional[float]:
+        while self._timers:
+            due_at, _, conversation_id = self._timers[0]
+            review = self._pending.get(conversation_id)
+            if review and review.due_at == due_at:
+                return due_at
+            heapq.heappop(self._timers)
+        return None
+
+    async def take_due(self, now: float, advance: Advance) -> List[Tuple[PendingReview, bool]]:
+        due = []
+        while self._next_due() is not None and self._timers[0][0] <= now:
+            review = self._pending[heapq.heappop(self._timers)[2]]
+            escalate = advance(review, now)
+            if escalate:
+                del self._pending[review.conversation_id]
+            else:
+                heapq.heappush(self._timers, (review.due_at, next(self._sequence), review.conversation_id))
+            due.append((review, escalate))
+        if due:
+            self._writer.mark_dirty()
+        return due
+
+    def count(self) -> int:
+        return len(self._pending)
+
+    def to_list(self) -> List[Dict]:
+        return [review.to_dict() for review in self._pending.values()]
+
+    async def close(self):
+        await self._writer.close()
+
+
+class ReminderScheduler:
+    """
+    Follows up on posted reviews until they are marked done.
+
+    A single task sleeps until the earliest pending review is due, so
+    waiting reviews cost nothing between firings. A review is reminded
+    every delay seconds and escalated once after escalate_after reminders,
+    then dropped.
+
+    The reviews themselves live in a store: a PendingReviewFile for a
+    single process, or the database shared by all worker processes (see
+    SharedPendingReviews), which hands each due review to exactly one
+    worker. Reviews other workers add aren't announced, so with a shared
+    store the task also wakes every poll_interval seconds to look for them.
+    Store methods are coroutines, as the shared store waits on its database
+    thread; count() is the exception, for stats.
+    """
+
+    def __init__(
+        self,
+        store,
+        remind: Remind,
+        delay: float = REMINDER_DELAY,
+        escalate_after: int = REMINDERS_BEFORE_ESCALATION,
+        poll_interval: Optional[float] = None,
+    ):
+        self._store = store
+        self._remind = remind
+        self._delay = delay
+        self._escalate_after = escalate_after
+        self._poll_interval = poll_interval
+
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._adding: Set[asyncio.Task] = set()
+
+        self.reminded = 0
+        self.escalated = 0
+        self.completed = 0
+
+    def add(self, review: PendingReview):
+        # Called from the callback of the post, so the store is written in a task of its own.
+        review.due_at = review.due_at or review.created_at + self._delay
+        task = asyncio.get_running_loop().create_task(self._add(review))
+        self._adding.add(task)
+        task.add_done_callback(self._adding.discard)
+
+    async def _add(self, review: PendingReview):
+        try:
+            earliest = await self._store.next_due()
+            await self._store.add(review)
+        except Exception as error:  # pylint: disable=broad-except
+            print(f"\n [reminders] saving review {review.wi} failed: {error}", file=sys.stderr)
+            return
+        if self._wake and (earliest is None or review.due_at < earliest):
+            self._wake.set()
+
+    async def complete(self, conversation_id: str) -> Optional[PendingReview]:
+        review = await self._store.complete(conversation_id)
+        if review:
+            self.completed += 1
+        return review
+
+    async def find(self, team_id: Optional[str], wi: str) -> Optional[PendingReview]:
+        return await self._store.find(team_id, wi)
+
+    def start(self):
+        if not self._task or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        if self._adding:
+            await asyncio.gather(*self._adding)
+        await self._store.close()
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                for review, escalate in await self._store.take_due(time.time(), self._advance):
+                    self._fire(review, escalate)
+                next_due = await self._store.next_due()
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"\n [reminders] checking pending reviews failed: {error}", file=sys.stderr)
+                next_due = None
+
+            timeout = next_due - time.time() if next_due is not None else None
+            if self._poll_interval and (timeout is None or timeout > self._poll_interval):
+                timeout = self._poll_interval
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _advance(self, review: PendingReview, now: float) -> bool:
+        if review.reminders >= self._escalate_after:
+            return True
+        review.reminders += 1
+        # From now rather than from due_at, so reviews that came due
+        # while the bot was down aren't reminded back to back.
+        review.due_at = now + self._delay
+        return False
+
+    def _fire(self, review: PendingReview, escalate: bool):
+        if escalate:
+            self.escalated += 1
+        else:
+            self.reminded += 1
+
+        # Sent through the outbound queue without waiting, so a slow or
+        # throttled send doesn't hold up the reviews due after it.
+        sent = self._remind(review, escalate)
+        sent.add_done_callback(lambda future: self._log_failure(review, future))
+
+    @staticmethod
+    def _log_failure(review: PendingReview, future: asyncio.Future):
+        if not future.cancelled() and future.exception():
+            # Not retried sooner than the next reminder would be.
+            print(f"\n [reminders] following up on {review.wi} failed: {future.exception()}", file=sys.stderr)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self._store.count(),
+            "reminded": self.reminded,
+            "escalated": self.escalated,
+            "completed": self.completed,
+        }
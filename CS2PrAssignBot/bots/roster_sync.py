@@ -0,0 +1,112 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import sys
+import time
+
+from botbuilder.schema import ChannelAccount
+from botbuilder.schema.teams import TeamsPagedMembersResult
+
+from bots.member_store import SavedMemberStore
+
+
+ROSTER_PAGE_SIZE = 500
+ROSTER_CACHE_TTL = 60 * 60
+ROSTER_SYNC_INTERVAL = 6 * 60 * 60
+ROSTER_SYNC_CONCURRENCY = 4
+
+# Fetches one page of team members, given the previous page's continuation token.
+PageFetcher = Callable[[Optional[str]], Awaitable[TeamsPagedMembersResult]]
+
+
+def roster_member(account: ChannelAccount) -> Dict:
+    # Same shape as the accounts "addme" saves.
+    return ChannelAccount(id=account.id, name=account.name, aad_object_id=account.aad_object_id).as_dict()
+
+
+def roster_changes(roster: List[Dict], saved_members: SavedMemberStore) -> List[Dict]:
+    """The roster members that are new or whose name or AAD id changed, merged into what was saved."""
+    changes = []
+    for member in roster:
+        saved = saved_members.get_by_id(member["id"])
+        if not saved:
+            changes.append(member)
+        elif saved.get("name") != member.get("name") or saved.get("aad_object_id") != member.get("aad_object_id"):
+            changes.append(dict(saved, **member))
+    return changes
+
+
+class RosterCache:
+    """
+    Team rosters fetched page by page, kept for ttl seconds.
+
+    Pages of one team are chained by continuation token and so fetched one
+    after another; concurrent requests for the same team share one fetch.
+    """
+
+    def __init__(self, ttl: float = ROSTER_CACHE_TTL):
+        self._ttl = ttl
+        self._rosters: Dict[str, Tuple[float, List[Dict]]] = {}
+        self._fetches: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.fetched_pages = 0
+
+    async def get(self, team_id: str, fetch_page: PageFetcher, force: bool = False) -> List[Dict]:
+        cached = self._rosters.get(team_id)
+        if cached and not force and time.monotonic() - cached[0] < self._ttl:
+            self.hits += 1
+            return cached[1]
+
+        fetch = self._fetches.get(team_id)
+        if not fetch:
+            fetch = self._fetches[team_id] = asyncio.get_running_loop().create_task(self._fetch(team_id, fetch_page))
+            fetch.add_done_callback(lambda _: self._fetches.pop(team_id, None))
+        return await asyncio.shield(fetch)
+
+    async def _fetch(self, team_id: str, fetch_page: PageFetcher) -> List[Dict]:
+        roster = []
+        continuation_token = None
+        while True:
+            page = await fetch_page(continuation_token)
+            self.fetched_pages += 1
+            roster.extend(roster_member(member) for member in page.members or [])
+
+            continuation_token = page.continuation_token
+            if not continuation_token:
+                break
+
+        self._rosters[team_id] = (time.monotonic(), roster)
+        return roster
+
+    def stats(self) -> Dict[str, int]:
+        return {"teams": len(self._rosters), "hits": self.hits, "fetched_pages": self.fetched_pages}
+
+
+class RosterSyncScheduler:
+    """Runs sync every interval seconds; a failed run is logged and retried next time."""
+
+    def __init__(self, sync: Callable[[], Awaitable], interval: float = ROSTER_SYNC_INTERVAL):
+        self._sync = sync
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if not self._task or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self._sync()
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"\n [roster_sync] scheduled sync failed: {error}", file=sys.stderr)
@@ -0,0 +1,432 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+import asyncio
+import json
+import sqlite3
+import sys
+import time
+
+from bots.assignment import RECENT_ASSIGNMENT_WINDOW, ReviewerLoadTracker
+from bots.member_store import SavedMemberStore
+from bots.reminders import Advance, PendingReview
+
+
+SHARED_STATE_BUSY_TIMEOUT = 10.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS saved_members (
+    id TEXT PRIMARY KEY,
+    member TEXT NOT NULL,
+    seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reviewer_assignments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    reviewer TEXT NOT NULL,
+    assigned_at REAL NOT NULL
+);
+-- Assignments taken back, e.g. for a review that failed to post; workers
+-- only ever read new rows, so a removal is itself a new row.
+CREATE TABLE IF NOT EXISTS reviewer_unassignments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    reviewer TEXT NOT NULL,
+    assigned_at REAL NOT NULL
+);
+-- Where to reach each team, as seen on its last authenticated activity.
+CREATE TABLE IF NOT EXISTS service_urls (
+    team_id TEXT PRIMARY KEY,
+    service_url TEXT NOT NULL,
+    seq INTEGER NOT NULL
+);
+-- Activities and submissions already handled by some worker, see claim().
+CREATE TABLE IF NOT EXISTS dedup_keys (
+    key TEXT PRIMARY KEY,
+    claimed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pending_reviews (
+    conversation_id TEXT PRIMARY KEY,
+    team_id TEXT,
+    wi TEXT,
+    due_at REAL NOT NULL,
+    review TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pending_reviews_due_at ON pending_reviews (due_at);
+CREATE INDEX IF NOT EXISTS pending_reviews_wi ON pending_reviews (team_id, wi);
+CREATE INDEX IF NOT EXISTS saved_members_seq ON saved_members (seq);
+CREATE INDEX IF NOT EXISTS service_urls_seq ON service_urls (seq);
+CREATE INDEX IF NOT EXISTS dedup_keys_claimed_at ON dedup_keys (claimed_at);
+CREATE INDEX IF NOT EXISTS reviewer_assignments_assigned_at ON reviewer_assignments (assigned_at);
+"""
+
+# Rows other processes committed since the last pull: (members, assignments,
+# unassignments, service URLs), read on the database thread and applied to
+# the in-memory copies on the event loop.
+_Changes = Tuple[List[Dict], List[Tuple[str, float]], List[Tuple[str, float]], List[Tuple[Optional[str], str]]]
+
+
+class SharedStateStore:
+    """
+    Keeps a worker's saved members, reviewer load, team service URLs and
+    handled activities in step with the other worker processes through one
+    SQLite database (WAL mode).
+
+    The connection belongs to a dedicated thread, so the event loop never
+    waits on the disk or on another worker's write lock. Rows are read
+    there and applied to the in-memory copies back on the loop. refresh()
+    pulls only the rows other processes committed since the last pull, and
+    is a single PRAGMA when nothing changed. assign() holds the database
+    write lock with the copies fully caught up, so a worker can read the
+    load counters, pick reviewers and record them without another worker
+    interleaving.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        members: SavedMemberStore,
+        load_tracker: ReviewerLoadTracker,
+        service_urls: Dict[Optional[str], str],
+        window: float = RECENT_ASSIGNMENT_WINDOW,
+        busy_timeout: float = SHARED_STATE_BUSY_TIMEOUT,
+    ):
+        self._members = members
+        self._load_tracker = load_tracker
+        self._service_urls = service_urls
+        self._window = window
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+
+        # isolation_level=None: transactions are only the ones _begin() opens.
+        self._connection = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+        # One transaction at a time on the connection; created on first use,
+        # inside the event loop.
+        self._lock: Optional[asyncio.Lock] = None
+        self._background: Set[asyncio.Future] = set()
+        # Only touched on the database thread.
+        self._data_version: Optional[int] = None
+        self._member_seq = 0
+        self._assignment_id = 0
+        self._unassignment_id = 0
+        self._service_url_seq = 0
+
+    def import_if_empty(self, members: Iterable[Dict], assignments: Dict[str, List[float]]):
+        """Seeds an empty database, e.g. from the single-process JSON files. Runs before the worker starts serving."""
+        imported: List[Dict] = []
+        try:
+            changes = self._begin()
+            if not self._member_seq and not self._assignment_id:
+                imported = list(members)
+                self._save_members(imported)
+                self._connection.executemany(
+                    "INSERT INTO reviewer_assignments (reviewer, assigned_at) VALUES (?, ?)",
+                    [(reviewer, assigned_at) for reviewer, timestamps in assignments.items() for assigned_at in timestamps],
+                )
+                changes = self._fetch_changes()
+        except BaseException:
+            self._rollback()
+            raise
+        self._commit()
+        self._apply(changes)
+        for member in imported:
+            self._members.update(member)
+
+    async def refresh(self):
+        self._apply(await self._run(self._fetch_if_changed))
+
+    def _fetch_if_changed(self) -> Optional[_Changes]:
+        # data_version only moves when another connection commits.
+        data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return None
+        self._data_version = data_version
+        return self._fetch_changes()
+
+    def _fetch_changes(self) -> _Changes:
+        # The cursors move here, on the database thread, so rows fetched by
+        # overlapping calls are never handed out twice.
+        members = []
+        for member, seq in self._connection.execute(
+            "SELECT member, seq FROM saved_members WHERE seq > ? ORDER BY seq", (self._member_seq,)
+        ):
+            members.append(json.loads(member))
+            self._member_seq = seq
+
+        assignments = []
+        expired_before = time.time() - self._window
+        for assignment_id, reviewer, assigned_at in self._connection.execute(
+            "SELECT id, reviewer, assigned_at FROM reviewer_assignments WHERE id > ? ORDER BY id", (self._assignment_id,)
+        ):
+            if assigned_at >= expired_before:
+                assignments.append((reviewer, assigned_at))
+            self._assignment_id = assignment_id
+
+        unassignments = []
+        for unassignment_id, reviewer, assigned_at in self._connection.execute(
+            "SELECT id, reviewer, assigned_at FROM reviewer_unassignments WHERE id > ? ORDER BY id", (self._unassignment_id,)
+        ):
+            unassignments.append((reviewer, assigned_at))
+            self._unassignment_id = unassignment_id
+
+        service_urls = []
+        for team_id, service_url, seq in self._connection.execute(
+            "SELECT team_id, service_url, seq FROM service_urls WHERE seq > ? ORDER BY seq", (self._service_url_seq,)
+        ):
+            # No team is stored as "", the column is the primary key.
+            service_urls.append((team_id or None, service_url))
+            self._service_url_seq = seq
+        return members, assignments, unassignments, service_urls
+
+    def _apply(self, changes: Optional[_Changes]):
+        if not changes:
+            return
+        members, assignments, unassignments, service_urls = changes
+        for member in members:
+            self._members.update(member)
+        for reviewer, assigned_at in assignments:
+            self._load_tracker.record([reviewer], assigned_at)
+        for reviewer, assigned_at in unassignments:
+            self._load_tracker.unrecord([reviewer], assigned_at)
+        for team_id, service_url in service_urls:
+            self._service_urls[team_id] = service_url
+
+    async def _run(self, func: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _begin(self) -> _Changes:
+        self._connection.execute("BEGIN IMMEDIATE")
+        return self._fetch_changes()
+
+    def _commit(self):
+        self._connection.execute("COMMIT")
+
+    def _rollback(self):
+        # Also run after a BEGIN that failed, or that the caller was cancelled out of.
+        if self._connection.in_transaction:
+            self._connection.execute("ROLLBACK")
+
+    @asynccontextmanager
+    async def locked(self):
+        """
+        Holds the database write lock, with the in-memory copies caught up,
+        until the block ends. Not reentrant; statements inside go through
+        _run() like any other.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                self._apply(await self._run(self._begin))
+                yield
+            except BaseException:
+                # Queued behind anything of this transaction still running on the thread.
+                await self._run(self._rollback)
+                raise
+            await self._run(self._commit)
+
+    async def _write(self, func: Callable, *args):
+        """Runs func on the database thread in a transaction of its own."""
+        async with self.locked():
+            return await self._run(func, *args)
+
+    def _in_background(self, write) -> asyncio.Future:
+        # For callers that can't wait; close() still does.
+        task = asyncio.ensure_future(write)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+        return task
+
+    def _background_done(self, task: asyncio.Future):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"\n [shared_state] background write failed: {task.exception()}", file=sys.stderr)
+
+    async def save_members(self, members: Iterable[Dict]):
+        members = list(members)
+        await self._write(self._save_members, members)
+        for member in members:
+            self._members.update(member)
+
+    def _save_members(self, members: List[Dict]):
+        for member in members:
+            self._save_member(member)
+
+    def _save_member(self, member: Dict):
+        self._member_seq += 1
+        self._connection.execute(
+            "INSERT INTO saved_members (id, member, seq) VALUES (?, ?, ?)"
+            " ON CONFLICT (id) DO UPDATE SET member = excluded.member, seq = excluded.seq",
+            (member["id"], json.dumps(member), self._member_seq),
+        )
+
+    async def save_service_url(self, team_id: Optional[str], service_url: str):
+        await self._write(self._save_service_url, team_id, service_url)
+        self._service_urls[team_id] = service_url
+
+    def _save_service_url(self, team_id: Optional[str], service_url: str):
+        self._service_url_seq = self._connection.execute(
+            "SELECT COALESCE(MAX(seq), 0) + 1 FROM service_urls"
+        ).fetchone()[0]
+        self._connection.execute(
+            "INSERT INTO service_urls (team_id, service_url, seq) VALUES (?, ?, ?)"
+            " ON CONFLICT (team_id) DO UPDATE SET service_url = excluded.service_url, seq = excluded.seq",
+            (team_id or "", service_url, self._service_url_seq),
+        )
+
+    async def assign(self, pick: Callable[[], List[str]], now: Optional[float] = None) -> List[str]:
+        """
+        Calls pick() under the write lock, with the load counters caught up,
+        and records the reviewers it returns before another worker can pick.
+        """
+        now = now or time.time()
+        async with self.locked():
+            reviewers = pick()
+            await self._run(self._insert_assignments, reviewers, now)
+        self._load_tracker.record(reviewers, now)
+        return reviewers
+
+    def _insert_assignments(self, reviewers: List[str], now: float):
+        self._connection.executemany(
+            "INSERT INTO reviewer_assignments (reviewer, assigned_at) VALUES (?, ?)",
+            [(reviewer, now) for reviewer in reviewers],
+        )
+        # Caught up under the lock, so every row past the cursor is ours.
+        self._assignment_id = self._connection.execute(
+            "SELECT COALESCE(MAX(id), ?) FROM reviewer_assignments", (self._assignment_id,)
+        ).fetchone()[0]
+        self._connection.execute("DELETE FROM reviewer_assignments WHERE assigned_at < ?", (now - self._window,))
+        self._connection.execute("DELETE FROM reviewer_unassignments WHERE assigned_at < ?", (now - self._window,))
+
+    def unrecord_assignments(self, reviewers: Iterable[str], at: float) -> asyncio.Future:
+        """Takes the assignments back here at once; the database follows in the background."""
+        reviewers = list(reviewers)
+        self._load_tracker.unrecord(reviewers, at)
+        return self._in_background(self._write(self._delete_assignments, reviewers, at))
+
+    def _delete_assignments(self, reviewers: List[str], at: float):
+        for reviewer in reviewers:
+            self._connection.execute(
+                "DELETE FROM reviewer_assignments WHERE id = ("
+                " SELECT id FROM reviewer_assignments WHERE reviewer = ? AND assigned_at = ? LIMIT 1)",
+                (reviewer, at),
+            )
+        self._connection.executemany(
+            "INSERT INTO reviewer_unassignments (reviewer, assigned_at) VALUES (?, ?)",
+            [(reviewer, at) for reviewer in reviewers],
+        )
+        self._unassignment_id = self._connection.execute(
+            "SELECT COALESCE(MAX(id), ?) FROM reviewer_unassignments", (self._unassignment_id,)
+        ).fetchone()[0]
+
+    async def claim(self, key: Hashable, ttl: float) -> bool:
+        """
+        Like DedupCache.claim(), across every worker: True only for the
+        first worker to claim key within ttl seconds (wall clock, as it's
+        compared between processes). Keys must be JSON serializable.
+        """
+        return await self._write(self._claim, json.dumps(key), ttl, time.time())
+
+    def _claim(self, key: str, ttl: float, now: float) -> bool:
+        self._connection.execute("DELETE FROM dedup_keys WHERE claimed_at <= ?", (now - ttl,))
+        return self._connection.execute(
+            "INSERT OR IGNORE INTO dedup_keys (key, claimed_at) VALUES (?, ?)", (key, now)
+        ).rowcount == 1
+
+    def release(self, key: Hashable) -> asyncio.Future:
+        return self._in_background(self._write(self._release, json.dumps(key)))
+
+    def _release(self, key: str):
+        self._connection.execute("DELETE FROM dedup_keys WHERE key = ?", (key,))
+
+    async def close(self):
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        await self._run(self._connection.close)
+        self._executor.shutdown()
+
+
+class SharedPendingReviews:
+    """
+    The reviews waiting for a reminder, kept in the shared database rather
+    than per worker, so marking one done on any worker stops its reminders
+    everywhere. take_due() advances the due reviews under the write lock,
+    so each reminder is handed to exactly one worker.
+    """
+
+    def __init__(self, store: SharedStateStore):
+        self._store = store
+        self._connection = store._connection  # pylint: disable=protected-access
+        # As of this worker's last look at the table, for stats; counting on
+        # every scrape would queue behind the writes.
+        self._count = 0
+
+    async def add(self, review: PendingReview):
+        await self._store._write(self._add, review)  # pylint: disable=protected-access
+
+    def _add(self, review: PendingReview):
+        self._save(review)
+        self._count_pending()
+
+    def _save(self, review: PendingReview):
+        self._connection.execute(
+            "INSERT INTO pending_reviews (conversation_id, team_id, wi, due_at, review) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (conversation_id) DO UPDATE SET due_at = excluded.due_at, review = excluded.review",
+            (review.conversation_id, review.team_id, review.wi, review.due_at, json.dumps(review.to_dict())),
+        )
+
+    async def complete(self, conversation_id: str) -> Optional[PendingReview]:
+        return await self._store._write(self._complete, conversation_id)  # pylint: disable=protected-access
+
+    def _complete(self, conversation_id: str) -> Optional[PendingReview]:
+        review = self._get("conversation_id = ?", (conversation_id,))
+        if review:
+            self._connection.execute("DELETE FROM pending_reviews WHERE conversation_id = ?", (conversation_id,))
+            self._count_pending()
+        return review
+
+    async def find(self, team_id: Optional[str], wi: str) -> Optional[PendingReview]:
+        return await self._store._run(self._get, "team_id IS ? AND wi = ?", (team_id, wi))  # pylint: disable=protected-access
+
+    def _get(self, where: str, params: Tuple) -> Optional[PendingReview]:
+        row = self._connection.execute(f"SELECT review FROM pending_reviews WHERE {where} LIMIT 1", params).fetchone()
+        return PendingReview.from_dict(json.loads(row[0])) if row else None
+
+    async def next_due(self) -> Optional[float]:
+        return await self._store._run(self._next_due)  # pylint: disable=protected-access
+
+    def _next_due(self) -> Optional[float]:
+        next_due, self._count = self._connection.execute("SELECT MIN(due_at), COUNT(*) FROM pending_reviews").fetchone()
+        return next_due
+
+    async def take_due(self, now: float, advance: Advance) -> List[Tuple[PendingReview, bool]]:
+        # Cheap check first, so an idle wake-up doesn't take the write lock.
+        next_due = await self.next_due()
+        if next_due is None or next_due > now:
+            return []
+        return await self._store._write(self._take_due, now, advance)  # pylint: disable=protected-access
+
+    def _take_due(self, now: float, advance: Advance) -> List[Tuple[PendingReview, bool]]:
+        due = []
+        for (data,) in self._connection.execute(
+            "SELECT review FROM pending_reviews WHERE due_at <= ? ORDER BY due_at", (now,)
+        ).fetchall():
+            review = PendingReview.from_dict(json.loads(data))
+            escalate = advance(review, now)
+            if escalate:
+                self._connection.execute("DELETE FROM pending_reviews WHERE conversation_id = ?", (review.conversation_id,))
+            else:
+                self._save(review)
+            due.append((review, escalate))
+        self._count_pending()
+        return due
+
+    def _count_pending(self):
+        self._count = self._connection.execute("SELECT COUNT(*) FROM pending_reviews").fetchone()[0]
+
+    def count(self) -> int:
+        return self._count
+
+    async def close(self):
+        pass
@@ -0,0 +1,54 @@
+from typing import Dict, List, Optional
+
+from bots.name_index import NameIndex
+
+
+class ReviewSubmission:
+    """
+    A submitpr form or batch entry, parsed once per turn.
+
+    reviewer_names keeps the comma-separated pieces as typed, for error
+    messages; resolve() maps them to team members once per name index and
+    remembers the result. number_of_reviewers is None when the field isn't
+    a non-negative number.
+    """
+
+    __slots__ = (
+        "wi",
+        "link",
+        "description",
+        "reviewers_text",
+        "reviewer_names",
+        "task_group",
+        "number_text",
+        "number_of_reviewers",
+        "_name_index",
+        "_resolved",
+    )
+
+    def __init__(self, data: Dict):
+        self.wi: str = str(data.get("WI") or "")
+        self.link: str = str(data.get("ReviewLink") or "")
+        self.description: str = str(data.get("Description") or "")
+        self.reviewers_text: str = str(data.get("Reviewers") or "")
+        self.reviewer_names: List[str] = self.reviewers_text.split(",")
+        self.task_group: str = str(data.get("TaskGroup") or "")
+        self.number_text: str = str(data.get("NumberOfReviewers") or "0").strip()
+        self.number_of_reviewers: Optional[int] = int(self.number_text) if self.number_text.isdigit() else None
+
+        self._name_index: Optional[NameIndex] = None
+        self._resolved: List[Optional[str]] = []
+
+    @property
+    def names_reviewers(self) -> bool:
+        return any(name.strip() for name in self.reviewer_names)
+
+    def resolve(self, name_index: NameIndex) -> List[Optional[str]]:
+        """The member each of reviewer_names resolves to, or None."""
+        if self._name_index is not name_index:
+            self._resolved = [name_index.resolve(name) for name in self.reviewer_names] if self.names_reviewers else []
+            self._name_index = name_index
+        return self._resolved
+
+    def reviewers(self, name_index: NameIndex) -> List[str]:
+        return [member for member in self.resolve(name_index) if member]
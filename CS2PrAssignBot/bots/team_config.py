@@ -0,0 +1,135 @@
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple
+
+from bots.assignment import ASSIGNMENT_STRATEGIES, DEFAULT_ASSIGNMENT_STRATEGY
+from bots.availability import parse_out_of_office, parse_reviewer_capacity
+
+
+class _Frozen:
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _set(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+
+class TaskGroup(_Frozen):
+    """A task group's members in config order, plus a set for membership checks."""
+
+    __slots__ = ("name", "members", "member_set")
+
+    def __init__(self, name: str, members: List[str]):
+        self._set(name=name, members=tuple(members), member_set=frozenset(members))
+
+
+class TeamConfig(_Frozen):
+    """
+    A team_config.json compiled once at load: immutable, with task groups
+    looked up by case-folded name and each member's groups precomputed.
+    """
+
+    __slots__ = (
+        "channel_id",
+        "team_id",
+        "team_name",
+        "team_leader",
+        "assignment_strategy",
+        "groups",
+        "all_members",
+        "out_of_office",
+        "reviewer_capacity",
+        "_groups_by_key",
+        "_member_groups",
+    )
+
+    def __init__(
+        self,
+        channel_id: str,
+        team_id: Optional[str],
+        team_name: str,
+        team_leader: Optional[str],
+        assignment_strategy: str,
+        groups: Dict[str, List[str]],
+        out_of_office: Dict[str, List[Tuple[float, float]]],
+        reviewer_capacity: Dict[str, int],
+    ):
+        task_groups = {name: TaskGroup(name, members) for name, members in groups.items()}
+        member_groups: Dict[str, List[str]] = {}
+        for group in task_groups.values():
+            for member in group.member_set:
+                member_groups.setdefault(member, []).append(group.name)
+
+        self._set(
+            channel_id=channel_id,
+            team_id=team_id,
+            team_name=team_name,
+            team_leader=team_leader,
+            assignment_strategy=assignment_strategy,
+            groups=MappingProxyType(task_groups),
+            all_members=frozenset(member_groups),
+            out_of_office=MappingProxyType({member: tuple(windows) for member, windows in out_of_office.items()}),
+            reviewer_capacity=MappingProxyType(dict(reviewer_capacity)),
+            _groups_by_key=MappingProxyType({_group_key(name): group for name, group in task_groups.items()}),
+            _member_groups=MappingProxyType({member: tuple(names) for member, names in member_groups.items()}),
+        )
+
+    def group(self, name: str) -> Optional[TaskGroup]:
+        return self._groups_by_key.get(_group_key(name))
+
+    def groups_of(self, member: str) -> Tuple[str, ...]:
+        return self._member_groups.get(member, ())
+
+
+def _group_key(name: str) -> str:
+    return name.strip().casefold()
+
+
+def _optional_string(config: Dict, key: str, config_file: str) -> Optional[str]:
+    value = config.get(key)
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"{config_file}: {key} must be a string")
+    return value
+
+
+def compile_team_config(config: Any, config_file: str) -> TeamConfig:
+    """Validates a loaded team config and compiles it; raises ValueError naming the file and the bad key."""
+    if not isinstance(config, dict):
+        raise ValueError(f"{config_file}: team config must be a JSON object")
+
+    if not isinstance(config.get("channel_id"), str) or not config["channel_id"]:
+        raise ValueError(f"{config_file}: channel_id is required")
+
+    groups = config.get("groups")
+    if not isinstance(groups, dict):
+        raise ValueError(f"{config_file}: groups must be an object of group name to member list")
+
+    group_keys: Dict[str, str] = {}
+    for group_name, members in groups.items():
+        if not isinstance(members, list) or not all(isinstance(member, str) and member.strip() for member in members):
+            raise ValueError(f"{config_file}: group {group_name} must be a list of member names")
+        if _group_key(group_name) in group_keys:
+            raise ValueError(f"{config_file}: groups {group_keys[_group_key(group_name)]} and {group_name} differ only in case")
+        group_keys[_group_key(group_name)] = group_name
+
+    assignment_strategy = (_optional_string(config, "assignment_strategy", config_file) or DEFAULT_ASSIGNMENT_STRATEGY).strip().lower()
+    if assignment_strategy not in ASSIGNMENT_STRATEGIES:
+        raise ValueError(
+            f"{config_file}: unknown assignment_strategy {assignment_strategy}, expected one of {', '.join(ASSIGNMENT_STRATEGIES)}"
+        )
+
+    return TeamConfig(
+        config["channel_id"],
+        _optional_string(config, "team_id", config_file),
+        _optional_string(config, "team_name", config_file) or "",
+        _optional_string(config, "team_leader", config_file),
+        assignment_strategy,
+        groups,
+        parse_out_of_office(config.get("out_of_office"), config_file),
+        parse_reviewer_capacity(config.get("reviewer_capacity"), config_file),
+    )
@@ -0,0 +1,302 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+from bots.assignment import AssignmentStrategy, ReviewerLoadTracker, create_assignment_strategy
+from bots.availability import GENERAL_POOL, ReviewerAvailability
+from bots.name_index import NameIndex
+from bots.team_config import TeamConfig, compile_team_config
+
+
+TEAM_IDLE_TIMEOUT = 30 * 60
+TEAM_RESCAN_INTERVAL = 60
+CONFIG_POLL_INTERVAL = 5
+
+_config_versions = itertools.count(1)
+
+
+class TeamContext:
+    """
+    A compiled team config together with everything derived from it. A
+    reload builds a new TeamContext, so a turn that already holds one keeps
+    seeing the config it started with.
+    """
+
+    def __init__(
+        self,
+        config: TeamConfig,
+        load_tracker: ReviewerLoadTracker,
+        config_file: Optional[str] = None,
+        mtime: float = 0.0,
+        rng: Optional[random.Random] = None,
+    ):
+        self.config = config
+        # Unique per snapshot, so it changes on every reload.
+        self.version = next(_config_versions)
+        self.config_file = config_file
+        self.mtime = mtime
+        self.team_id: Optional[str] = config.team_id
+        self.general_task_group: List[str] = list(config.all_members)
+        load_tracker.track(self.general_task_group)
+        self.name_index = NameIndex(self.general_task_group)
+        self.assignment_strategy: AssignmentStrategy = create_assignment_strategy(
+            config.assignment_strategy,
+            load_tracker,
+            rng,
+        )
+        self.availability = ReviewerAvailability(
+            {name: group.members for name, group in config.groups.items()},
+            config.out_of_office,
+            config.reviewer_capacity,
+            load_tracker,
+        )
+        self.last_used = time.monotonic()
+
+    def group_name(self, name: str) -> Optional[str]:
+        """The configured spelling of a task group name, matched case-insensitively."""
+        group = self.config.group(name)
+        return group.name if group else None
+
+    def count_available(self, reviewee: str, excluded_members: Iterable[str], now: Optional[float] = None) -> int:
+        """How many reviewers assign_reviewers could pick at most right now."""
+        self.availability.refresh(now)
+        pool = self.availability.pool(GENERAL_POOL)
+        excluded = set(excluded_members)
+        excluded.add(reviewee)
+        return len(pool) - len(pool & excluded)
+
+    def assign_reviewers(
+        self,
+        reviewee: str,
+        task_group_name: str,
+        number_of_reviewers: int,
+        excluded_members: Iterable[str],
+        now: Optional[float] = None,
+    ) -> List[str]:
+        """
+        Picks reviewers from the task group first and tops up from the other
+        groups. Only available members are in the pools, so this may return
+        fewer reviewers than asked for.
+        """
+        availability = self.availability
+        availability.refresh(now)
+
+        group = self.config.group(task_group_name)
+        task_group_name = group.name if group and group.members else GENERAL_POOL
+
+        excluded = set(excluded_members)
+        excluded.add(reviewee)
+
+        assign_from_group = availability.pool(task_group_name) - excluded
+        if number_of_reviewers >= len(assign_from_group):
+            reviewers = availability.pick(self.assignment_strategy, len(assign_from_group), assign_from_group, now)
+            assign_from_general_group = availability.pool(GENERAL_POOL) - excluded - assign_from_group
+            reviewers.extend(
+                availability.pick(self.assignment_strategy, number_of_reviewers - len(reviewers), assign_from_general_group, now)
+            )
+        else:
+            reviewers = availability.pick(self.assignment_strategy, number_of_reviewers, assign_from_group, now)
+
+        return reviewers
+
+
+class TeamRegistry:
+    """
+    Team configs keyed by team_id.
+
+    The default config (team_config.json) is always loaded and serves
+    activities whose team can't be resolved or has no valid config of its
+    own. Every config in config_dir is validated when the directory is
+    scanned, which happens once on construction and then off the event
+    loop through rescan_config_dir(); a file is only parsed again once its
+    mtime changes, and an invalid one is logged and left out, so its team
+    falls back to the default config. Configs are loaded on first use and
+    dropped again once they've been idle for idle_timeout seconds.
+    reload_changed_configs() swaps in a new snapshot for every loaded
+    config whose file changed.
+    """
+
+    def __init__(
+        self,
+        default_config_file: str,
+        config_dir: str,
+        load_tracker: ReviewerLoadTracker,
+        idle_timeout: float = TEAM_IDLE_TIMEOUT,
+    ):
+        self._config_dir = config_dir
+        self._load_tracker = load_tracker
+        self._idle_timeout = idle_timeout
+
+        self._default_team = self._load_team(default_config_file)
+        self._active_teams: Dict[str, TeamContext] = {}
+
+        # config file -> (mtime, team_id or None when invalid), as of the last scan
+        self._scanned: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._config_files: Dict[str, str] = {}
+        self._rejected_mtimes: Dict[str, float] = {}
+        self._apply_scan(self._scan_config_dir(self._scanned))
+
+    @property
+    def default_team(self) -> TeamContext:
+        return self._default_team
+
+    def __len__(self) -> int:
+        return len(self._active_teams)
+
+    def get(self, team_id: Optional[str]) -> TeamContext:
+        self._evict_idle_teams()
+
+        if not team_id or team_id == self._default_team.team_id:
+            return self._default_team
+
+        team = self._active_teams.get(team_id)
+        if not team:
+            config_file = self._config_files.get(team_id)
+            if not config_file:
+                return self._default_team
+
+            try:
+                team = self._load_team(config_file)
+            except (IOError, ValueError) as error:
+                # Changed since the scan validated it; left out until it changes again.
+                print(f"Using the default team config for team {team_id}: {error}", file=sys.stderr)
+                del self._config_files[team_id]
+                self._scanned[config_file] = (self._mtime(config_file), None)
+                return self._default_team
+            self._active_teams[team_id] = team
+
+        team.last_used = time.monotonic()
+        return team
+
+    def reload_changed_configs(self):
+        if self._config_changed(self._default_team):
+            self._default_team = self._reload_team(self._default_team)
+
+        for team_id, team in list(self._active_teams.items()):
+            if self._config_changed(team):
+                self._active_teams[team_id] = self._reload_team(team)
+
+    def _config_changed(self, team: TeamContext) -> bool:
+        try:
+            mtime = os.stat(team.config_file).st_mtime
+        except OSError:
+            return False
+        return mtime != team.mtime and mtime != self._rejected_mtimes.get(team.config_file)
+
+    def _reload_team(self, team: TeamContext) -> TeamContext:
+        # A config that fails to load or validate keeps its previous snapshot
+        # until the file changes again.
+        try:
+            return self._load_team(team.config_file)
+        except (IOError, ValueError) as error:
+            self._rejected_mtimes[team.config_file] = self._mtime(team.config_file)
+            print(f"Keeping previous team config {team.config_file}: {error}", file=sys.stderr)
+            return team
+
+    def _load_team(self, config_file: str) -> TeamContext:
+        mtime = self._mtime(config_file)
+        config = compile_team_config(self._load_config(config_file), config_file)
+        return TeamContext(config, self._load_tracker, config_file=config_file, mtime=mtime)
+
+    async def rescan_config_dir(self):
+        """Picks up added, changed and removed configs, parsing them on a worker thread."""
+        scanned = await asyncio.get_running_loop().run_in_executor(None, self._scan_config_dir, dict(self._scanned))
+        self._apply_scan(scanned)
+
+    def _scan_config_dir(self, previous: Dict[str, Tuple[float, Optional[str]]]) -> Dict[str, Tuple[float, Optional[str]]]:
+        # Touches no registry state, so it can run off the event loop.
+        if not os.path.isdir(self._config_dir):
+            return {}
+
+        scanned = {}
+        for file_name in os.listdir(self._config_dir):
+            if not file_name.endswith(".json"):
+                continue
+            config_file = os.path.join(self._config_dir, file_name)
+            mtime = self._mtime(config_file)
+            if config_file in previous and previous[config_file][0] == mtime:
+                scanned[config_file] = previous[config_file]
+                continue
+
+            try:
+                team_id = compile_team_config(self._load_config(config_file), config_file).team_id
+            except (IOError, ValueError) as error:
+                print(f"Skipping team config {config_file}: {error}", file=sys.stderr)
+                team_id = None
+            scanned[config_file] = (mtime, team_id)
+        return scanned
+
+    def _apply_scan(self, scanned: Dict[str, Tuple[float, Optional[str]]]):
+        self._scanned = scanned
+        self._config_files = {team_id: config_file for config_file, (_, team_id) in scanned.items() if team_id}
+
+    def _evict_idle_teams(self):
+        expired_before = time.monotonic() - self._idle_timeout
+        for team_id in [team_id for team_id, team in self._active_teams.items() if team.last_used < expired_before]:
+            del self._active_teams[team_id]
+
+    @staticmethod
+    def _mtime(config_file: str) -> float:
+        try:
+            return os.stat(config_file).st_mtime
+        except OSError:
+            return 0.0
+
+    @staticmethod
+    def _load_config(config_file: str) -> Dict:
+        try:
+            with open(config_file, "r") as f_ptr:
+                return json.load(f_ptr)
+        except IOError:
+            raise IOError(f"No team config file {config_file}")
+        except ValueError as error:
+            raise ValueError(f"{config_file}: not valid JSON: {error}") from None
+
+
+class TeamConfigWatcher:
+    """
+    Polls the loaded team config files and hot-reloads the ones that
+    changed, and rescans the config directory every rescan_interval seconds.
+    """
+
+    def __init__(
+        self,
+        registry: TeamRegistry,
+        poll_interval: float = CONFIG_POLL_INTERVAL,
+        rescan_interval: float = TEAM_RESCAN_INTERVAL,
+    ):
+        self._registry = registry
+        self._poll_interval = poll_interval
+        self._rescan_interval = rescan_interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if not self._task or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _poll(self):
+        last_scan = time.monotonic()
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            # One bad poll must not stop hot-reloading for good.
+            try:
+                self._registry.reload_changed_configs()
+                if time.monotonic() - last_scan >= self._rescan_interval:
+                    last_scan = time.monotonic()
+                    await self._registry.rescan_config_dir()
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"\n [team_config] polling team configs failed: {error}", file=sys.stderr)
@@ -0,0 +1,65 @@
+"""
+Summarizes the slowest stages in PrAssignBot trace files (see bots.tracing).
+
+    cd CS2PrAssignBot
+    python -m bots.trace_summary trace.jsonl trace.jsonl.1 --top 10
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import heapq
+import json
+import os
+import sys
+
+
+def _read_spans(paths: List[str]) -> Iterator[Dict]:
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f_ptr:
+            for line in f_ptr:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash or rotation.
+                    continue
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def summarize(paths: List[str], top: int = 10) -> str:
+    durations: Dict[str, List[float]] = {}
+    slowest: List[Tuple[float, str, Optional[str]]] = []
+    for record in _read_spans(paths):
+        durations.setdefault(record["name"], []).append(record["duration_ms"])
+        slowest.append((record["duration_ms"], record["name"], record.get("trace_id")))
+
+    lines = [f"{'stage':<36}{'count':>8}{'p50_ms':>10}{'p95_ms':>10}{'max_ms':>10}{'total_ms':>12}"]
+    stages = []
+    for name, values in durations.items():
+        values.sort()
+        stages.append((_percentile(values, 95), name, values))
+    for p95, name, values in sorted(stages, reverse=True)[:top]:
+        lines.append(f"{name:<36}{len(values):>8}{_percentile(values, 50):>10.2f}{p95:>10.2f}{values[-1]:>10.2f}{sum(values):>12.1f}")
+
+    lines.append("")
+    lines.append("slowest spans (activity id):")
+    for duration, name, trace_id in heapq.nlargest(top, slowest):
+        lines.append(f"  {duration:>10.2f} ms  {name}  {trace_id}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="trace files, e.g. trace.jsonl trace.jsonl.1")
+    parser.add_argument("--top", type=int, default=10, help="stages and spans to show")
+    args = parser.parse_args(argv)
+
+    missing = [path for path in args.paths if not os.path.exists(path)]
+    if missing:
+        parser.error(f"no such file: {', '.join(missing)}")
+    print(summarize(args.paths, args.top))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
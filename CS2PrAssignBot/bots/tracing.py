@@ -0,0 +1,131 @@
+"""
+Per-turn span tracing to a rotating JSONL file.
+
+Spans nest through context variables and carry the id of the activity that
+started the turn. A finished span is only put on a queue; a logging
+QueueListener thread serializes it and writes it through a
+RotatingFileHandler, so the event loop never waits on the file. While
+tracing is not configured span() returns a shared no-op context manager.
+
+Summarize trace files with python -m bots.trace_summary.
+"""
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Dict, Iterator, Optional, Tuple
+import itertools
+import json
+import logging
+import queue
+import time
+
+
+TRACE_MAX_BYTES = 10 * 1024 * 1024
+TRACE_BACKUP_COUNT = 5
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_parent_span_id: ContextVar[Optional[int]] = ContextVar("parent_span_id", default=None)
+_span_ids = itertools.count(1)
+
+_NO_SPAN = nullcontext()
+_spans: Optional[queue.SimpleQueue] = None
+_listener: Optional[QueueListener] = None
+
+
+class _SpanListener(QueueListener):
+    # Spans are queued as plain dicts; building the log record and the JSON
+    # line happens here, on the listener thread.
+    def prepare(self, record):
+        return logging.makeLogRecord({"msg": json.dumps(record, default=str), "levelno": logging.INFO})
+
+
+def configure(path: str, max_bytes: int = TRACE_MAX_BYTES, backup_count: int = TRACE_BACKUP_COUNT):
+    global _spans, _listener  # pylint: disable=global-statement
+    shutdown()
+
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    _spans = queue.SimpleQueue()
+    _listener = _SpanListener(_spans, file_handler)
+    _listener.start()
+
+
+def shutdown():
+    """Stops tracing and writes out the spans still queued."""
+    global _spans, _listener  # pylint: disable=global-statement
+    _spans = None
+    if _listener:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    _listener = None
+
+
+def enabled() -> bool:
+    return _spans is not None
+
+
+def span(name: str, trace_id: Optional[str] = None, **attributes):
+    """
+    Context manager timing one stage. trace_id starts a new trace (e.g. the
+    activity id of a turn); otherwise the span joins the current one.
+    """
+    if _spans is None:
+        return _NO_SPAN
+    return _span(name, trace_id, attributes)
+
+
+@contextmanager
+def _span(name: str, trace_id: Optional[str], attributes: Dict) -> Iterator[None]:
+    span_id = next(_span_ids)
+    trace_token = _trace_id.set(trace_id) if trace_id else None
+    parent_id = _parent_span_id.get()
+    parent_token = _parent_span_id.set(span_id)
+
+    started_at = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        record = {
+            "trace_id": _trace_id.get(),
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "name": name,
+            "start": started_at,
+            "duration_ms": round(duration * 1000, 3),
+        }
+        if error:
+            record["error"] = error
+        if attributes:
+            record["attributes"] = attributes
+
+        _parent_span_id.reset(parent_token)
+        if trace_token:
+            _trace_id.reset(trace_token)
+
+        spans = _spans
+        if spans:
+            spans.put_nowait(record)
+
+
+def capture() -> Tuple[Optional[str], Optional[int]]:
+    """The current trace and span, to continue them from another task."""
+    return _trace_id.get(), _parent_span_id.get()
+
+
+@contextmanager
+def resume(context: Tuple[Optional[str], Optional[int]]) -> Iterator[None]:
+    trace_id, parent_id = context
+    trace_token = _trace_id.set(trace_id)
+    parent_token = _parent_span_id.set(parent_id)
+    try:
+        yield
+    finally:
+        _parent_span_id.reset(parent_token)
+        _trace_id.reset(trace_token)
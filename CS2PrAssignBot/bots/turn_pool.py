@@ -0,0 +1,88 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import sys
+import traceback
+
+
+TURN_POOL_WORKERS = 8
+TURN_POOL_MAX_QUEUE = 200
+TURN_POOL_CLOSE_TIMEOUT = 30.0
+
+# What to do with a turn that arrives while the queue is full.
+SHED_INLINE = "inline"  # process it before answering, slowing the caller down
+SHED_REJECT = "reject"  # answer 503 and let the channel retry
+SHED_POLICIES = (SHED_INLINE, SHED_REJECT)
+
+
+class TurnPool:
+    """
+    Bounded pool of workers running turns after the HTTP request was answered.
+
+    At most max_queue turns wait for a worker; submit() returns False once the
+    queue is full so the caller can apply its shedding policy.
+    """
+
+    def __init__(self, workers: int = TURN_POOL_WORKERS, max_queue: int = TURN_POOL_MAX_QUEUE):
+        self._workers_count = workers
+        self._max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.shed = 0
+
+    def submit(self, turn: Callable[[], Awaitable]) -> bool:
+        self._start()
+        try:
+            self._queue.put_nowait(turn)
+        except asyncio.QueueFull:
+            self.shed += 1
+            return False
+        return True
+
+    def _start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(self._max_queue)
+        self._workers = [asyncio.get_running_loop().create_task(self._work()) for _ in range(self._workers_count)]
+
+    async def _work(self):
+        while True:
+            turn = await self._queue.get()
+            self.running += 1
+            try:
+                await turn()
+                self.completed += 1
+            except Exception as error:  # pylint: disable=broad-except
+                # Nobody is waiting for the response any more, so log and move on.
+                self.failed += 1
+                print(f"\n [turn_pool] background turn failed: {error}", file=sys.stderr)
+                traceback.print_exc()
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+
+    async def join(self):
+        if self._queue:
+            await self._queue.join()
+
+    async def close(self, timeout: float = TURN_POOL_CLOSE_TIMEOUT):
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"\n [turn_pool] dropping {self._queue.qsize()} queued turns on close", file=sys.stderr)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "shed": self.shed,
+        }
@@ -9,5 +9,29 @@ class DefaultConfig:
     """ Bot Configuration """
 
     PORT = 3978
+    # Worker processes serving PORT together (SO_REUSEPORT); saved members and
+    # reviewer load are then kept in a SQLite file they share.
+    WORKERS = int(os.environ.get("WebWorkers", "1"))
+    # Set by the parent process for each worker it starts.
+    WORKER_INDEX = int(os.environ.get("WebWorkerIndex", "0"))
+    # Metrics are per process: with WebWorkers > 1, worker i serves its own
+    # /metrics, labelled worker="i", on MetricsPort + i instead of PORT, and
+    # every worker's port has to be scraped.
+    METRICS_PORT = int(os.environ.get("MetricsPort", "9400"))
     APP_ID = os.environ.get("MicrosoftAppId", "4baa95bd-5c4d-498b-98d1-d57c74211e7e")
     APP_PASSWORD = os.environ.get("MicrosoftAppPassword", "QNr%[BwgYA1E[9hGW4x1/)]msBjE")
+    # Bearer token for /api/batch, the endpoint is disabled when empty.
+    BATCH_API_KEY = os.environ.get("BatchApiKey", "")
+    # Space cards with spacing/separators instead of filler blocks to keep payloads small.
+    COMPACT_CARDS = os.environ.get("CompactCards", "").lower() in ("1", "true", "yes")
+    # JSONL file for per-turn stage spans, tracing is off when empty.
+    TRACE_FILE = os.environ.get("TraceFile", "")
+    # Hours between reminders in the thread of a review nobody marked done
+    # ("review done" in the thread stops them), off when 0.
+    REVIEW_REMINDER_HOURS = float(os.environ.get("ReviewReminderHours", "0"))
+    # Answer /api/messages before the turn runs; invokes are still answered inline.
+    FAST_ACK = os.environ.get("FastAck", "").lower() in ("1", "true", "yes")
+    FAST_ACK_WORKERS = int(os.environ.get("FastAckWorkers", "8"))
+    # Turns waiting for a worker before new ones are shed ("inline" or "reject").
+    FAST_ACK_MAX_QUEUE = int(os.environ.get("FastAckMaxQueue", "200"))
+    FAST_ACK_SHED_POLICY = os.environ.get("FastAckShedPolicy", "inline")
@@ -0,0 +1,100 @@
+from typing import Dict, List, Optional
+import itertools
+import json
+import os
+
+import pytest
+from botbuilder.schema import Activity
+from botbuilder.schema.teams import TeamsChannelAccount
+
+from bots import PrAssignBot
+from benchmarks.stub_adapter import StubBotFrameworkAdapter
+
+
+TEAM_ID = "19:team@thread.tacv2"
+CHANNEL_ID = "19:channel@thread.tacv2"
+# Submissions come from another channel than the review channel, so the bot confirms them.
+SUBMIT_CHANNEL_ID = "19:general@thread.tacv2"
+SERVICE_URL = "https://smba.test.local/"
+
+_activity_ids = itertools.count(1)
+
+
+class StatusError(Exception):
+    """Shaped like the msrest error the connector raises on an HTTP error status."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type("Response", (), {})()
+        self.response.status_code = status_code
+        self.response.headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+
+
+def write_team_data(data_dir: str, config: Dict, team_configs: Optional[Dict[str, Dict]] = None):
+    with open(os.path.join(data_dir, "team_config.json"), "w") as f_ptr:
+        json.dump(dict({"channel_id": CHANNEL_ID, "team_id": TEAM_ID}, **config), f_ptr)
+    with open(os.path.join(data_dir, "team_members.json"), "w") as f_ptr:
+        json.dump([], f_ptr)
+
+    if team_configs:
+        os.makedirs(os.path.join(data_dir, "team_configs"), exist_ok=True)
+        for file_name, team_config in team_configs.items():
+            with open(os.path.join(data_dir, "team_configs", file_name), "w") as f_ptr:
+                f_ptr.write(team_config if isinstance(team_config, str) else json.dumps(team_config))
+
+
+def make_activity(sender: str = "Alice Smith", team_id: str = TEAM_ID, conversation_id: str = "conversation-1", **fields) -> Activity:
+    activity = {
+        "type": "message",
+        "id": f"activity-{next(_activity_ids)}",
+        "channelId": "msteams",
+        "serviceUrl": SERVICE_URL,
+        "from": {"id": f"29:{sender}", "name": sender},
+        "recipient": {"id": "28:bot", "name": "ReviewAssignBot"},
+        "conversation": {"id": conversation_id},
+        "channelData": {"team": {"id": team_id}, "channel": {"id": SUBMIT_CHANNEL_ID}},
+    }
+    activity.update(fields)
+    return Activity().deserialize(activity)
+
+
+def submitpr(wi: str = "1001", **fields) -> Dict:
+    value = {
+        "action": "submitpr",
+        "WI": wi,
+        "ReviewLink": f"https://dev.azure.com/test/pullrequest/{wi}",
+        "Description": "A change",
+        "Reviewers": "",
+        "TaskGroup": "Core",
+        "NumberOfReviewers": "1",
+    }
+    value.update(fields)
+    return value
+
+
+class BotHarness:
+    """A PrAssignBot on its own data directory, talking to a stub connector."""
+
+    def __init__(self, data_dir: str, roster: Optional[List[TeamsChannelAccount]] = None, **bot_args):
+        self.adapter = StubBotFrameworkAdapter(roster=roster)
+        self.bot = PrAssignBot("", "", data_dir=data_dir, **bot_args)
+
+    @property
+    def conversations(self):
+        return self.adapter.connector_client.conversations
+
+    async def send(self, activity: Activity):
+        await self.adapter.process_activity(activity, "", self.bot.on_turn)
+        await self.bot.drain()
+
+    def replies(self) -> List[str]:
+        return [activity.text for activity in self.conversations.sent if activity.text]
+
+    def posted_cards(self) -> List[str]:
+        """The review card of every thread posted so far, as JSON text."""
+        return [json.dumps(parameters.activity.attachments[0].content) for parameters in self.conversations.created]
+
+
+@pytest.fixture
+def data_dir(tmp_path) -> str:
+    return str(tmp_path)
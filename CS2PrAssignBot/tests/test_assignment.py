@@ -0,0 +1,79 @@
+from typing import List
+import random
+
+import pytest
+
+from bots.assignment import LoadAwareAssignmentStrategy, ReviewerLoadTracker
+
+
+REVIEWERS = [f"reviewer-{index}" for index in range(12)]
+WINDOW = 100.0
+
+
+class _Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _assert_least_loaded(tracker: ReviewerLoadTracker, picked: List[str], number: int, candidates: List[str]):
+    # Ties are broken at random, so only the loads can be compared with a full ranking.
+    loads = {reviewer: tracker.load(reviewer) for reviewer in candidates}
+    assert len(picked) == len(set(picked)) == min(number, len(candidates))
+    assert set(picked) <= set(candidates)
+    assert sorted(loads[reviewer] for reviewer in picked) == sorted(loads.values())[:len(picked)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_least_loaded_agrees_with_ranking_every_candidate(seed):
+    rng = random.Random(seed)
+    clock = _Clock(1000.0)
+    tracker = ReviewerLoadTracker(window=WINDOW, clock=clock, rng=random.Random(seed))
+    tracker.track(REVIEWERS)
+    recorded = []
+
+    for _ in range(300):
+        action = rng.random()
+        if action < 0.5:
+            reviewers = rng.sample(REVIEWERS, rng.randint(1, 3))
+            tracker.record(reviewers)
+            recorded.append((reviewers, clock.now))
+        elif action < 0.6 and recorded:
+            tracker.unrecord(*recorded.pop(rng.randrange(len(recorded))))
+        else:
+            # Now and then far enough for assignments to leave the window.
+            clock.now += rng.choice([0.5, 5.0, 40.0])
+
+        candidates = rng.sample(REVIEWERS, rng.randint(len(REVIEWERS) // 2, len(REVIEWERS)))
+        number = rng.randint(1, len(candidates))
+        _assert_least_loaded(tracker, tracker.least_loaded(number, candidates), number, candidates)
+
+
+def test_strategy_ranks_small_groups_on_their_own():
+    clock = _Clock(1000.0)
+    tracker = ReviewerLoadTracker(window=WINDOW, clock=clock)
+    tracker.track(REVIEWERS)
+    tracker.record(REVIEWERS[:2] * 3 + REVIEWERS[2:4])
+    strategy = LoadAwareAssignmentStrategy(tracker)
+
+    # Too few of the tracked reviewers to pop them off the shared heap.
+    group = REVIEWERS[:3]
+    assert strategy.pick(1, group) == ["reviewer-2"]
+    assert set(strategy.pick(3, group)) == set(group)
+    _assert_least_loaded(tracker, strategy.pick(6, REVIEWERS), 6, REVIEWERS)
+
+
+def test_expired_assignments_stop_counting():
+    clock = _Clock(1000.0)
+    tracker = ReviewerLoadTracker(window=WINDOW, clock=clock)
+    tracker.track(["a", "b"])
+    tracker.record(["a"] * 2)
+    clock.now += 50
+    tracker.record(["b"])
+
+    assert tracker.least_loaded(1, ["a", "b"]) == ["b"]
+    clock.now += 51
+    assert tracker.least_loaded(1, ["a", "b"]) == ["a"]
+    assert tracker.to_dict() == {"b": [1050.0]}
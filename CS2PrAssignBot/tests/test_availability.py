@@ -0,0 +1,135 @@
+from datetime import date, timedelta
+import asyncio
+
+from bots.assignment import LoadAwareAssignmentStrategy, ReviewerLoadTracker
+from bots.availability import GENERAL_POOL, ReviewerAvailability
+from tests.conftest import BotHarness, make_activity, submitpr, write_team_data
+
+
+MEMBERS = ["Alice Smith", "Bob Jones", "Carol White", "Dan Brown"]
+START = 1_000_000.0
+
+
+class _Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _availability(out_of_office=None, capacity=None, window=100.0):
+    clock = _Clock(START)
+    tracker = ReviewerLoadTracker(window=window, clock=clock)
+    availability = ReviewerAvailability({"Core": ["a", "b"], "Web": ["b", "c"]}, out_of_office or {}, capacity or {}, tracker)
+    return availability, tracker, clock
+
+
+def test_out_of_office_window_blocks_every_pool_while_open():
+    availability, _, _ = _availability(out_of_office={"b": [(START + 10, START + 20)]})
+
+    assert availability.pool(GENERAL_POOL) == {"a", "b", "c"}
+    availability.refresh(START + 10)
+    assert availability.pool("Core") == {"a"}
+    assert availability.pool("Web") == {"c"}
+    assert not availability.is_available("b")
+    availability.refresh(START + 20)
+    assert availability.pool(GENERAL_POOL) == {"a", "b", "c"}
+
+
+def test_overlapping_windows_unblock_once_the_last_one_ends():
+    availability, _, _ = _availability(out_of_office={"b": [(START + 10, START + 30), (START + 20, START + 40)]})
+
+    availability.refresh(START + 35)
+    assert not availability.is_available("b")
+    availability.refresh(START + 40)
+    assert availability.is_available("b")
+
+
+def test_reviewer_at_capacity_comes_back_when_the_assignment_leaves_the_window():
+    availability, tracker, _ = _availability(capacity={"default": 1})
+
+    tracker.record(["b"], START)
+    availability.note_assigned(["b"], START)
+    assert availability.pool("Core") == {"a"}
+
+    availability.refresh(START + 50)
+    assert availability.pool("Core") == {"a"}
+    availability.refresh(START + 101)
+    assert availability.pool("Core") == {"a", "b"}
+
+
+def test_unassigned_reviewer_is_available_again_at_once():
+    availability, tracker, _ = _availability(capacity={"b": 1})
+
+    tracker.record(["b"], START)
+    availability.note_assigned(["b"], START)
+    tracker.unrecord(["b"], START)
+    availability.note_unassigned(["b"], START)
+    assert availability.is_available("b")
+
+
+def test_pick_replaces_reviewers_filled_up_behind_its_back():
+    availability, tracker, _ = _availability(capacity={"default": 1})
+    tracker.track(["a", "b", "c"])
+    # Another worker assigned a and b without this availability noticing.
+    tracker.record(["a", "b"], START)
+
+    picked = availability.pick(LoadAwareAssignmentStrategy(tracker), 2, {"a", "b", "c"}, START)
+
+    assert picked == ["c"]
+    assert availability.pool(GENERAL_POOL) == {"c"}
+
+
+def _out_of_office_today():
+    return [[(date.today() - timedelta(days=1)).isoformat(), (date.today() + timedelta(days=1)).isoformat()]]
+
+
+def test_submitter_is_told_when_fewer_reviewers_could_be_assigned(data_dir):
+    out_of_office = {"Carol White": _out_of_office_today(), "Dan Brown": _out_of_office_today()}
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}, "out_of_office": out_of_office})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        await harness.send(make_activity(value=submitpr("1001", NumberOfReviewers="2")))
+        await harness.bot.close()
+        return harness
+
+    harness = asyncio.run(scenario())
+    assert len(harness.conversations.created) == 1
+    assert "Bob Jones" in harness.posted_cards()[0]
+    assert "*Only 1 of 2 reviewers could be assigned, the others are out of office or at capacity*" in harness.replies()
+
+
+def test_submission_is_refused_when_nobody_is_available(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}, "reviewer_capacity": {"default": 1}})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        await harness.send(make_activity(value=submitpr("1001", NumberOfReviewers="3")))
+        await harness.send(make_activity(value=submitpr("1002", NumberOfReviewers="1")))
+        await harness.bot.close()
+        return harness
+
+    harness = asyncio.run(scenario())
+    assert len(harness.conversations.created) == 1
+    assert harness.replies()[-1] == "*No reviewers available, everyone is out of office or at capacity*"
+
+
+def test_batch_entries_left_without_reviewers_are_not_posted(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS[:3]}, "reviewer_capacity": {"default": 1}})
+    entries = "\n".join(f"{wi} | https://pr/{wi} | A change | Core | 1 |" for wi in ("1", "2", "3", "4"))
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        await harness.send(make_activity(text="submitbatch\n" + entries))
+        await harness.bot.close()
+        return harness
+
+    harness = asyncio.run(scenario())
+    assert len(harness.conversations.created) == 2
+    assert all("Bob Jones" in card or "Carol White" in card for card in harness.posted_cards())
+    assert harness.replies() == [
+        "*2 review tasks have been posted to the Teams'channel : )*\n\n"
+        "*No reviewers available for 3, 4, everyone is out of office or at capacity*"
+    ]
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+import app
+from tests.conftest import SERVICE_URL, TEAM_ID, BotHarness, make_activity, write_team_data
+
+
+MEMBERS = ["Alice Smith", "Bob Jones", "Carol White", "Dan Brown"]
+BATCH_API_KEY = "batch-key"
+
+
+def _entry(wi: str, **fields):
+    return dict({"WI": wi, "ReviewLink": f"https://pr/{wi}", "TaskGroup": "Core", "NumberOfReviewers": "1"}, **fields)
+
+
+def _record_service_urls(harness: BotHarness):
+    service_urls = []
+    create_connector_client = harness.adapter.create_connector_client
+
+    async def recording(service_url: str, *args, **kwargs):
+        service_urls.append(service_url)
+        return await create_connector_client(service_url, *args, **kwargs)
+
+    harness.adapter.create_connector_client = recording
+    return service_urls
+
+
+async def _post_batch(harness: BotHarness, monkeypatch, body, authorization: str = f"Bearer {BATCH_API_KEY}"):
+    monkeypatch.setattr(app, "ADAPTER", harness.adapter)
+    monkeypatch.setattr(app, "BOT", harness.bot)
+    monkeypatch.setattr(app.CONFIG, "BATCH_API_KEY", BATCH_API_KEY)
+
+    batch_app = web.Application()
+    batch_app.router.add_post("/api/batch", app.batch)
+    async with TestClient(TestServer(batch_app)) as client:
+        response = await client.post(
+            "/api/batch",
+            data=body if isinstance(body, str) else json.dumps(body),
+            headers={"Authorization": authorization, "Content-Type": "application/json"},
+        )
+        return response.status, await response.json() if response.status != 401 else None
+
+
+def test_threads_go_to_the_service_url_the_team_messaged_from(data_dir, monkeypatch):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        service_urls = _record_service_urls(harness)
+        await harness.send(make_activity(text="show"))
+        response = await _post_batch(harness, monkeypatch, {
+            "team_id": TEAM_ID,
+            "service_url": "https://attacker.example/",
+            "reviewee": {"id": "29:alice", "name": "Alice Smith"},
+            "entries": [_entry("1"), _entry("2")],
+        })
+        await harness.bot.close()
+        return harness, service_urls, response
+
+    harness, service_urls, (status, body) = asyncio.run(scenario())
+    assert status == 200
+    assert len(body["reviewers"]) == 2
+    assert len(harness.conversations.created) == 2
+    assert set(service_urls) == {SERVICE_URL}
+
+
+def test_batch_is_refused_until_the_team_has_messaged_the_bot(data_dir, monkeypatch):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        response = await _post_batch(harness, monkeypatch, {
+            "team_id": TEAM_ID,
+            "service_url": "https://attacker.example/",
+            "reviewee": {"id": "29:alice", "name": "Alice Smith"},
+            "entries": [_entry("1")],
+        })
+        await harness.bot.close()
+        return harness, response
+
+    harness, (status, body) = asyncio.run(scenario())
+    assert status == 400
+    assert "No service URL known for this team yet" in body["error"]
+    assert not harness.conversations.created
+
+
+def test_service_url_seen_by_one_worker_is_used_by_another(data_dir, monkeypatch):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}})
+
+    async def scenario():
+        first = BotHarness(data_dir, shared_state=True)
+        second = BotHarness(data_dir, shared_state=True)
+        await first.send(make_activity(text="show"))
+        response = await _post_batch(second, monkeypatch, {
+            "team_id": TEAM_ID,
+            "reviewee": {"id": "29:alice", "name": "Alice Smith"},
+            "entries": [_entry("1")],
+        })
+        await first.bot.close()
+        await second.bot.close()
+        return second, response
+
+    second, (status, _) = asyncio.run(scenario())
+    assert status == 200
+    assert len(second.conversations.created) == 1
+
+
+def test_reviewee_without_an_id_is_looked_up_in_the_saved_members(data_dir, monkeypatch):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}})
+    with open(os.path.join(data_dir, "team_members.json"), "w") as f_ptr:
+        json.dump([{"id": "29:alice", "name": "Alice Smith"}], f_ptr)
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        await harness.send(make_activity(text="show"))
+        known = await _post_batch(harness, monkeypatch, {
+            "team_id": TEAM_ID, "reviewee": {"name": "Alice Smith"}, "entries": [_entry("1")],
+        })
+        unknown = await _post_batch(harness, monkeypatch, {
+            "team_id": TEAM_ID, "reviewee": {"name": "Bob Jones"}, "entries": [_entry("2")],
+        })
+        await harness.bot.close()
+        return harness, known, unknown
+
+    harness, known, unknown = asyncio.run(scenario())
+    assert known[0] == 200
+    assert '"id": "29:alice"' in json.dumps(harness.conversations.created[0].activity.attachments[0].content)
+    assert unknown == (400, {"error": "*Unknown reviewee Bob Jones, give their id or have them message the bot first*"})
+
+
+def test_malformed_requests_are_answered_with_4xx(data_dir, monkeypatch):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        responses = [
+            await _post_batch(harness, monkeypatch, {}, authorization="Bearer ключ"),
+            await _post_batch(harness, monkeypatch, "not json"),
+            await _post_batch(harness, monkeypatch, [1]),
+            await _post_batch(harness, monkeypatch, {"reviewee": "Alice Smith", "entries": []}),
+            await _post_batch(harness, monkeypatch, {"reviewee": {"id": 5, "name": "Alice Smith"}, "entries": []}),
+            await _post_batch(harness, monkeypatch, {"reviewee": {"id": "29:alice", "name": "Alice Smith"}, "entries": [1, _entry("1")]}),
+        ]
+        await harness.bot.close()
+        return responses
+
+    responses = asyncio.run(scenario())
+    assert responses[0] == (401, None)
+    assert [status for status, _ in responses[1:]] == [400] * 5
+    assert responses[-1][1] == {"error": "*Review entries must be objects, these aren't: 1*"}
@@ -0,0 +1,104 @@
+import asyncio
+
+import aiohttp
+import pytest
+from msrest.exceptions import ClientRequestError
+
+from bots.connector_cache import ConnectorClientCache
+from bots.outbound import is_connection_error
+from tests.conftest import SERVICE_URL, BotHarness, StatusError, make_activity, submitpr, write_team_data
+
+
+class _Client:
+    def __init__(self):
+        self.config = type("Config", (), {"credentials": object()})()
+        self.closed = False
+
+    async def __aexit__(self, *exc_details):
+        self.closed = True
+
+
+class _Adapter:
+    """Caches the clients it creates like BotFrameworkAdapter does."""
+
+    def __init__(self):
+        self._connector_client_cache = {}
+        self._app_credential_map = {}
+
+    async def create_connector_client(self, service_url: str):
+        client = _Client()
+        self._connector_client_cache[f"{service_url}:app:scope"] = client
+        self._app_credential_map["app:scope"] = client.config.credentials
+        return client
+
+
+@pytest.mark.parametrize("error, connection_error", [
+    (OSError("connection reset"), True),
+    (aiohttp.ClientConnectionError(), True),
+    (asyncio.TimeoutError(), True),
+    (ClientRequestError("Error occurred in request."), True),
+    (StatusError(401), True),
+    (StatusError(400), False),
+    (StatusError(403), False),
+    (StatusError(404), False),
+    (StatusError(429), False),
+    (StatusError(502), False),
+    (ValueError("not an HTTP error"), False),
+])
+def test_connection_errors(error, connection_error):
+    assert is_connection_error(error) == connection_error
+
+
+def test_invalidated_client_is_evicted_and_closed():
+    async def scenario():
+        adapter, cache = _Adapter(), ConnectorClientCache()
+        first = await cache.get(adapter, SERVICE_URL)
+        await cache.invalidate(adapter, SERVICE_URL)
+        second = await cache.get(adapter, SERVICE_URL)
+        return adapter, first, second
+
+    adapter, first, second = asyncio.run(scenario())
+    assert first.closed
+    assert second is not first and not second.closed
+    assert list(adapter._connector_client_cache.values()) == [second]  # pylint: disable=protected-access
+
+
+def test_expired_client_is_closed_only_after_the_delay():
+    async def scenario():
+        adapter, cache = _Adapter(), ConnectorClientCache(ttl=0, close_delay=0.05)
+        first = await cache.get(adapter, SERVICE_URL)
+        second = await cache.get(adapter, SERVICE_URL)
+        closed_at_once = first.closed
+        await asyncio.sleep(0.05)
+        third = await cache.get(adapter, SERVICE_URL)
+        await cache.close()
+        return closed_at_once, first, second, third
+
+    closed_at_once, first, second, third = asyncio.run(scenario())
+    assert not closed_at_once
+    assert first.closed and second.closed and third.closed
+
+
+@pytest.mark.parametrize("status_code, closed", [(404, 0), (403, 0), (401, 1)])
+def test_bot_replaces_its_client_only_when_it_went_bad(data_dir, status_code, closed):
+    write_team_data(data_dir, {"groups": {"Core": ["Alice Smith", "Bob Jones"]}})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        create_conversation = harness.conversations.create_conversation
+
+        async def failing(parameters):
+            harness.conversations.create_conversation = create_conversation
+            raise StatusError(status_code)
+
+        harness.conversations.create_conversation = failing
+        await harness.send(make_activity(value=submitpr("1001")))
+        await harness.send(make_activity(value=submitpr("1001")))
+        closed_before_shutdown = harness.adapter.connector_client.closed
+        await harness.bot.close()
+        return harness, closed_before_shutdown
+
+    harness, closed_before_shutdown = asyncio.run(scenario())
+    assert closed_before_shutdown == closed
+    assert harness.replies()[0] == "*Posting review 1001 to the Teams'channel failed, please submit it again*"
+    assert len(harness.conversations.created) == 1
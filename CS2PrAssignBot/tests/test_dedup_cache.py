@@ -0,0 +1,115 @@
+import asyncio
+
+from bots import dedup_cache
+from bots.dedup_cache import DedupCache, submission_key
+from bots.submission import ReviewSubmission
+from tests.conftest import BotHarness, make_activity, submitpr, write_team_data
+
+
+MEMBERS = ["Alice Smith", "Bob Jones", "Carol White", "Dan Brown"]
+OTHER_TEAM_ID = "19:other-team@thread.tacv2"
+
+
+def test_claim_is_false_for_a_duplicate_until_the_ttl_passes(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(dedup_cache.time, "monotonic", lambda: clock[0])
+    cache = DedupCache(ttl=10)
+
+    assert cache.claim("a")
+    clock[0] += 9.9
+    assert not cache.claim("a")
+    clock[0] += 0.2
+    assert cache.claim("a")
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2}
+
+
+def test_oldest_key_is_evicted_past_max_size():
+    cache = DedupCache(max_size=2)
+
+    assert cache.claim("a")
+    assert cache.claim("b")
+    assert cache.claim("c")
+    assert cache.stats()["size"] == 2
+    assert cache.claim("a")
+    assert not cache.claim("c")
+
+
+def test_released_key_can_be_claimed_again():
+    cache = DedupCache()
+
+    assert cache.claim("a")
+    cache.release("a")
+    assert cache.claim("a")
+
+
+def test_submission_key_normalizes_and_is_scoped():
+    submission = ReviewSubmission({"WI": "ABC-1", "ReviewLink": "https://pr/1"})
+    resubmitted = ReviewSubmission({"WI": " abc-1 ", "ReviewLink": "https://pr/1 ", "Description": "changed"})
+
+    assert submission_key(submission, "team-1") == submission_key(resubmitted, "team-1")
+    assert submission_key(submission, "team-1") != submission_key(submission, "team-2")
+    assert submission_key(submission, "team-1") != submission_key(ReviewSubmission({"WI": "ABC-2", "ReviewLink": "https://pr/1"}), "team-1")
+    assert submission_key(ReviewSubmission({"WI": " ", "ReviewLink": ""}), "team-1") is None
+
+
+def test_duplicate_submission_is_answered_and_not_posted_again(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        await harness.send(make_activity(value=submitpr("1001")))
+        await harness.send(make_activity(value=submitpr("1001")))
+        await harness.bot.close()
+        return harness
+
+    harness = asyncio.run(scenario())
+    assert len(harness.conversations.created) == 1
+    assert "*Review 1001 has already been submitted, it won't be posted again*" in harness.replies()
+
+
+def test_redelivered_activity_is_dropped_silently(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        activity = make_activity(value=submitpr("1001"))
+        await harness.send(activity)
+        replies = len(harness.replies())
+        await harness.send(activity)
+        await harness.bot.close()
+        return harness, replies
+
+    harness, replies = asyncio.run(scenario())
+    assert len(harness.conversations.created) == 1
+    assert len(harness.replies()) == replies
+
+
+def test_same_pr_can_be_submitted_to_another_team(data_dir):
+    other_team = {"channel_id": "19:other-channel@thread.tacv2", "team_id": OTHER_TEAM_ID, "groups": {"Core": MEMBERS}}
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}}, {"other.json": other_team})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        await harness.send(make_activity(value=submitpr("1001")))
+        await harness.send(make_activity(value=submitpr("1001"), team_id=OTHER_TEAM_ID))
+        await harness.bot.close()
+        return harness
+
+    harness = asyncio.run(scenario())
+    assert len(harness.conversations.created) == 2
+    assert not any("already been submitted" in reply for reply in harness.replies())
+
+
+def test_rejected_submission_can_be_corrected_and_sent_again(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        await harness.send(make_activity(value=submitpr("1001", NumberOfReviewers="x")))
+        await harness.send(make_activity(value=submitpr("1001")))
+        await harness.bot.close()
+        return harness
+
+    harness = asyncio.run(scenario())
+    assert len(harness.conversations.created) == 1
+    assert harness.replies()[0].startswith("*Incorrect reviewer number: x")
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import sqlite3
+
+import pytest
+
+from bots.history_store import ReviewHistoryStore, ReviewRecord
+
+
+NOW = 1_000_000.0
+
+
+def _review(wi: str, reviewers, created_at: float = NOW) -> ReviewRecord:
+    return ReviewRecord("team", "Alice Smith", "29:alice", reviewers, "Core", wi, f"https://pr/{wi}", created_at=created_at)
+
+
+def _failing_writes(store: ReviewHistoryStore, failures: int):
+    write = store._write  # pylint: disable=protected-access
+    calls = []
+
+    def failing(reviews):
+        calls.append(len(reviews))
+        if len(calls) <= failures:
+            raise sqlite3.OperationalError("database is locked")
+        write(reviews)
+
+    store._write = failing  # pylint: disable=protected-access
+    return calls
+
+
+def test_reviews_of_a_failed_write_are_written_on_the_next_flush(tmp_path):
+    async def scenario():
+        store = ReviewHistoryStore(os.path.join(tmp_path, "history.db"), flush_interval=60)
+        calls = _failing_writes(store, 1)
+        store.record(_review("1", ["Bob Jones"]))
+        with pytest.raises(sqlite3.OperationalError):
+            await store.flush()
+        store.record(_review("2", ["Bob Jones"], created_at=NOW + 1))
+        queue = await store.reviewer_queue("Bob Jones", NOW - 1)
+        await store.close()
+        return calls, queue
+
+    calls, queue = asyncio.run(scenario())
+    assert calls == [1, 2]
+    assert [wi for wi, *_ in queue] == ["2", "1"]
+
+
+def test_delayed_flush_retries_until_the_write_goes_through(tmp_path, capsys):
+    async def scenario():
+        store = ReviewHistoryStore(os.path.join(tmp_path, "history.db"), flush_interval=0.01)
+        calls = _failing_writes(store, 2)
+        store.record(_review("1", ["Bob Jones", "Carol White"]))
+        await asyncio.sleep(0.1)
+        # Read straight from the database, reviewer_queue() would flush first.
+        written = await store._run(store._query, "SELECT wi FROM reviews", ())  # pylint: disable=protected-access
+        load = await store.team_load("team", NOW)
+        await store.close()
+        return calls, written, load
+
+    calls, written, load = asyncio.run(scenario())
+    assert calls == [1, 1, 1]
+    assert written == [("1",)]
+    assert load == [("Bob Jones", 1), ("Carol White", 1)]
+    assert capsys.readouterr().err.count("[review_history] writing 1 reviews failed, retrying: database is locked") == 2
+
+
+def test_discarded_review_is_dropped_queued_or_written(tmp_path):
+    async def scenario():
+        store = ReviewHistoryStore(os.path.join(tmp_path, "history.db"), flush_interval=60)
+        queued, written = _review("1", ["Bob Jones"]), _review("2", ["Bob Jones"], created_at=NOW + 1)
+        store.record(written)
+        await store.flush()
+        store.record(queued)
+        store.discard(queued)
+        store.discard(written)
+        queue = await store.reviewer_queue("Bob Jones", NOW - 1)
+        load = dict(await store.team_load("team", NOW))
+        await store.close()
+        return queue, load
+
+    queue, load = asyncio.run(scenario())
+    assert queue == []
+    assert load.get("Bob Jones", 0) == 0
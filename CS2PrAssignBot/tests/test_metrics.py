@@ -0,0 +1,45 @@
+import asyncio
+
+from bots.metrics import CALLS, LATENCY
+from tests.conftest import BotHarness, make_activity, submitpr, write_team_data
+
+
+OPERATIONS = [
+    "connector.create_conversation",
+    "connector.send_activity",
+    "connector.update_activity",
+    "connector.delete_activity",
+]
+
+
+def _observed(operation: str) -> int:
+    series = LATENCY._values.get((("operation", operation),))  # pylint: disable=protected-access
+    return series[-2] if series else 0
+
+
+def _calls(operation: str) -> float:
+    return CALLS._values.get((("operation", operation),), 0)  # pylint: disable=protected-access
+
+
+def test_every_teams_call_is_timed(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": ["Alice Smith", "Bob Jones"]}})
+    before = {operation: (_observed(operation), _calls(operation)) for operation in OPERATIONS}
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        await harness.send(make_activity(value=submitpr("1001"), replyToId="card-1"))
+        await harness.send(make_activity(value={"action": "deletethiscard"}, replyToId="card-2"))
+        await harness.bot.close()
+        return harness
+
+    harness = asyncio.run(scenario())
+    assert (len(harness.conversations.updated), len(harness.conversations.deleted)) == (1, 1)
+    assert {
+        operation: (_observed(operation) - before[operation][0], _calls(operation) - before[operation][1])
+        for operation in OPERATIONS
+    } == {
+        "connector.create_conversation": (1, 1),
+        "connector.send_activity": (1, 1),
+        "connector.update_activity": (1, 1),
+        "connector.delete_activity": (1, 1),
+    }
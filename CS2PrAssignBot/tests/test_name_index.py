@@ -0,0 +1,98 @@
+from typing import Dict, List, Set
+import random
+
+import pytest
+
+from bots import PrAssignBot
+from bots.name_index import FUZZY_SUGGEST_SIMILARITY, NameIndex, _trigrams
+
+
+MEMBERS = [
+    "Alice Smith",
+    "Alice Jones",
+    "Bob Jones",
+    "Carol White",
+    "Dan Brown",
+    "Mary Ann Lee",
+    "Thomas Shafron",
+    "Yiping Chen",
+]
+
+
+def _brute_force_matches(members: List[str], name: str) -> Set[str]:
+    return {member for member in members if PrAssignBot.check_name_match(member, name)}
+
+
+def _brute_force_similar(members: List[str], name: str) -> Dict[str, float]:
+    query = _trigrams(name.strip().lower())
+    scores: Dict[str, float] = {}
+    for member in members:
+        for key in NameIndex._member_keys(member):  # pylint: disable=protected-access
+            if not key:
+                continue
+            trigrams = _trigrams(key)
+            similarity = 2 * len(query & trigrams) / (len(query) + len(trigrams))
+            if similarity >= FUZZY_SUGGEST_SIMILARITY:
+                scores[member] = max(similarity, scores.get(member, 0.0))
+    return scores
+
+
+def _spellings(members: List[str]) -> List[str]:
+    spellings = ["", " ", "nobody", "alice  smith"]
+    for member in members:
+        spellings += [member, member.upper(), f"  {member} ", member.replace(" ", ""), member.lower().replace(" ", "")]
+        spellings += member.split(" ")
+    return spellings
+
+
+def test_exact_matches_agree_with_check_name_match():
+    index = NameIndex(MEMBERS)
+
+    for name in _spellings(MEMBERS):
+        assert index.matches(name) == _brute_force_matches(MEMBERS, name), name
+
+
+def test_shared_name_tokens_match_every_member():
+    index = NameIndex(MEMBERS)
+
+    assert index.matches("alice") == {"Alice Smith", "Alice Jones"}
+    assert index.matches("Jones") == {"Alice Jones", "Bob Jones"}
+    assert index.resolve("bob") == "Bob Jones"
+    assert index.resolve("maryannlee") == "Mary Ann Lee"
+    assert index.resolve("alice") is None
+
+
+def test_fuzzy_scores_agree_with_comparing_every_spelling():
+    index = NameIndex(MEMBERS)
+    rng = random.Random(0)
+
+    names = []
+    for member in MEMBERS:
+        for _ in range(5):
+            # A typo: one character dropped, doubled or swapped for another.
+            position = rng.randrange(len(member))
+            names.append(rng.choice([
+                member[:position] + member[position + 1:],
+                member[:position] + member[position] + member[position:],
+                member[:position] + rng.choice("aeiouxyz") + member[position + 1:],
+            ]))
+
+    for name in names + _spellings(MEMBERS):
+        assert dict(index.similar(name)) == pytest.approx(_brute_force_similar(MEMBERS, name)), name
+
+
+def test_mistyped_name_resolves_to_a_clear_winner_only():
+    index = NameIndex(MEMBERS)
+
+    assert index.resolve("Thomas Shafrom") == "Thomas Shafron"
+    assert index.resolve("Yipin Chen") == "Yiping Chen"
+    # Closest to Alice Jones, but Alice Smith is within the margin.
+    assert index.resolve("Alice Smones") is None
+    assert index.resolve("nobody") is None
+
+
+def test_suggestions_are_most_similar_first():
+    index = NameIndex(MEMBERS)
+
+    assert index.suggest("Carl White")[0] == "Carol White"
+    assert index.suggest("zzzz") == []
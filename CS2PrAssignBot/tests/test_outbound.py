@@ -0,0 +1,177 @@
+import asyncio
+
+import pytest
+
+from bots.outbound import OutboundQueue, is_retryable_error
+from benchmarks.stub_adapter import ThrottledError
+from tests.conftest import BotHarness, StatusError, make_activity, submitpr, write_team_data
+
+
+def _queue(**args) -> OutboundQueue:
+    return OutboundQueue(**dict(dict(global_rate=1000.0, conversation_rate=1000.0, base_delay=0.001, max_delay=0.001), **args))
+
+
+def _failing(*errors, result="sent"):
+    """An operation raising the given errors on its first calls, then returning result."""
+    calls = []
+
+    async def operation():
+        calls.append(len(calls))
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return operation, calls
+
+
+@pytest.mark.parametrize("error, idempotent, retryable", [
+    (StatusError(429), True, True),
+    (StatusError(502), True, True),
+    (StatusError(503), True, True),
+    (StatusError(504), True, True),
+    (StatusError(400), True, False),
+    (StatusError(429), False, True),
+    (StatusError(502), False, False),
+    (StatusError(504), False, False),
+    (StatusError(503), False, False),
+    (StatusError(503, retry_after=1), False, True),
+    (ValueError("not an HTTP error"), True, False),
+])
+def test_retryable_errors(error, idempotent, retryable):
+    assert is_retryable_error(error, idempotent) == retryable
+
+
+def test_throttled_call_is_retried_until_it_goes_through():
+    async def scenario():
+        queue = _queue()
+        operation, calls = _failing(ThrottledError(0), StatusError(503))
+        result = await queue.submit("conversation", operation)
+        await queue.close()
+        return result, calls, queue.stats()
+
+    result, calls, stats = asyncio.run(scenario())
+    assert result == "sent"
+    assert len(calls) == 3
+    assert stats == {"queued": 0, "sent": 1, "retried": 2, "failed": 0}
+
+
+def test_call_fails_once_the_retries_run_out():
+    async def scenario():
+        queue = _queue(max_retries=2)
+        operation, calls = _failing(*[StatusError(503)] * 5)
+        with pytest.raises(StatusError):
+            await queue.submit("conversation", operation)
+        await queue.close()
+        return calls, queue.stats()
+
+    calls, stats = asyncio.run(scenario())
+    assert len(calls) == 3
+    assert stats["retried"] == 2 and stats["failed"] == 1
+
+
+@pytest.mark.parametrize("error, attempts", [
+    (StatusError(502), 1),
+    (StatusError(503), 1),
+    (StatusError(503, retry_after=0), 2),
+    (ThrottledError(0), 2),
+])
+def test_non_idempotent_call_is_only_retried_when_turned_away(error, attempts):
+    async def scenario():
+        queue = _queue()
+        operation, calls = _failing(error)
+        try:
+            await queue.submit(None, operation, idempotent=False)
+        except StatusError:
+            pass
+        await queue.close()
+        return calls
+
+    assert len(asyncio.run(scenario())) == attempts
+
+
+def test_calls_for_one_conversation_keep_their_order_across_retries():
+    async def scenario():
+        queue = _queue()
+        sent = []
+
+        first, _ = _failing(ThrottledError(0), result="first")
+        second, _ = _failing(result="second")
+        futures = [queue.submit("conversation", first), queue.submit("conversation", second)]
+        for future in futures:
+            future.add_done_callback(lambda done: sent.append(done.result()))
+        await queue.join()
+        await queue.close()
+        return sent
+
+    assert asyncio.run(scenario()) == ["first", "second"]
+
+
+def test_join_waits_for_calls_queued_by_done_callbacks():
+    async def scenario():
+        queue = _queue()
+        sent = []
+
+        async def reply():
+            sent.append("reply")
+
+        operation, _ = _failing()
+        queue.submit("conversation", operation).add_done_callback(lambda _: queue.submit("conversation", reply))
+        await queue.join()
+        await queue.close()
+        return sent
+
+    assert asyncio.run(scenario()) == ["reply"]
+
+
+MEMBERS = ["Alice Smith", "Bob Jones"]
+
+
+def _fail_create_conversation(harness: BotHarness, *errors):
+    conversations = harness.conversations
+    create_conversation = conversations.create_conversation
+    failures = list(errors)
+
+    async def flaky(parameters):
+        if failures:
+            raise failures.pop(0)
+        return await create_conversation(parameters)
+
+    conversations.create_conversation = flaky
+
+
+def test_failed_thread_is_rolled_back_and_can_be_submitted_again(data_dir):
+    # At capacity after one review, so the retry only gets a reviewer if the failed one was rolled back.
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}, "reviewer_capacity": {"default": 1}})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        _fail_create_conversation(harness, StatusError(502))
+        await harness.send(make_activity(value=submitpr("1001")))
+        failed = (len(harness.conversations.created), harness.replies())
+        await harness.send(make_activity(value=submitpr("1001")))
+        await harness.bot.close()
+        return harness, failed
+
+    harness, (created, replies) = asyncio.run(scenario())
+    assert created == 0
+    assert replies == ["*Posting review 1001 to the Teams'channel failed, please submit it again*"]
+    assert len(harness.conversations.created) == 1
+    assert "Bob Jones" in harness.posted_cards()[0]
+    assert harness.replies()[-1] == "*Review task has been posted to the Teams'channel : )*"
+    assert harness.bot.outbound_stats()["failed"] == 1
+
+
+def test_throttled_thread_is_posted_once_after_a_retry(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}})
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        _fail_create_conversation(harness, ThrottledError(0))
+        await harness.send(make_activity(value=submitpr("1001")))
+        await harness.bot.close()
+        return harness
+
+    harness = asyncio.run(scenario())
+    assert len(harness.conversations.created) == 1
+    assert harness.replies() == ["*Review task has been posted to the Teams'channel : )*"]
+    assert harness.bot.outbound_stats()["retried"] == 1
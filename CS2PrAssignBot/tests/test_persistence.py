@@ -0,0 +1,84 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from bots import persistence
+from bots.persistence import WriteBehindWriter, write_json_atomic
+
+
+def _read(path: str):
+    with open(path, "r") as f_ptr:
+        return json.load(f_ptr)
+
+
+def _counting_writes(monkeypatch, failures: int = 0):
+    writes = []
+
+    def write(path, data):
+        writes.append(list(data))
+        if len(writes) <= failures:
+            raise OSError("No space left on device")
+        write_json_atomic(path, data)
+
+    monkeypatch.setattr(persistence, "write_json_atomic", write)
+    return writes
+
+
+def test_changes_are_coalesced_and_flushed_on_close(tmp_path, monkeypatch):
+    path = os.path.join(tmp_path, "members.json")
+    writes = _counting_writes(monkeypatch)
+
+    async def scenario():
+        members = []
+        writer = WriteBehindWriter(path, lambda: list(members), flush_interval=60)
+        for member in ("a", "b", "c"):
+            members.append(member)
+            writer.mark_dirty()
+        written_before_close = os.path.exists(path)
+        await writer.close()
+        return written_before_close
+
+    assert not asyncio.run(scenario())
+    assert writes == [["a", "b", "c"]]
+    assert _read(path) == ["a", "b", "c"]
+
+
+def test_failed_write_is_retried_without_further_changes(tmp_path, monkeypatch, capsys):
+    path = os.path.join(tmp_path, "members.json")
+    writes = _counting_writes(monkeypatch, failures=2)
+
+    async def scenario():
+        writer = WriteBehindWriter(path, lambda: ["a"], flush_interval=0.01)
+        writer.mark_dirty()
+        await asyncio.sleep(0.1)
+        written = _read(path)
+        await writer.close()
+        return written
+
+    assert asyncio.run(scenario()) == ["a"]
+    assert len(writes) == 3
+    err = capsys.readouterr().err
+    assert err.count(f"[persistence] writing {path} failed, retrying: No space left on device") == 2
+    assert "never retrieved" not in err
+
+
+def test_without_an_event_loop_changes_are_written_at_once(tmp_path):
+    path = os.path.join(tmp_path, "members.json")
+    writer = WriteBehindWriter(path, lambda: ["a"])
+
+    writer.mark_dirty()
+
+    assert _read(path) == ["a"]
+
+
+def test_failed_atomic_write_leaves_the_old_file(tmp_path):
+    path = os.path.join(tmp_path, "members.json")
+    write_json_atomic(path, ["a"])
+
+    with pytest.raises(TypeError):
+        write_json_atomic(path, [object()])
+
+    assert _read(path) == ["a"]
+    assert os.listdir(tmp_path) == ["members.json"]
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from bots.reminders import PendingReview, PendingReviewFile, ReminderScheduler
+from tests.conftest import SERVICE_URL, TEAM_ID, BotHarness, make_activity, submitpr, write_team_data
+
+
+DELAY = 60.0
+
+
+def _review(conversation_id: str, wi: str, created_at: float) -> PendingReview:
+    return PendingReview(conversation_id, TEAM_ID, SERVICE_URL, wi, f"https://pr/{wi}", "Alice Smith", ["Bob Jones"], created_at=created_at)
+
+
+def _recording_remind(sent):
+    def remind(review: PendingReview, escalate: bool) -> asyncio.Future:
+        sent.append((review.wi, escalate))
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+    return remind
+
+
+def test_pending_reviews_survive_a_restart(tmp_path):
+    path = os.path.join(tmp_path, "pending_reminders.json")
+
+    async def scenario():
+        sent = []
+        now = time.time()
+        scheduler = ReminderScheduler(PendingReviewFile(path), _recording_remind(sent), DELAY)
+        scheduler.add(_review("conversation-1", "1001", now))
+        scheduler.add(_review("conversation-2", "1002", now))
+        # Came due while the bot was down.
+        scheduler.add(_review("conversation-3", "1003", now - 2 * DELAY))
+        await asyncio.sleep(0)
+        await scheduler.complete("conversation-2")
+        await scheduler.stop()
+
+        restarted = ReminderScheduler(PendingReviewFile(path), _recording_remind(sent), DELAY)
+        found = [await restarted.find(TEAM_ID, wi) for wi in ("1001", "1002", "1003")]
+        restarted.start()
+        await asyncio.sleep(0.05)
+        await restarted.stop()
+
+        stored = {review.wi: review for review in [await PendingReviewFile(path).find(TEAM_ID, wi) for wi in ("1001", "1003")]}
+        return now, sent, found, restarted.stats(), stored
+
+    now, sent, found, stats, stored = asyncio.run(scenario())
+    assert [review and review.conversation_id for review in found] == ["conversation-1", None, "conversation-3"]
+    assert found[0].due_at == pytest.approx(now + DELAY)
+    assert sent == [("1003", False)]
+    assert stats == {"pending": 2, "reminded": 1, "escalated": 0, "completed": 0}
+    # Reminded from the restart on, not from when it was first due.
+    assert stored["1003"].reminders == 1
+    assert stored["1003"].due_at >= now + DELAY
+
+
+@pytest.mark.parametrize("shared_state", [False, True])
+def test_review_posted_before_a_restart_can_be_marked_done_after_it(data_dir, shared_state):
+    write_team_data(data_dir, {"groups": {"Core": ["Alice Smith", "Bob Jones"]}})
+
+    async def scenario():
+        harness = BotHarness(data_dir, shared_state=shared_state, review_reminder_delay=DELAY)
+        await harness.send(make_activity(value=submitpr("1001")))
+        await harness.bot.close()
+
+        restarted = BotHarness(data_dir, shared_state=shared_state, review_reminder_delay=DELAY)
+        await restarted.send(make_activity(text="review done 1001"))
+        await restarted.send(make_activity(text="review done 1001"))
+        await restarted.bot.close()
+        return restarted
+
+    assert asyncio.run(scenario()).replies() == [
+        "*Review 1001 is done, no more reminders : )*",
+        "*No pending review 1001 found here*",
+    ]
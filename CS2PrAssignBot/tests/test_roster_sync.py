@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+
+from botbuilder.schema.teams import TeamsChannelAccount
+
+from bots.member_store import SavedMemberStore
+from bots.roster_sync import RosterCache, roster_changes
+from benchmarks.stub_adapter import StubConversations, ThrottledError
+from tests.conftest import TEAM_ID, BotHarness, make_activity, write_team_data
+
+
+def _roster(size: int):
+    return [TeamsChannelAccount(id=f"29:member-{index}", name=f"Member {index}", aad_object_id=f"aad-{index}") for index in range(size)]
+
+
+def _fetcher(conversations: StubConversations, page_size: int):
+    return lambda continuation_token: conversations.get_teams_conversation_paged_members(TEAM_ID, page_size, continuation_token)
+
+
+def test_roster_changes_are_new_and_changed_members_merged_into_the_saved_ones():
+    saved = SavedMemberStore([
+        {"id": "29:kept", "name": "Kept", "aad_object_id": "aad-kept"},
+        {"id": "29:renamed", "name": "Old Name", "aad_object_id": "aad-renamed", "role": "lead"},
+    ])
+    roster = [
+        {"id": "29:kept", "name": "Kept", "aad_object_id": "aad-kept"},
+        {"id": "29:renamed", "name": "New Name", "aad_object_id": "aad-renamed"},
+        {"id": "29:new", "name": "New", "aad_object_id": "aad-new"},
+    ]
+
+    assert roster_changes(roster, saved) == [
+        {"id": "29:renamed", "name": "New Name", "aad_object_id": "aad-renamed", "role": "lead"},
+        {"id": "29:new", "name": "New", "aad_object_id": "aad-new"},
+    ]
+
+
+def test_roster_is_fetched_page_by_page_and_cached():
+    async def scenario():
+        conversations = StubConversations(roster=_roster(7))
+        cache = RosterCache()
+        first = await cache.get(TEAM_ID, _fetcher(conversations, 3))
+        second = await cache.get(TEAM_ID, _fetcher(conversations, 3))
+        forced = await cache.get(TEAM_ID, _fetcher(conversations, 3), force=True)
+        return cache, first, second, forced
+
+    cache, first, second, forced = asyncio.run(scenario())
+    assert [member["id"] for member in first] == [f"29:member-{index}" for index in range(7)]
+    assert first[0] == {"id": "29:member-0", "name": "Member 0", "aad_object_id": "aad-0"}
+    assert second is first
+    assert forced == first
+    assert cache.stats() == {"teams": 1, "hits": 1, "fetched_pages": 6}
+
+
+def test_expired_roster_is_fetched_again():
+    async def scenario():
+        conversations = StubConversations(roster=_roster(2))
+        cache = RosterCache(ttl=0)
+        await cache.get(TEAM_ID, _fetcher(conversations, 500))
+        await cache.get(TEAM_ID, _fetcher(conversations, 500))
+        return cache
+
+    assert asyncio.run(scenario()).stats()["fetched_pages"] == 2
+
+
+def test_concurrent_requests_for_one_team_share_a_fetch():
+    async def scenario():
+        conversations = StubConversations(latency=0.01, roster=_roster(5))
+        cache = RosterCache()
+        rosters = await asyncio.gather(*[cache.get(TEAM_ID, _fetcher(conversations, 2)) for _ in range(4)])
+        return cache, rosters
+
+    cache, rosters = asyncio.run(scenario())
+    assert cache.stats()["fetched_pages"] == 3
+    assert all(roster is rosters[0] for roster in rosters)
+
+
+def test_failed_fetch_is_not_cached():
+    async def scenario():
+        conversations = StubConversations(throttle_rate=1.0, roster=_roster(2))
+        cache = RosterCache()
+        try:
+            await cache.get(TEAM_ID, _fetcher(conversations, 500))
+        except ThrottledError:
+            pass
+        return cache
+
+    assert asyncio.run(scenario()).stats() == {"teams": 0, "hits": 0, "fetched_pages": 0}
+
+
+def test_syncroster_saves_the_team_members(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": ["Member 0", "Member 1"]}})
+    with open(os.path.join(data_dir, "team_members.json"), "w") as f_ptr:
+        json.dump([{"id": "29:member-0", "name": "Member 0", "aad_object_id": "aad-0"}], f_ptr)
+
+    async def scenario():
+        harness = BotHarness(data_dir, roster=_roster(3))
+        await harness.send(make_activity(text="syncroster"))
+        await harness.send(make_activity(text="syncroster"))
+        await harness.bot.close()
+        return harness
+
+    harness = asyncio.run(scenario())
+    assert harness.replies() == ["*Synced 3 team members, 2 added or updated*", "*Synced 3 team members, 0 added or updated*"]
+    with open(os.path.join(data_dir, "team_members.json"), "r") as f_ptr:
+        assert sorted(member["id"] for member in json.load(f_ptr)) == ["29:member-0", "29:member-1", "29:member-2"]
+
+
+def test_syncroster_outside_of_a_team_is_refused(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": ["Member 0", "Member 1"]}})
+
+    async def scenario():
+        harness = BotHarness(data_dir, roster=_roster(3))
+        activity = make_activity(text="syncroster")
+        activity.channel_data = {}
+        await harness.send(activity)
+        await harness.bot.close()
+        return harness
+
+    assert asyncio.run(scenario()).replies() == ["*Roster sync only works in a team channel*"]
+
+
+def test_scheduled_sync_covers_every_team_the_bot_has_heard_from(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": ["Member 0", "Member 1"]}})
+
+    async def scenario():
+        harness = BotHarness(data_dir, roster=_roster(4))
+        await harness.send(make_activity(text="show"))
+        await harness.bot.sync_all_rosters(harness.adapter)
+        await harness.bot.close()
+
+    asyncio.run(scenario())
+    with open(os.path.join(data_dir, "team_members.json"), "r") as f_ptr:
+        assert len(json.load(f_ptr)) == 4
+
+
+def test_scheduled_sync_logs_a_failing_team_and_carries_on(data_dir, capsys):
+    write_team_data(data_dir, {"groups": {"Core": ["Member 0", "Member 1"]}})
+
+    async def scenario():
+        harness = BotHarness(data_dir, roster=_roster(4))
+        await harness.send(make_activity(text="show"))
+        harness.conversations._throttle_rate = 1.0  # pylint: disable=protected-access
+        await harness.bot.sync_all_rosters(harness.adapter)
+        await harness.bot.close()
+
+    asyncio.run(scenario())
+    assert f"[roster_sync] syncing team {TEAM_ID} failed: Too Many Requests" in capsys.readouterr().err
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import sqlite3
+
+from bots.assignment import ReviewerLoadTracker
+from bots.member_store import SavedMemberStore
+from bots.shared_state import SharedStateStore
+from tests.conftest import BotHarness, make_activity, submitpr, write_team_data
+
+
+MEMBERS = ["Alice Smith", "Bob Jones", "Carol White", "Dan Brown"]
+
+
+def _store(data_dir: str, busy_timeout: float = 10.0) -> SharedStateStore:
+    return SharedStateStore(
+        os.path.join(data_dir, "shared.db"), SavedMemberStore(), ReviewerLoadTracker(), {}, busy_timeout=busy_timeout
+    )
+
+
+def test_activity_redelivered_to_another_worker_is_dropped(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}})
+
+    async def scenario():
+        first = BotHarness(data_dir, shared_state=True)
+        second = BotHarness(data_dir, shared_state=True)
+        activity = make_activity(value=submitpr("1001"))
+        await first.send(activity)
+        await second.send(activity)
+        # A new activity for the same PR is a duplicate submission.
+        await second.send(make_activity(value=submitpr("1001")))
+        await first.bot.close()
+        await second.bot.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert len(first.conversations.created) == 1
+    assert not second.conversations.created
+    assert second.replies() == ["*Review 1001 has already been submitted, it won't be posted again*"]
+
+
+def test_released_or_expired_keys_can_be_claimed_again(data_dir):
+    async def scenario():
+        store = _store(data_dir)
+        other = _store(data_dir)
+        claims = [await store.claim(("activity", "c", "1"), 60), await other.claim(("activity", "c", "1"), 60)]
+        await store.release(("activity", "c", "1"))
+        claims.append(await other.claim(("activity", "c", "1"), 60))
+        claims.append(await store.claim(("activity", "c", "2"), 0))
+        claims.append(await other.claim(("activity", "c", "2"), 0))
+        await store.close()
+        await other.close()
+        return claims
+
+    assert asyncio.run(scenario()) == [True, False, True, True, True]
+
+
+def test_event_loop_keeps_running_while_another_process_holds_the_write_lock(data_dir):
+    async def scenario():
+        store = _store(data_dir)
+        blocker = sqlite3.connect(os.path.join(data_dir, "shared.db"), isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+
+        claim = asyncio.ensure_future(store.claim(("activity", "c", "1"), 60))
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        waiting = not claim.done()
+
+        blocker.execute("ROLLBACK")
+        claimed = await claim
+        blocker.close()
+        await store.close()
+        return ticks, waiting, claimed
+
+    assert asyncio.run(scenario()) == (5, True, True)
+
+
+def test_reviewers_assigned_by_one_worker_count_for_the_other(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}, "reviewer_capacity": {"default": 1}})
+
+    async def scenario():
+        workers = [BotHarness(data_dir, shared_state=True) for _ in range(2)]
+        for index, wi in enumerate(["1001", "1002", "1003"]):
+            await workers[index % 2].send(make_activity(value=submitpr(wi)))
+        await workers[1].send(make_activity(value=submitpr("1004")))
+        for worker in workers:
+            await worker.bot.close()
+        return workers
+
+    workers = asyncio.run(scenario())
+    cards = workers[0].posted_cards() + workers[1].posted_cards()
+    assert len(cards) == 3
+    # Alice submitted them, so each of the other three got exactly one.
+    assert all(sum(member in card for card in cards) == 1 for member in MEMBERS[1:])
+    assert workers[1].replies()[-1] == "*No reviewers available, everyone is out of office or at capacity*"
@@ -0,0 +1,40 @@
+import asyncio
+
+from bots.name_index import NameIndex
+from bots.submission import ReviewSubmission
+from tests.conftest import BotHarness, make_activity, write_team_data
+
+
+MEMBERS = ["Alice Smith", "Bob Jones", "Carol White", "Dan Brown"]
+
+
+def test_fields_are_parsed_once_and_reviewers_resolved_per_index():
+    submission = ReviewSubmission({"WI": 1001, "Reviewers": "bob, nobody,Carol White", "NumberOfReviewers": " 2 "})
+    index = NameIndex(MEMBERS)
+
+    assert (submission.wi, submission.task_group, submission.number_of_reviewers) == ("1001", "", 2)
+    assert submission.resolve(index) == ["Bob Jones", None, "Carol White"]
+    assert submission.resolve(index) is submission.resolve(index)
+    assert submission.reviewers(NameIndex(["Bob"])) == ["Bob"]
+
+
+def test_number_of_reviewers_is_none_unless_a_non_negative_number():
+    assert ReviewSubmission({}).number_of_reviewers == 0
+    assert [ReviewSubmission({"NumberOfReviewers": text}).number_of_reviewers for text in ("x", "-1", "1.5")] == [None] * 3
+
+
+def test_batch_entries_are_checked_like_single_submissions(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": MEMBERS}})
+    entries = "1 | https://pr/1 | A change | Core | x |\n2 | https://pr/2 | A change | Core | 1 |"
+
+    async def scenario():
+        harness = BotHarness(data_dir)
+        await harness.send(make_activity(text="submitbatch\n" + entries))
+        await harness.bot.close()
+        return harness
+
+    harness = asyncio.run(scenario())
+    assert not harness.conversations.created
+    assert harness.replies() == [
+        "*Nothing was posted, fix these entries:*\n\n1. 1: *Incorrect reviewer number: x, total team members: 4*"
+    ]
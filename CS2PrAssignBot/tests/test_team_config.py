@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from bots.assignment import ReviewerLoadTracker
+from bots.team_config import compile_team_config
+from bots.team_registry import TeamRegistry
+from tests.conftest import TEAM_ID, write_team_data
+
+
+VALID = {"channel_id": "19:channel", "team_id": "19:team", "groups": {"Core": ["Alice Smith", "Bob Jones"], "Web": ["Bob Jones"]}}
+
+
+def _with(**changes):
+    config = dict(VALID)
+    for key, value in changes.items():
+        if value is None:
+            del config[key]
+        else:
+            config[key] = value
+    return config
+
+
+@pytest.mark.parametrize("config, error", [
+    ([], "team config must be a JSON object"),
+    (_with(channel_id=None), "channel_id is required"),
+    (_with(channel_id=""), "channel_id is required"),
+    (_with(groups=None), "groups must be an object of group name to member list"),
+    (_with(groups=["Core"]), "groups must be an object of group name to member list"),
+    (_with(groups={"Core": "Alice Smith"}), "group Core must be a list of member names"),
+    (_with(groups={"Core": ["Alice Smith", " "]}), "group Core must be a list of member names"),
+    (_with(groups={"Core": ["Alice Smith"], "core": ["Bob Jones"]}), "groups Core and core differ only in case"),
+    (_with(team_id=42), "team_id must be a string"),
+    (_with(assignment_strategy="round_robin"), "unknown assignment_strategy round_robin"),
+    (_with(out_of_office={"Bob Jones": [["2026-01-02", "2026-01-01"]]}), "ends before it starts"),
+    (_with(out_of_office={"Bob Jones": "tomorrow"}), "out_of_office for Bob Jones must be a list of [from, to] ISO dates"),
+    (_with(reviewer_capacity={"default": -1}), "reviewer_capacity must be an object"),
+])
+def test_invalid_config_is_rejected_naming_the_file_and_key(config, error):
+    with pytest.raises(ValueError) as raised:
+        compile_team_config(config, "team.json")
+
+    assert str(raised.value).startswith("team.json: ")
+    assert error in str(raised.value)
+
+
+def test_compiled_config_looks_groups_up_by_case_folded_name():
+    config = compile_team_config(_with(assignment_strategy=" Random "), "team.json")
+
+    assert config.assignment_strategy == "random"
+    assert config.group(" core ").members == ("Alice Smith", "Bob Jones")
+    assert config.group("Mobile") is None
+    assert set(config.groups_of("Bob Jones")) == {"Core", "Web"}
+    assert config.all_members == {"Alice Smith", "Bob Jones"}
+    with pytest.raises(AttributeError):
+        config.team_name = "changed"
+
+
+def test_registry_skips_invalid_team_configs_and_falls_back_to_the_default(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": ["Alice Smith", "Bob Jones"]}}, {
+        "valid.json": _with(team_id="19:valid"),
+        "not_json.json": "{",
+        "no_channel.json": _with(team_id="19:no-channel", channel_id=None),
+    })
+
+    registry = TeamRegistry(
+        os.path.join(data_dir, "team_config.json"),
+        os.path.join(data_dir, "team_configs"),
+        ReviewerLoadTracker(),
+    )
+
+    assert registry.get("19:valid").team_id == "19:valid"
+    assert registry.get("19:no-channel") is registry.default_team
+    assert registry.get(None).team_id == TEAM_ID
+
+
+def test_registry_refuses_to_start_with_an_invalid_default_config(data_dir):
+    write_team_data(data_dir, {"groups": {"Core": "Alice Smith"}})
+
+    with pytest.raises(ValueError, match="group Core must be a list of member names"):
+        TeamRegistry(os.path.join(data_dir, "team_config.json"), os.path.join(data_dir, "team_configs"), ReviewerLoadTracker())